@@ -1,16 +1,17 @@
-import datetime
 import os
-import json
+from datetime import datetime
 from dotenv import load_dotenv
 
 from src.graphs.v1 import graph
 from src.models.context import ModelsRegistry, ModelConfig
-from tavily import TavilyClient
 from src.utils.observability import (
     UsageMetadataCallbackHandler,
     set_callback_handler,
     print_metrics_summary,
 )
+from src.utils.search import create_tavily_client
+from src.runners.batch import build_result, get_models_config
+from src.utils.result_store import ResultStore
 
 
 load_dotenv()
@@ -48,7 +49,8 @@ if __name__ == "__main__":
     #     default_temperature=temperature,
     # )
 
-    tavily = TavilyClient(api_key=os.environ["TAVILY_API_KEY"])
+    # Cliente com pool de conexões HTTP reaproveitado entre posts
+    tavily = create_tavily_client(api_key=os.environ["TAVILY_API_KEY"])
 
     # Criar callback handler para rastrear tokens
     callback = UsageMetadataCallbackHandler()
@@ -68,31 +70,20 @@ if __name__ == "__main__":
     }
     runtime_context = {"models_registry": models_registry, "tavily": tavily}
 
-    resp_list = []
-    for post in posts:
-        initial_state = {
-            "post": post,
-            "max_revisions": 3,
-        }
-        resp = graph.invoke(initial_state, context=runtime_context, config=config)
+    # Resultados anexados ao dataset Parquet (output/results); o id leva o
+    # início da execução para não repetir os ids de execuções anteriores
+    run_id = datetime.now().strftime("%Y%m%dT%H%M%S")
+    models_config = {**get_models_config(models_registry), "temperature": temperature}
+    with ResultStore() as store:
+        for i, post in enumerate(posts):
+            initial_state = {
+                "post": post,
+                "max_revisions": 3,
+            }
+            start_time = datetime.now()
+            resp = graph.invoke(initial_state, context=runtime_context, config=config)
 
-        # Imprimir resumo de métricas
-        print_metrics_summary(resp)
+            # Imprimir resumo de métricas
+            print_metrics_summary(resp)
 
-        resp["metrics"] = {k: v.model_dump() for k, v in resp["metrics"].items()}
-        resp["relevance_analysis"] = resp["relevance_analysis"].model_dump()
-        if resp["relevance_analysis"]["relevant"]:
-            resp["response"] = resp["response"].model_dump()
-        resp_list.append(resp)
-
-    with open("outputs.json", "r", encoding="utf-8") as f:
-        actual_ouputs = json.load(f)
-    
-    for resp in resp_list:
-        resp['timestamp'] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        resp['temperature'] = temperature
-
-        actual_ouputs.append(resp)
-
-    with open("outputs.json", "w", encoding="utf-8") as f:
-        json.dump(actual_ouputs, f, ensure_ascii=False)
\ No newline at end of file
+            store.append(build_result(f"{run_id}_{i}", post, resp, start_time, models_config))
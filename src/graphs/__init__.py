@@ -0,0 +1,71 @@
+import threading
+from typing import Any, Dict
+
+GRAPH_VERSIONS = ("v1", "v2", "v2-fused")
+
+# Grafos compilados sem checkpointer, um por (versão, async, nós opcionais):
+# compilados no primeiro uso e reaproveitados pelo processo inteiro
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+
+def build(
+    version: str = "v1",
+    use_async: bool = False,
+    checkpointer=None,
+    prefilter: bool = False,
+    evidence: bool = False,
+):
+    """
+    Monta o grafo escolhido em tempo de execução.
+
+    Args:
+        version: "v1" (4 chamadas LLM por post relevante), "v2" (triage
+            + analyst) ou "v2-fused" (uma chamada, sem pesquisa)
+        use_async: Variantes ``async`` dos nós
+        checkpointer: Checkpointer do LangGraph (ver ``src.graphs.checkpoint``)
+        prefilter: Inclui o nó ``prefilter`` (``RuntimeContext.prefilter``)
+        evidence: Inclui o nó ``evidence`` (``RuntimeContext.evidence_token_budget``)
+    """
+    options = dict(
+        use_async=use_async, checkpointer=checkpointer, prefilter=prefilter, evidence=evidence
+    )
+    if version == "v1":
+        from src.graphs.v1 import build_graph
+
+        return build_graph(**options)
+    if version in ("v2", "v2-fused"):
+        from src.graphs.v2 import build_graph
+
+        return build_graph(fuse_analysis=version == "v2-fused", **options)
+    raise ValueError(f"Unknown graph version '{version}', expected one of {GRAPH_VERSIONS}")
+
+
+def graph_options(context: Dict[str, Any]) -> Dict[str, bool]:
+    """Nós opcionais que o ``RuntimeContext`` (como dict) configurou."""
+    return {
+        "prefilter": context.get("prefilter") is not None,
+        "evidence": context.get("evidence_token_budget") is not None,
+    }
+
+
+def get_graph(
+    version: str = "v1", use_async: bool = False, prefilter: bool = False, evidence: bool = False
+):
+    """
+    Grafo compilado (sem checkpointer) de ``version``, cacheado por processo.
+
+    Importar os módulos de ``src`` não compila nada (nem importa LangGraph);
+    o custo é pago uma vez, na primeira chamada. ``prefilter``/``evidence``
+    incluem os nós opcionais (ver ``graph_options``).
+    """
+    key = (version, use_async, prefilter, evidence)
+    graph = _compiled.get(key)
+    if graph is None:
+        with _compiled_lock:
+            graph = _compiled.get(key)
+            if graph is None:
+                graph = _compiled[key] = build(
+                    version, use_async=use_async, prefilter=prefilter, evidence=evidence
+                )
+    return graph
@@ -0,0 +1,178 @@
+"""
+Comparação lado a lado entre versões do grafo (latência, tokens e concordância).
+
+    python -m src.graphs.compare --versions v1 v2 v2-fused --model llama3.1:8b
+
+Roda os mesmos posts (por padrão os ``TEST_POSTS`` do notebook de avaliação)
+em cada versão e compara com a primeira versão da lista (a referência):
+concordância de relevância e diferença de score.
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.graphs import GRAPH_VERSIONS, build
+from src.models.context import ModelConfig, ModelsRegistry
+from src.utils.observability import UsageMetadataCallbackHandler, set_callback_handler
+
+# Mesmos posts de ``evaluation.ipynb``
+TEST_POSTS = [
+    {
+        "id": "irrelevant_1",
+        "text": "Bom dia!",
+        "expected_relevant": False,
+    },
+    {
+        "id": "fake_news_1",
+        "text": "Cloroquina cura COVID",
+        "expected_relevant": True,
+    },
+    {
+        "id": "political_1",
+        "text": "Gastar dinheiro público com campanhas de incentivo ao aborto, ideologia de gênero ou troca de sexo de crianças? NÃO! Não vamos permitir!",
+        "expected_relevant": True,
+    },
+]
+
+
+def run_post(graph, models_registry: ModelsRegistry, tavily: Any, post: str) -> Dict[str, Any]:
+    """Roda um post e extrai latência, tokens, chamadas LLM, relevância e score."""
+    callback = UsageMetadataCallbackHandler()
+    set_callback_handler(callback)
+    config = {
+        "configurable": {"thread_id": str(datetime.now().timestamp())},
+        "callbacks": [callback],
+    }
+    runtime_context = {"models_registry": models_registry, "tavily": tavily}
+
+    start = time.perf_counter()
+    try:
+        resp = graph.invoke({"post": post}, context=runtime_context, config=config)
+    except Exception as e:
+        return {"success": False, "error": str(e), "latency_s": time.perf_counter() - start}
+    latency = time.perf_counter() - start
+
+    metrics = resp.get("metrics", {})
+    relevant = resp["relevance_analysis"].relevant
+    return {
+        "success": True,
+        "latency_s": latency,
+        "total_tokens": sum(m.total_tokens for m in metrics.values()),
+        "llm_calls": sum(1 for m in metrics.values() if m.total_tokens > 0),
+        "relevant": relevant,
+        "score": resp["response"].score if relevant and resp.get("response") else None,
+    }
+
+
+def compare_graphs(
+    models_registry: ModelsRegistry,
+    tavily: Any,
+    versions: Sequence[str] = ("v1", "v2"),
+    posts: Optional[List[Dict[str, Any]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Roda ``posts`` em cada versão do grafo.
+
+    Returns:
+        Uma linha por (versão, post), com as colunas de ``run_post`` mais
+        ``relevance_match``/``score_diff`` em relação à primeira versão
+    """
+    posts = posts or TEST_POSTS
+    graphs = {version: build(version) for version in versions}
+    reference = versions[0]
+
+    rows = []
+    by_key: Dict[tuple, Dict[str, Any]] = {}
+    for version in versions:
+        for post in posts:
+            row = {"version": version, "post_id": post["id"]}
+            row.update(run_post(graphs[version], models_registry, tavily, post["text"]))
+            if "expected_relevant" in post and row["success"]:
+                row["expected_match"] = row["relevant"] == post["expected_relevant"]
+
+            base = by_key.get((reference, post["id"]))
+            if base is not None and base["success"] and row["success"]:
+                row["relevance_match"] = row["relevant"] == base["relevant"]
+                if row["score"] is not None and base["score"] is not None:
+                    row["score_diff"] = row["score"] - base["score"]
+            by_key[(version, post["id"])] = row
+            rows.append(row)
+    return rows
+
+
+def summarize(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Médias por versão."""
+
+    def mean(values):
+        values = [v for v in values if v is not None]
+        return sum(values) / len(values) if values else None
+
+    summary = []
+    for version in dict.fromkeys(r["version"] for r in rows):
+        ok = [r for r in rows if r["version"] == version and r["success"]]
+        summary.append(
+            {
+                "version": version,
+                "posts": len(ok),
+                "latency_s": mean(r["latency_s"] for r in ok),
+                "total_tokens": mean(r["total_tokens"] for r in ok),
+                "llm_calls": mean(r["llm_calls"] for r in ok),
+                "relevance_agreement": mean(
+                    float(r["relevance_match"]) for r in ok if "relevance_match" in r
+                ),
+                "mean_abs_score_diff": mean(
+                    abs(r["score_diff"]) for r in ok if "score_diff" in r
+                ),
+            }
+        )
+    return summary
+
+
+def _print_table(rows: List[Dict[str, Any]]):
+    if not rows:
+        return
+    columns = list(dict.fromkeys(k for r in rows for k in r))
+
+    def fmt(value):
+        if isinstance(value, float):
+            return f"{value:.3f}"
+        return "" if value is None else str(value)
+
+    widths = {c: max(len(c), *(len(fmt(r.get(c))) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for r in rows:
+        print("  ".join(fmt(r.get(c)).ljust(widths[c]) for c in columns))
+
+
+def main():
+    from dotenv import load_dotenv
+
+    from src.utils.search import create_tavily_client
+
+    parser = argparse.ArgumentParser(description="Compara versões do grafo nos TEST_POSTS")
+    parser.add_argument("--versions", nargs="+", choices=GRAPH_VERSIONS, default=["v1", "v2"])
+    parser.add_argument("--model", default="llama3.1:8b", help="Modelo de todos os nodes")
+    parser.add_argument("--provider", default="ollama")
+    parser.add_argument("--base-url", default="http://localhost:11434")
+    args = parser.parse_args()
+
+    load_dotenv()
+    config = ModelConfig(
+        model=args.model, temperature=0.0, model_provider=args.provider, base_url=args.base_url
+    )
+    models_registry = ModelsRegistry(
+        entry=config, planner=config, researcher=config, analyst=config
+    )
+    tavily = create_tavily_client(api_key=os.environ["TAVILY_API_KEY"])
+
+    rows = compare_graphs(models_registry, tavily, versions=args.versions)
+    _print_table(rows)
+    print()
+    _print_table(summarize(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Matriz de avaliação por troca de modelo (baseline × modelos × nós × posts).
+
+Cada célula é a baseline com o modelo de um único nó trocado, como no
+``evaluation.ipynb``. As células rodam em paralelo e compartilham um
+``StageCache``: os nós antes do nó trocado recebem o mesmo estado de entrada
+que na baseline e são reaproveitados (inclusive as buscas no Tavily do
+research), então só o nó trocado e os seguintes são recalculados.
+
+    python -m src.graphs.evaluation --baseline-model gpt-4 --test-models llama3.1:8b qwen2.5:1.5b
+
+Cada linha traz relevância e score comparados com a baseline do mesmo post e
+``reused_stages`` (nós servidos do cache naquela célula). Tempo e tokens das
+linhas são os da execução original de cada nó, como se a célula rodasse
+sozinha.
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Union
+
+from src.graphs import get_graph
+from src.graphs.compare import TEST_POSTS, _print_table
+from src.models.context import ModelConfig, ModelConfigType, ModelsRegistry
+from src.utils.observability import UsageMetadataCallbackHandler, set_callback_handler
+from src.utils.stage_cache import StageCache
+
+EVALUATION_NODES = ("entry", "planner", "researcher", "analyst")
+
+BASELINE = "baseline"
+
+
+def swap_registry(baseline: ModelsRegistry, node: str, model: ModelConfigType) -> ModelsRegistry:
+    """Cópia da baseline com ``model`` no nó ``node``."""
+    return baseline.model_copy(update={node: model})
+
+
+def run_cell(
+    graph, models_registry: ModelsRegistry, tavily: Any, post: str, **context
+) -> Dict[str, Any]:
+    """Roda um post numa célula; ``context`` vai para o ``RuntimeContext`` (ex: ``stage_cache``)."""
+    callback = UsageMetadataCallbackHandler()
+    set_callback_handler(callback)
+    config = {
+        "configurable": {"thread_id": str(datetime.now().timestamp())},
+        "callbacks": [callback],
+    }
+    runtime_context = {"models_registry": models_registry, "tavily": tavily, **context}
+
+    start = time.perf_counter()
+    try:
+        resp = graph.invoke({"post": post}, context=runtime_context, config=config)
+    except Exception as e:
+        return {"success": False, "error": str(e), "wall_s": time.perf_counter() - start}
+    wall = time.perf_counter() - start
+
+    metrics = resp.get("metrics", {})
+    relevant = resp["relevance_analysis"].relevant
+    return {
+        "success": True,
+        "wall_s": wall,
+        "latency_s": sum(m.execution_time for m in metrics.values()),
+        "total_tokens": sum(m.total_tokens for m in metrics.values()),
+        "reused_stages": sum(1 for m in metrics.values() if m.memoized),
+        "relevant": relevant,
+        "score": resp["response"].score if relevant and resp.get("response") else None,
+    }
+
+
+def evaluate_matrix(
+    baseline: ModelsRegistry,
+    test_models: Union[Sequence[ModelConfigType], Mapping[str, ModelConfigType]],
+    tavily: Any,
+    nodes: Sequence[str] = EVALUATION_NODES,
+    posts: Optional[List[Dict[str, Any]]] = None,
+    version: str = "v1",
+    max_workers: int = 8,
+    stage_cache: Optional[StageCache] = None,
+    **context,
+) -> List[Dict[str, Any]]:
+    """
+    Roda a baseline e cada (modelo de teste, nó) em ``posts``.
+
+    Args:
+        test_models: Modelos a testar (nome -> config, ou lista de nomes/configs)
+        stage_cache: Cache compartilhado; None cria um para esta matriz
+        context: Demais campos do ``RuntimeContext``, iguais em todas as células
+
+    Returns:
+        Uma linha por (modelo, nó, post), com as colunas de ``run_cell`` mais
+        ``relevance_match``/``score_diff`` em relação à baseline
+    """
+    posts = posts or TEST_POSTS
+    stage_cache = stage_cache if stage_cache is not None else StageCache()
+    if not isinstance(test_models, Mapping):
+        test_models = {
+            model if isinstance(model, str) else model.model: model for model in test_models
+        }
+    graph = get_graph(version)
+
+    cells = [(BASELINE, "all", baseline)] + [
+        (name, node, swap_registry(baseline, node, model))
+        for name, model in test_models.items()
+        for node in nodes
+    ]
+    jobs = [(cell, post) for cell in cells for post in posts]
+
+    def run(job):
+        (name, node, registry), post = job
+        row = {"model": name, "node": node, "post_id": post["id"]}
+        row.update(
+            run_cell(graph, registry, tavily, post["text"], stage_cache=stage_cache, **context)
+        )
+        if "expected_relevant" in post and row["success"]:
+            row["expected_match"] = row["relevant"] == post["expected_relevant"]
+        return row
+
+    # Todas as células de uma vez: estágios iguais em andamento são calculados
+    # uma única vez e as demais células esperam por eles
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="evaluation") as executor:
+        rows = list(executor.map(run, jobs))
+
+    reference = {row["post_id"]: row for row in rows if row["model"] == BASELINE}
+    for row in rows:
+        base = reference.get(row["post_id"])
+        if row["model"] == BASELINE or base is None or not (base["success"] and row["success"]):
+            continue
+        row["relevance_match"] = row["relevant"] == base["relevant"]
+        if row["score"] is not None and base["score"] is not None:
+            row["score_diff"] = row["score"] - base["score"]
+    return rows
+
+
+def summarize(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Médias por (modelo, nó trocado)."""
+
+    def mean(values):
+        values = [v for v in values if v is not None]
+        return sum(values) / len(values) if values else None
+
+    summary = []
+    for model, node in dict.fromkeys((r["model"], r["node"]) for r in rows):
+        cell = [r for r in rows if r["model"] == model and r["node"] == node]
+        ok = [r for r in cell if r["success"]]
+        summary.append(
+            {
+                "model": model,
+                "node": node,
+                "success_rate": len(ok) / len(cell) if cell else None,
+                "latency_s": mean(r["latency_s"] for r in ok),
+                "total_tokens": mean(r["total_tokens"] for r in ok),
+                "relevance_agreement": mean(
+                    float(r["relevance_match"]) for r in ok if "relevance_match" in r
+                ),
+                "mean_abs_score_diff": mean(
+                    abs(r["score_diff"]) for r in ok if "score_diff" in r
+                ),
+                "reused_stages": sum(r["reused_stages"] for r in ok),
+            }
+        )
+    return summary
+
+
+def main():
+    from dotenv import load_dotenv
+
+    from src.utils.search import create_tavily_client
+
+    parser = argparse.ArgumentParser(description="Matriz de avaliação por troca de modelo nos TEST_POSTS")
+    parser.add_argument("--baseline-model", default="gpt-4", help="Modelo de todos os nodes na baseline")
+    parser.add_argument("--baseline-provider", default=None)
+    parser.add_argument("--test-models", nargs="+", default=["llama3.1:8b", "qwen2.5:1.5b"])
+    parser.add_argument("--provider", default="ollama", help="Provider dos modelos de teste")
+    parser.add_argument("--base-url", default="http://localhost:11434", help="URL dos modelos de teste")
+    parser.add_argument("--nodes", nargs="+", choices=EVALUATION_NODES, default=list(EVALUATION_NODES))
+    parser.add_argument("--version", default="v1", help="Versão do grafo")
+    parser.add_argument("--workers", type=int, default=8, help="Células em paralelo")
+    args = parser.parse_args()
+
+    load_dotenv()
+    baseline_config = ModelConfig(
+        model=args.baseline_model, temperature=0.0, model_provider=args.baseline_provider
+    )
+    baseline = ModelsRegistry(
+        entry=baseline_config, planner=baseline_config,
+        researcher=baseline_config, analyst=baseline_config,
+    )
+    test_models = {
+        model: ModelConfig(model=model, temperature=0.0, model_provider=args.provider, base_url=args.base_url)
+        for model in args.test_models
+    }
+    tavily = create_tavily_client(api_key=os.environ["TAVILY_API_KEY"])
+
+    stage_cache = StageCache()
+    rows = evaluate_matrix(
+        baseline, test_models, tavily, nodes=args.nodes, version=args.version,
+        max_workers=args.workers, stage_cache=stage_cache,
+    )
+    _print_table(rows)
+    print()
+    _print_table(summarize(rows))
+    print()
+    _print_table([{"node": node, **counts} for node, counts in stage_cache.stats().items()])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,110 @@
 from langgraph.graph import StateGraph, END
 from src.models import AgentState, RuntimeContext
-from src.models.nodes import entry_node, plan_node, research_node, analyst_node
+from src.models.nodes import (
+    prefilter_node,
+    triage_node,
+    plan_node,
+    research_node,
+    evidence_node,
+    analyst_node,
+    escalation_node,
+    aprefilter_node,
+    atriage_node,
+    aplan_node,
+    aresearch_node,
+    aevidence_node,
+    aanalyst_node,
+    aescalation_node,
+)
 
 
-builder = StateGraph(state_schema=AgentState, context_schema=RuntimeContext)
+def _after_plan(state) -> str:
+    return "analyst" if state.claims_resolved else "research"
 
 
-builder.add_node("entry", entry_node)
-builder.add_node("planner", plan_node)
-builder.add_node("research", research_node)
-builder.add_node("analyst", analyst_node)
+def build_graph(
+    use_async: bool = False, checkpointer=None, prefilter: bool = False, evidence: bool = False
+):
+    """
+    Monta e compila o grafo v1.
+
+    Args:
+        use_async: Se True, usa as variantes ``async`` dos nós (chamadas via
+            ``ainvoke``), próprias para ``graph.ainvoke``/``graph.abatch``.
+        checkpointer: Checkpointer do LangGraph (ex: ``open_checkpointer()`` /
+            ``aopen_checkpointer()`` de ``src.graphs.checkpoint``). Com ele, o
+            estado é salvo após cada nó e um post interrompido pode ser
+            retomado do último nó concluído (mesmo ``thread_id``).
+        prefilter: Inclui o nó ``prefilter`` antes do entry (usa
+            ``RuntimeContext.prefilter``)
+        evidence: Inclui o nó ``evidence`` entre a pesquisa e o analyst (usa
+            ``RuntimeContext.evidence_token_budget``)
+    """
+    builder = StateGraph(state_schema=AgentState, context_schema=RuntimeContext)
+
+    if use_async:
+        builder.add_node("entry", atriage_node)
+        builder.add_node("planner", aplan_node)
+        builder.add_node("research", aresearch_node)
+        builder.add_node("analyst", aanalyst_node)
+        builder.add_node("analyst_escalation", aescalation_node)
+    else:
+        builder.add_node("entry", triage_node)
+        builder.add_node("planner", plan_node)
+        builder.add_node("research", research_node)
+        builder.add_node("analyst", analyst_node)
+        builder.add_node("analyst_escalation", escalation_node)
+
+    # Pré-filtro léxico: posts rejeitados com alta confiança não chamam o LLM
+    if prefilter:
+        builder.add_node("prefilter", aprefilter_node if use_async else prefilter_node)
+        builder.set_entry_point("prefilter")
+        builder.add_conditional_edges(
+            "prefilter",
+            lambda state: state.relevance_analysis is None,
+            {False: END, True: "entry"},
+        )
+    else:
+        builder.set_entry_point("entry")
+    # Com planner especulativo o plano já vem do entry e o planner é pulado
+    builder.add_conditional_edges(
+        "entry",
+        lambda state: (
+            END
+            if state.relevance_analysis is None or not state.relevance_analysis.relevant
+            else _after_plan(state) if state.plan else "planner"
+        ),
+        {END: END, "planner": "planner", "research": "research", "analyst": "analyst"},
+    )
+
+    # Cache de afirmações: com todas as afirmações do plano em cache, o analyst
+    # só agrega os vereditos e a pesquisa é pulada
+    builder.add_conditional_edges(
+        "planner", _after_plan, {"research": "research", "analyst": "analyst"}
+    )
+    # Seleção de evidências: passagens relevantes dentro do orçamento de tokens
+    if evidence:
+        builder.add_node("evidence", aevidence_node if use_async else evidence_node)
+        builder.add_edge("research", "evidence")
+        builder.add_edge("evidence", "analyst")
+    else:
+        builder.add_edge("research", "analyst")
+    # Cascata: resposta incerta ou inválida escala para o modelo mais forte
+    builder.add_conditional_edges(
+        "analyst",
+        lambda state: state.needs_escalation,
+        {False: END, True: "analyst_escalation"},
+    )
+    builder.add_edge("analyst_escalation", END)
+
+    return builder.compile(checkpointer=checkpointer)
 
-builder.set_entry_point("entry")
-builder.add_conditional_edges(
-    "entry",
-    lambda state: state.relevance_analysis is not None
-    and state.relevance_analysis.relevant,
-    {False: END, True: "planner"},
-)
 
-builder.add_edge("planner", "research")
-builder.add_edge("research", "analyst")
-builder.add_edge("analyst", END)
+def __getattr__(name: str):
+    # ``graph`` (sync) e ``agraph`` (nós nativamente assíncronos) são compilados
+    # no primeiro acesso, pelo cache de ``src.graphs.get_graph``
+    if name in ("graph", "agraph"):
+        from src.graphs import get_graph
 
-# graph = builder.compile(checkpointer=memory)
-graph = builder.compile()
+        return get_graph("v1", use_async=name == "agraph")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
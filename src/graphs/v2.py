@@ -0,0 +1,114 @@
+from langgraph.graph import StateGraph, END
+from src.models import AgentState, RuntimeContext
+from src.models.nodes import (
+    prefilter_node,
+    fused_triage_node,
+    fused_analysis_node,
+    search_node,
+    evidence_node,
+    analyst_node,
+    escalation_node,
+    aprefilter_node,
+    afused_triage_node,
+    afused_analysis_node,
+    asearch_node,
+    aevidence_node,
+    aanalyst_node,
+    aescalation_node,
+)
+
+
+def build_graph(
+    use_async: bool = False,
+    checkpointer=None,
+    fuse_analysis: bool = False,
+    prefilter: bool = False,
+    evidence: bool = False,
+):
+    """
+    Monta e compila o grafo v2 (passagem única).
+
+    Uma única chamada structured-output (modelo ``triage`` do registry, ou o do
+    planner) devolve relevância, plano e queries; a busca roda em seguida sem
+    LLM. Um post relevante faz 2 chamadas LLM (triage + analyst) em vez das 4
+    do v1.
+
+    Args:
+        use_async: Se True, usa as variantes ``async`` dos nós.
+        checkpointer: Checkpointer do LangGraph (ver ``src.graphs.checkpoint``).
+        fuse_analysis: Se True, a mesma chamada também devolve o score final,
+            sem pesquisa na web (1 chamada por post). Mais barato, mas o
+            veredito depende só do conhecimento do modelo.
+        prefilter: Inclui o nó ``prefilter`` antes do triage
+        evidence: Inclui o nó ``evidence`` entre a busca e o analyst
+    """
+    builder = StateGraph(state_schema=AgentState, context_schema=RuntimeContext)
+
+    if use_async:
+        nodes = {
+            "prefilter": aprefilter_node,
+            "triage": afused_analysis_node if fuse_analysis else afused_triage_node,
+            "search": asearch_node,
+            "evidence": aevidence_node,
+            "analyst": aanalyst_node,
+            "analyst_escalation": aescalation_node,
+        }
+    else:
+        nodes = {
+            "prefilter": prefilter_node,
+            "triage": fused_analysis_node if fuse_analysis else fused_triage_node,
+            "search": search_node,
+            "evidence": evidence_node,
+            "analyst": analyst_node,
+            "analyst_escalation": escalation_node,
+        }
+
+    builder.add_node("triage", nodes["triage"])
+    if prefilter:
+        builder.add_node("prefilter", nodes["prefilter"])
+        builder.set_entry_point("prefilter")
+        builder.add_conditional_edges(
+            "prefilter",
+            lambda state: state.relevance_analysis is None,
+            {False: END, True: "triage"},
+        )
+    else:
+        builder.set_entry_point("triage")
+
+    if fuse_analysis:
+        builder.add_edge("triage", END)
+        return builder.compile(checkpointer=checkpointer)
+
+    builder.add_node("search", nodes["search"])
+    builder.add_node("analyst", nodes["analyst"])
+    builder.add_node("analyst_escalation", nodes["analyst_escalation"])
+    builder.add_conditional_edges(
+        "triage",
+        lambda state: state.relevance_analysis is not None
+        and state.relevance_analysis.relevant,
+        {False: END, True: "search"},
+    )
+    if evidence:
+        builder.add_node("evidence", nodes["evidence"])
+        builder.add_edge("search", "evidence")
+        builder.add_edge("evidence", "analyst")
+    else:
+        builder.add_edge("search", "analyst")
+    builder.add_conditional_edges(
+        "analyst",
+        lambda state: state.needs_escalation,
+        {False: END, True: "analyst_escalation"},
+    )
+    builder.add_edge("analyst_escalation", END)
+
+    return builder.compile(checkpointer=checkpointer)
+
+
+def __getattr__(name: str):
+    # ``graph`` (sync) e ``agraph`` (nós nativamente assíncronos) são compilados
+    # no primeiro acesso, pelo cache de ``src.graphs.get_graph``
+    if name in ("graph", "agraph"):
+        from src.graphs import get_graph
+
+        return get_graph("v2", use_async=name == "agraph")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,5 +1,32 @@
-from .context import RuntimeContext
-from .state import AgentState
-from .schemas import Response, Queries, Metrics
+import importlib
+from typing import TYPE_CHECKING
+
+# Reexportações carregadas no primeiro acesso: ``import src.models.schemas``
+# não deve pagar o import do LangChain (context.py)
+_EXPORTS = {
+    "RuntimeContext": "src.models.context",
+    "AgentState": "src.models.state",
+    "Response": "src.models.schemas",
+    "Queries": "src.models.schemas",
+    "Metrics": "src.models.schemas",
+}
 
 __all__ = ["RuntimeContext", "AgentState", "Response", "Queries", "Metrics"]
+
+if TYPE_CHECKING:
+    from .context import RuntimeContext
+    from .state import AgentState
+    from .schemas import Response, Queries, Metrics
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
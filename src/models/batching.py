@@ -0,0 +1,186 @@
+import asyncio
+import contextvars
+import logging
+from typing import List, Optional, Tuple
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from src.models.context import ModelsRegistry
+from src.models.prompts import ENTRY_BATCH_PROMPT
+from src.models.schemas import BatchRelevanceAnalysis, RelevanceAnalysis
+from src.utils.observability import increment_node_counter
+
+logger = logging.getLogger(__name__)
+
+# Tokens atribuídos a um post: (prompt, completion)
+TokenShare = Tuple[int, int]
+
+
+def split_tokens(total: int, weights: List[float]) -> List[int]:
+    """
+    Divide ``total`` tokens proporcionalmente aos pesos, em inteiros que somam
+    exatamente ``total`` (método do maior resto).
+    """
+    if not weights:
+        return []
+    weight_sum = sum(weights)
+    if weight_sum <= 0:
+        weights = [1.0] * len(weights)
+        weight_sum = float(len(weights))
+
+    raw = [total * w / weight_sum for w in weights]
+    shares = [int(r) for r in raw]
+    remainder = total - sum(shares)
+    by_fraction = sorted(range(len(raw)), key=lambda i: raw[i] - shares[i], reverse=True)
+    for i in by_fraction[:remainder]:
+        shares[i] += 1
+    return shares
+
+
+class EntryBatcher:
+    """
+    Agrupa chamadas concorrentes do ``aentry_node`` em uma única chamada
+    structured-output que classifica vários posts de uma vez.
+
+    Cada post espera até ``max_wait`` segundos (ou até o lote atingir
+    ``batch_size``). O prompt do sistema, que domina o custo para posts curtos,
+    é enviado uma vez por lote. Os tokens da chamada são divididos entre os
+    posts: o prompt pelo tamanho de cada post (mais uma fatia igual do prompt
+    do sistema), a completion pelo tamanho do raciocínio de cada um.
+
+    Se a saída não puder ser lida, ou um post faltar na resposta, esse post
+    volta para a chamada individual normal do ``entry_node``.
+
+    Uso (somente no grafo assíncrono):
+        runtime_context = {..., "entry_batcher": EntryBatcher(models_registry, batch_size=8)}
+    """
+
+    def __init__(
+        self,
+        models_registry: ModelsRegistry,
+        batch_size: int = 8,
+        max_wait: float = 0.05,
+    ):
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+        self.models_registry = models_registry
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        # Totais do processo
+        self.batches = 0
+        self.batched_posts = 0
+        self.fallbacks = 0
+
+    async def classify(self, post: str) -> Optional[RelevanceAnalysis]:
+        """
+        Classifica um post dentro de um lote.
+
+        Returns:
+            ``RelevanceAnalysis`` do post, ou None se ele deve ser classificado
+            individualmente (lote de 1 post ou falha de parsing)
+        """
+        if self.batch_size == 1:
+            return None
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((post, future))
+
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        analysis, (prompt_tokens, completion_tokens), batch_size = await future
+
+        # Fatia de tokens do post, somada ao Metrics do entry deste post
+        increment_node_counter("prompt_tokens", prompt_tokens)
+        increment_node_counter("completion_tokens", completion_tokens)
+        increment_node_counter("total_tokens", prompt_tokens + completion_tokens)
+        if analysis is not None:
+            increment_node_counter("batch_size", batch_size)
+        return analysis
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        # Contexto vazio: a chamada em lote não herda callbacks/contadores do
+        # post que disparou o flush (os tokens são divididos manualmente)
+        contextvars.Context().run(asyncio.get_running_loop().create_task, self._run(batch))
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]):
+        posts = [post for post, _ in batch]
+        no_tokens = [(0, 0)] * len(batch)
+
+        if len(batch) == 1:
+            self._resolve(batch, [None], no_tokens)
+            return
+
+        messages = [
+            SystemMessage(content=ENTRY_BATCH_PROMPT),
+            HumanMessage(
+                content="\n".join(
+                    f"[{i}] {' '.join(post.split())}" for i, post in enumerate(posts, 1)
+                )
+            ),
+        ]
+
+        try:
+            model = self.models_registry.get_structured_model(
+                "entry", BatchRelevanceAnalysis, include_raw=True
+            )
+            output = await model.ainvoke(messages)
+        except Exception as e:
+            logger.warning("Batched entry call failed, falling back to per-post: %s", e)
+            self.fallbacks += len(batch)
+            self._resolve(batch, [None] * len(batch), no_tokens)
+            return
+
+        raw = output.get("raw")
+        parsed: Optional[BatchRelevanceAnalysis] = output.get("parsed")
+        usage = getattr(raw, "usage_metadata", None) or {}
+
+        by_id = {}
+        if parsed is not None:
+            by_id = {item.id.strip("[] "): item for item in parsed.results}
+        analyses = [
+            RelevanceAnalysis(relevant=item.relevant, reasoning=item.reasoning)
+            if (item := by_id.get(str(i))) is not None
+            else None
+            for i in range(1, len(batch) + 1)
+        ]
+
+        # Prompt: fatia igual do prompt do sistema + tamanho do post
+        system_share = len(ENTRY_BATCH_PROMPT) / len(batch)
+        prompt_shares = split_tokens(
+            usage.get("input_tokens", 0), [system_share + len(p) for p in posts]
+        )
+        # Completion: tamanho do raciocínio (posts sem resposta recebem o mínimo)
+        completion_shares = split_tokens(
+            usage.get("output_tokens", 0),
+            [1 + len(a.reasoning) if a else 1 for a in analyses],
+        )
+
+        missing = sum(a is None for a in analyses)
+        self.batches += 1
+        self.batched_posts += len(batch) - missing
+        self.fallbacks += missing
+
+        self._resolve(batch, analyses, list(zip(prompt_shares, completion_shares)))
+
+    @staticmethod
+    def _resolve(
+        batch: List[Tuple[str, asyncio.Future]],
+        analyses: List[Optional[RelevanceAnalysis]],
+        tokens: List[TokenShare],
+    ):
+        for (_, future), analysis, share in zip(batch, analyses, tokens):
+            if not future.done():
+                future.set_result((analysis, share, len(batch)))
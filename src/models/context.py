@@ -1,8 +1,7 @@
-from typing import Optional, Union
+from typing import Any, List, Literal, Optional, Tuple, Union
 from pydantic import BaseModel, Field, ConfigDict, field_validator
 from langchain_core.language_models import BaseChatModel
-from langchain.chat_models import init_chat_model
-from tavily import TavilyClient
+from src.models.pool import ModelClientPool, get_model_pool
 
 
 class ModelConfig(BaseModel):
@@ -13,11 +12,19 @@ class ModelConfig(BaseModel):
     temperature: float = Field(default=0.0, description="Temperatura para geração")
     model_provider: Optional[str] = Field(default=None, description="Provider do modelo (ex: openai, ollama)")
     base_url: Optional[str] = Field(default=None, description="URL base para o modelo (ex: http://localhost:11434)")
+    # Várias instâncias do mesmo modelo: cada chamada vai para uma delas (src.models.routing)
+    base_urls: Optional[List[str]] = Field(default=None, description="URLs base entre as quais as chamadas são balanceadas (substitui base_url)")
+    routing: Literal["least_outstanding", "latency"] = Field(default="least_outstanding", description="Estratégia de balanceamento entre base_urls")
+    # None: json_schema (decodificação restrita) no Ollama, default do provider nos demais
+    structured_output_method: Optional[str] = Field(default=None, description="Método do with_structured_output (json_schema, function_calling, json_mode)")
 
 
 # Tipo que aceita string (nome do modelo) ou configuração completa
 ModelConfigType = Union[str, ModelConfig]
 
+# Nodes sem configuração própria usam o modelo de outro node
+NODE_FALLBACKS = {"triage": "planner"}
+
 
 def _normalize_config(value: ModelConfigType, default_temperature: float = 0.0) -> ModelConfig:
     """Normaliza string ou ModelConfig para ModelConfig."""
@@ -28,7 +35,8 @@ def _normalize_config(value: ModelConfigType, default_temperature: float = 0.0)
 
 class ModelsRegistry(BaseModel):
     """
-    Registry que armazena configurações de modelos para cada node e instancia BaseChatModel sob demanda.
+    Registry que armazena configurações de modelos para cada node e obtém BaseChatModel sob demanda
+    do pool de clientes do processo.
     
     Cada node pode receber:
     - Uma string com o nome do modelo (usa temperatura global)
@@ -49,22 +57,35 @@ class ModelsRegistry(BaseModel):
     planner: ModelConfigType = Field(default="gpt-3.5-turbo")
     researcher: ModelConfigType = Field(default="gpt-3.5-turbo")
     analyst: ModelConfigType = Field(default="gpt-3.5-turbo")
+    # Chamada única de triagem + plano + queries do grafo v2; None usa o do planner
+    triage: Optional[ModelConfigType] = Field(default=None)
+    # Modelo mais forte da cascata do analyst; None desliga a cascata
+    analyst_escalation: Optional[ModelConfigType] = Field(default=None)
 
     # Temperatura global (usada quando node recebe apenas string)
     default_temperature: float = Field(default=0.0)
 
-    # Cache de modelos instanciados
-    _models_cache: dict[str, BaseChatModel] = {}
+    # Pool de clientes; None usa o pool padrão do processo (src.models.pool)
+    pool: Optional[ModelClientPool] = Field(default=None, exclude=True)
+
+    # Cassete de gravação/replay (src.utils.cassette.Cassette); None = chamadas reais
+    cassette: Any = Field(default=None, exclude=True)
 
     def _get_node_config(self, node_name: str) -> ModelConfig:
         """Retorna a configuração normalizada para um node."""
         config = getattr(self, node_name, None)
+        if config is None and node_name in NODE_FALLBACKS:
+            config = getattr(self, NODE_FALLBACKS[node_name])
         if config is None:
             raise ValueError(f"Node '{node_name}' not found in models registry")
         return _normalize_config(config, self.default_temperature)
 
     def _create_model(self, config: ModelConfig) -> BaseChatModel:
         """Cria uma instância de BaseChatModel a partir da configuração."""
+        # Import tardio: o pacote langchain (e o do provider) só carrega quando
+        # o primeiro cliente é criado
+        from langchain.chat_models import init_chat_model
+
         kwargs = {
             "model": config.model,
             "temperature": config.temperature,
@@ -76,28 +97,43 @@ class ModelsRegistry(BaseModel):
 
         return init_chat_model(**kwargs)
 
-    def _get_cache_key(self, config: ModelConfig) -> str:
-        """Gera chave de cache única para uma configuração."""
-        return f"{config.model}:{config.temperature}:{config.model_provider}:{config.base_url}"
-
     def get_model(self, node_name: str) -> BaseChatModel:
         """
         Retorna o BaseChatModel para um node específico.
-        Instancia o modelo sob demanda e armazena em cache.
-        
+        O cliente vem do pool compartilhado pelo processo: é instanciado uma única
+        vez por configuração, então criar um registry por post não custa nada.
+
         Args:
             node_name: Nome do node (entry, planner, researcher, analyst)
-            
+
         Returns:
             BaseChatModel instanciado para o node
         """
         config = self._get_node_config(node_name)
-        cache_key = self._get_cache_key(config)
-        
-        if cache_key not in self._models_cache:
-            self._models_cache[cache_key] = self._create_model(config)
+        if self.cassette is not None and self.cassette.mode == "replay":
+            # Replay: o cliente real nem é criado
+            return self.cassette.wrap_model(None, config)
+        pool = self.pool if self.pool is not None else get_model_pool()
+        model = pool.get(config, self._create_model)
+        if self.cassette is not None:
+            return self.cassette.wrap_model(model, config)
+        return model
+
+    def get_structured_model(self, node_name: str, schema: Any, include_raw: bool = False) -> Any:
+        """
+        Retorna o modelo do node já com saída estruturada em ``schema``
+        (``src.models.structured.StructuredModel``), montado uma única vez por
+        configuração e schema no pool de clientes.
+        """
+        from src.models.structured import StructuredModel, structured_output_method
 
-        return self._models_cache[cache_key]
+        config = self._get_node_config(node_name)
+        method = structured_output_method(config)
+        if self.cassette is not None:
+            # O wrapper do cassete é por registry: não entra no cache do pool
+            return StructuredModel(self.get_model(node_name), schema, include_raw=include_raw, method=method)
+        pool = self.pool if self.pool is not None else get_model_pool()
+        return pool.get_structured(config, self._create_model, schema, include_raw=include_raw, method=method)
 
     def get_model_name(self, node_name: str) -> str:
         """Retorna o nome do modelo configurado para um node."""
@@ -113,4 +149,25 @@ class RuntimeContext(BaseModel):
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
     models_registry: ModelsRegistry = Field(default_factory=ModelsRegistry)
-    tavily: TavilyClient = Field(default=None)
+    # TavilyClient ou wrapper com a mesma interface ``search`` (ex: CachedTavilyClient)
+    tavily: Any = Field(default=None)
+    # Cache de buscas (src.utils.search_cache.SearchCache) consultado antes do ``tavily``; None desliga
+    search_cache: Any = Field(default=None)
+    # Número máximo de buscas Tavily simultâneas por post
+    max_search_concurrency: int = Field(default=3)
+    # Pré-filtro léxico (src.utils.prefilter.LexicalPrefilter); None desliga
+    prefilter: Any = Field(default=None)
+    # Triagem em lote do entry (src.models.batching.EntryBatcher, só no grafo async)
+    entry_batcher: Any = Field(default=None)
+    # Orçamento (tokens estimados) das evidências enviadas ao analyst (ex: 2000); None desliga a seleção
+    evidence_token_budget: Optional[int] = Field(default=None)
+    # Roda o planner em paralelo com o entry (plano descartado se o post for irrelevante)
+    speculative_planner: bool = Field(default=False)
+    # Cascata do analyst: scores nesta faixa (inclusive) escalam para ``analyst_escalation``
+    escalation_band: Tuple[float, float] = Field(default=(0.3, 0.7))
+    # Memoização das saídas dos nós (src.utils.stage_cache.StageCache, avaliação); None desliga
+    stage_cache: Any = Field(default=None)
+    # Vereditos por afirmação (src.utils.claim_cache.ClaimVerdictCache); None desliga
+    claim_cache: Any = Field(default=None)
+    # Texto dos trechos das buscas (src.utils.snippet_store.SnippetStore); None usa o do processo
+    snippet_store: Any = Field(default=None)
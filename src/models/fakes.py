@@ -0,0 +1,211 @@
+"""
+Substitutos determinísticos do modelo de chat e do Tavily, para benchmarks e
+execuções offline (sem Ollama e sem créditos do Tavily).
+
+Injetados pelo ``RuntimeContext`` como os clientes reais:
+
+    context = {
+        "models_registry": FakeModelsRegistry(model=FakeChatModel(latency_median_s=0.3)),
+        "tavily": FakeTavilyClient(latency_median_s=0.5),
+    }
+
+A mesma entrada gera sempre a mesma saída (relevância, score, latência e
+tokens são sorteados com semente derivada do conteúdo da chamada).
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+import typing
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+from pydantic import Field
+
+from src.models.context import ModelConfig, ModelConfigType, ModelsRegistry
+from src.models.pool import ModelClientPool
+
+_BATCH_LINE_RE = re.compile(r"^\[(\d+)\]\s*(.*)$", re.M)
+
+
+def _rng(*parts: Any) -> random.Random:
+    digest = hashlib.blake2b("\x1f".join(map(str, parts)).encode("utf-8"), digest_size=8)
+    return random.Random(int.from_bytes(digest.digest(), "big"))
+
+
+def _lognormal(rng: random.Random, median: float, sigma: float) -> float:
+    """Latência com mediana ``median`` (``sigma`` 0 = fixa)."""
+    if median <= 0:
+        return 0.0
+    return median * math.exp(sigma * rng.gauss(0.0, 1.0)) if sigma else median
+
+
+def is_relevant(post: str, relevance_ratio: float, seed: int = 0) -> bool:
+    """Decisão de relevância do ``FakeChatModel`` para um post (determinística)."""
+    return _rng(seed, "relevance", " ".join(post.split())).random() < relevance_ratio
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Modelo de chat falso que devolve payloads válidos para os schemas dos nós
+    (``RelevanceAnalysis``, ``Queries``, ``Response``, ``TriagePlan``,
+    ``BatchRelevanceAnalysis``, ...) e texto livre para o planner.
+
+    A latência de cada chamada segue uma lognormal (``latency_median_s``,
+    ``latency_sigma``) mais ``seconds_per_token`` por token gerado. O uso de
+    tokens é reportado em ``usage_metadata`` como num modelo real.
+    """
+
+    relevance_ratio: float = 0.5  # fração dos posts considerados relevantes
+    latency_median_s: float = 0.0
+    latency_sigma: float = 0.0
+    seconds_per_token: float = 0.0
+    completion_tokens: int = 60
+    num_queries: int = 3
+    seed: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def with_structured_output(self, schema: Any, include_raw: bool = False, **kwargs):
+        """Saída estruturada: o payload é gerado a partir dos campos de ``schema``."""
+
+        def parse(message: AIMessage):
+            if not include_raw:
+                return schema.model_validate_json(message.content)
+            # Como os modelos do LangChain: com include_raw o erro vem no dict
+            try:
+                return {"raw": message, "parsed": schema.model_validate_json(message.content), "parsing_error": None}
+            except ValueError as e:
+                return {"raw": message, "parsed": None, "parsing_error": e}
+
+        return self.bind(output_schema=schema) | RunnableLambda(parse)
+
+    # Geração
+
+    def _payload(self, messages: List[BaseMessage], schema: Optional[type]) -> str:
+        post = str(messages[-1].content) if messages else ""
+        rng = _rng(self.seed, schema.__name__ if schema else "text", post)
+        if schema is None:
+            return " ".join(f"fato-{rng.randrange(1000)}" for _ in range(self.completion_tokens))
+        return json.dumps(self._fields(schema, post, rng), ensure_ascii=False)
+
+    def _fields(self, schema: type, post: str, rng: random.Random) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {}
+        relevant = is_relevant(post, self.relevance_ratio, self.seed)
+        for name, field in schema.model_fields.items():
+            annotation = field.annotation
+            if name == "results":
+                # Triagem em lote: um resultado por linha "[i] post"
+                item = typing.get_args(annotation)[0]
+                payload[name] = [
+                    {**self._fields(item, text, _rng(self.seed, "batch", text)), "id": post_id}
+                    for post_id, text in _BATCH_LINE_RE.findall(post)
+                ]
+            elif name == "relevant":
+                payload[name] = relevant
+            elif name == "queries":
+                payload[name] = [f"query {i} {rng.randrange(10_000)}" for i in range(self.num_queries)]
+            elif annotation is float:
+                payload[name] = round(rng.random(), 3)
+            elif annotation is bool:
+                payload[name] = rng.random() < 0.5
+            else:
+                payload[name] = f"{name} {rng.randrange(10_000)}"
+        return payload
+
+    def _result(self, messages: List[BaseMessage], schema: Optional[type]) -> tuple:
+        content = self._payload(messages, schema)
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4
+        rng = _rng(self.seed, "latency", content)
+        delay = (
+            _lognormal(rng, self.latency_median_s, self.latency_sigma)
+            + self.seconds_per_token * self.completion_tokens
+        )
+        message = AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": self.completion_tokens,
+                "total_tokens": prompt_tokens + self.completion_tokens,
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)]), delay
+
+    def _generate(self, messages, stop=None, run_manager=None, output_schema=None, **kwargs):
+        result, delay = self._result(messages, output_schema)
+        if delay:
+            time.sleep(delay)
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, output_schema=None, **kwargs):
+        result, delay = self._result(messages, output_schema)
+        if delay:
+            await asyncio.sleep(delay)
+        return result
+
+
+class FakeTavilyClient:
+    """
+    Substituto do ``TavilyClient`` (mesma interface ``search``), com latência
+    lognormal e resultados determinísticos por query.
+    """
+
+    def __init__(
+        self,
+        latency_median_s: float = 0.0,
+        latency_sigma: float = 0.0,
+        content_words: int = 120,
+        seed: int = 0,
+    ):
+        self.latency_median_s = latency_median_s
+        self.latency_sigma = latency_sigma
+        self.content_words = content_words
+        self.seed = seed
+        self.calls = 0
+
+    def search(self, query: str, max_results: int = 5, **kwargs) -> Dict[str, Any]:
+        self.calls += 1
+        rng = _rng(self.seed, "tavily", query)
+        delay = _lognormal(rng, self.latency_median_s, self.latency_sigma)
+        if delay:
+            time.sleep(delay)
+        page = rng.randrange(10_000)
+        results = []
+        for i in range(max_results):
+            words = " ".join(f"palavra{rng.randrange(5000)}" for _ in range(self.content_words))
+            results.append(
+                {
+                    "url": f"https://example.org/{page}/{i}",
+                    "title": f"{query} ({i})",
+                    "content": f"{query}. {words}.",
+                    "score": round(rng.random(), 3),
+                }
+            )
+        return {"query": query, "results": results, "response_time": delay}
+
+
+class FakeModelsRegistry(ModelsRegistry):
+    """
+    Registry em que todos os nodes usam ``model`` (um ``FakeChatModel``).
+
+    Tem pool próprio, para não misturar com os clientes reais do processo.
+    """
+
+    entry: ModelConfigType = Field(default="fake")
+    planner: ModelConfigType = Field(default="fake")
+    researcher: ModelConfigType = Field(default="fake")
+    analyst: ModelConfigType = Field(default="fake")
+    model: FakeChatModel = Field(default_factory=FakeChatModel, exclude=True)
+    pool: Optional[ModelClientPool] = Field(default_factory=ModelClientPool, exclude=True)
+
+    def _create_model(self, config: ModelConfig) -> BaseChatModel:
+        return self.model
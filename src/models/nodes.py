@@ -1,22 +1,76 @@
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from pydantic import ValidationError
+
 from src.models.prompts import (
     ENTRY_PROMPT,
     RESEARCHER_PROMPT,
     PLAN_PROMPT,
     ANALYST_PROMPT,
+    ANALYST_CLAIMS_PROMPT,
+    CLAIM_AGGREGATION_PROMPT,
+    TRIAGE_PROMPT,
+    TRIAGE_ANALYSIS_PROMPT,
 )
 from src.models.state import AgentState
 from src.models.context import RuntimeContext
-from src.models.schemas import Queries, RelevanceAnalysis, Response
+from src.models.schemas import (
+    ClaimsResponse,
+    Queries,
+    RelevanceAnalysis,
+    Response,
+    TriageAnalysis,
+    TriagePlan,
+)
+from langchain_core.exceptions import OutputParserException
 from langchain_core.messages import SystemMessage, HumanMessage
 from langgraph.runtime import Runtime
-from src.utils.observability import track_node_metrics
+from src.utils.observability import (
+    increment_node_counter,
+    set_node_metric,
+    track_node_metrics,
+)
+from src.utils.claim_cache import compact_references, format_verdicts, split_claims
+from src.utils.evidence import select_evidence
+from src.utils.search import search_queries, asearch_queries
+from src.utils.search_cache import CachedTavilyClient
+from src.utils.snippet_store import get_snippet_store
+
+
+def _tavily(runtime: Runtime[RuntimeContext]):
+    """Cliente de busca do post, passando pelo ``RuntimeContext.search_cache`` se houver."""
+    cache = runtime.context.search_cache
+    if cache is None:
+        return runtime.context.tavily
+    return CachedTavilyClient(runtime.context.tavily, cache)
+
+
+def _prefilter(state: AgentState, runtime: Runtime[RuntimeContext]) -> Optional[dict]:
+    prefilter = runtime.context.prefilter
+    if prefilter is None:
+        return None
+    reason = prefilter.check(state.post)
+    if reason is None:
+        return {}
+    # Rejeitado com alta confiança: o grafo segue direto para END
+    return {"relevance_analysis": RelevanceAnalysis(relevant=False, reasoning=reason)}
+
+
+@track_node_metrics("prefilter", base_model="lexical")
+def prefilter_node(state: AgentState, runtime: Runtime[RuntimeContext]):
+    return _prefilter(state, runtime)
 
 
 @track_node_metrics("entry")
 def entry_node(state: AgentState, runtime: Runtime[RuntimeContext]):
     messages = [SystemMessage(content=ENTRY_PROMPT), HumanMessage(content=state.post)]
-    entry_model = runtime.context.models_registry.get_model("entry")
-    response = entry_model.with_structured_output(RelevanceAnalysis).invoke(messages)
+    entry_model = runtime.context.models_registry.get_structured_model("entry", RelevanceAnalysis)
+    response = entry_model.invoke(messages)
     return {"relevance_analysis": response}
 
 
@@ -25,14 +79,13 @@ def plan_node(state: AgentState, runtime: Runtime[RuntimeContext]):
     messages = [SystemMessage(content=PLAN_PROMPT), HumanMessage(content=state.post)]
     planner_model = runtime.context.models_registry.get_model("planner")
     response = planner_model.invoke(messages)
-    return {"plan": response.content}
+    return {"plan": response.content, **_lookup_claims(response.content, state.post, runtime)}
 
 
 @track_node_metrics("researcher")
 def research_node(state: AgentState, runtime: Runtime[RuntimeContext]):
     # Chamada LLM para gerar queries
-    researcher_model = runtime.context.models_registry.get_model("researcher")
-    queries_model = researcher_model.with_structured_output(Queries)
+    queries_model = runtime.context.models_registry.get_structured_model("researcher", Queries)
     queries: Queries = queries_model.invoke(
         [
             SystemMessage(content=RESEARCHER_PROMPT),
@@ -40,34 +93,488 @@ def research_node(state: AgentState, runtime: Runtime[RuntimeContext]):
         ]
     )
 
-    content = state.content
+    content = state.content_ids
     if isinstance(content, str):
         content = [content]
 
-    all_responses = []
-    for q in queries.queries:
-        response = runtime.context.tavily.search(query=q, max_results=2)
-        for r in response["results"]:
-            content.append(r["content"])
-        all_responses.append(response)
-    return {"content": content, "references": all_responses}
+    new_content, all_responses = search_queries(
+        _tavily(runtime),
+        queries.queries,
+        max_results=2,
+        max_concurrency=runtime.context.max_search_concurrency,
+        snippet_store=runtime.context.snippet_store,
+    )
+    content.extend(new_content)
+    return {"content_ids": content, "references": all_responses}
 
 
-@track_node_metrics("analyst")
-def analyst_node(state: AgentState, runtime: Runtime[RuntimeContext]):
-    content = "\n\n".join(state.content or [])
+def _snippets(state: AgentState, runtime: Runtime[RuntimeContext]) -> List[str]:
+    """Texto dos trechos de ``state.content_ids`` (hashes), lido do SnippetStore."""
+    store = runtime.context.snippet_store
+    if store is None:
+        store = get_snippet_store()
+    return store.texts(state.content_ids or [])
 
-    user_message = HumanMessage(
-        content=f"{state.post}\n\nHere is my plan:\n\n{state.plan}"
+
+def _select_evidence(state: AgentState, runtime: Runtime[RuntimeContext]) -> Optional[dict]:
+    budget = runtime.context.evidence_token_budget
+    if budget is None:
+        return None
+    selection = select_evidence(
+        _snippets(state, runtime), f"{state.post}\n{state.plan}", token_budget=budget
     )
+    increment_node_counter("tokens_saved", selection.tokens_saved)
+    set_node_metric("passage_ids", selection.passage_ids)
+    return {"evidence": selection.passages}
+
+
+@track_node_metrics("evidence", base_model="bm25")
+def evidence_node(state: AgentState, runtime: Runtime[RuntimeContext]):
+    return _select_evidence(state, runtime)
+
 
-    messages = [
+def _analyst_messages(
+    state: AgentState, runtime: Runtime[RuntimeContext], with_claims: bool = False
+) -> list:
+    passages = state.evidence if state.evidence is not None else _snippets(state, runtime)
+    content = "\n\n".join(passages or [])
+
+    user_message = f"{state.post}\n\nHere is my plan:\n\n{state.plan}"
+    if with_claims:
+        # Veredito por afirmação, para o cache de afirmações
+        claims = "\n".join(f"[{i}] {claim}" for i, claim in enumerate(state.claims, 1))
+        user_message += "\n\n" + ANALYST_CLAIMS_PROMPT.format(claims=claims)
+
+    return [
         SystemMessage(content=ANALYST_PROMPT.format(content=content)),
-        user_message,
+        HumanMessage(content=user_message),
+    ]
+
+
+# Cache de afirmações (ligado por ``RuntimeContext.claim_cache``): o plano é
+# dividido em afirmações atômicas e cada uma é buscada no cache. Com todas em
+# cache, o grafo pula a pesquisa e o analyst só agrega os vereditos; senão o
+# analyst devolve também um veredito por afirmação, que vai para o cache.
+
+
+def _lookup_claims(plan: str, post: str, runtime: Runtime[RuntimeContext]) -> dict:
+    claim_cache = runtime.context.claim_cache
+    if claim_cache is None:
+        return {}
+    claims = split_claims(plan, post)
+    verdicts = []
+    for claim in claims:
+        verdict = claim_cache.get_verdict(claim, post)
+        increment_node_counter("claim_hits" if verdict is not None else "claim_misses")
+        if verdict is not None:
+            verdicts.append(verdict)
+    return {"claims": claims, "claim_verdicts": verdicts}
+
+
+def _aggregation_messages(state: AgentState) -> list:
+    return [
+        SystemMessage(content=CLAIM_AGGREGATION_PROMPT.format(verdicts=format_verdicts(state.claim_verdicts))),
+        HumanMessage(content=state.post),
     ]
 
-    analyst_model = runtime.context.models_registry.get_model("analyst")
-    structured_llm = analyst_model.with_structured_output(Response)
-    response = structured_llm.invoke(messages)
 
-    return {"response": response}
+def _records_claims(state: AgentState, runtime: Runtime[RuntimeContext]) -> bool:
+    return runtime.context.claim_cache is not None and bool(state.claims)
+
+
+def _store_claim_verdicts(
+    state: AgentState,
+    runtime: Runtime[RuntimeContext],
+    response: Optional[Response],
+    store: bool = True,
+) -> Optional[Response]:
+    """Grava no cache (se ``store``) o veredito de cada afirmação e devolve a resposta do post."""
+    if not isinstance(response, ClaimsResponse):
+        return response
+    references = compact_references(state.references) if store else []
+    for verdict in response.results if store else []:
+        index = int(verdict.id) - 1 if verdict.id.strip().isdigit() else -1
+        if 0 <= index < len(state.claims):
+            runtime.context.claim_cache.set_verdict(
+                state.claims[index], verdict.score, verdict.justification, references, post=state.post
+            )
+    return Response(score=response.score, justification=response.justification)
+
+
+# Cascata do analyst (ligada por ``ModelsRegistry.analyst_escalation``): o
+# analyst roda no modelo barato e o post escala para o modelo mais forte quando
+# o score cai em ``RuntimeContext.escalation_band`` ou a resposta estruturada
+# não pode ser lida. O escalonamento tenta até ``state.max_revisions`` vezes
+# (falhas de parsing) e cada tentativa incrementa ``state.revision_number``.
+# As duas tentativas ficam em ``metrics`` ("analyst" e "analyst_escalation").
+
+_PARSE_ERRORS = (OutputParserException, ValidationError)
+
+
+def _cascade_enabled(state: AgentState, runtime: Runtime[RuntimeContext]) -> bool:
+    return (
+        runtime.context.models_registry.analyst_escalation is not None
+        and state.revision_number < state.max_revisions
+    )
+
+
+def _analyst_update(
+    state: AgentState, runtime: Runtime[RuntimeContext], response: Optional[Response]
+) -> dict:
+    """
+    Registra o score e decide se o post escala (``response`` None = falha de
+    parsing). Vereditos por afirmação de um post que escala não vão para o
+    cache: o escalonamento grava os do modelo forte.
+    """
+    if response is None:
+        return {"needs_escalation": True}
+    set_node_metric("score", response.score)
+    low, high = runtime.context.escalation_band
+    needs_escalation = low <= response.score <= high
+    return {
+        "response": _store_claim_verdicts(state, runtime, response, store=not needs_escalation),
+        "needs_escalation": needs_escalation,
+    }
+
+
+@track_node_metrics("analyst")
+def analyst_node(state: AgentState, runtime: Runtime[RuntimeContext]):
+    models_registry = runtime.context.models_registry
+    if state.claims_resolved:
+        # Todas as afirmações com veredito em cache: só agrega, sem evidências
+        aggregator = models_registry.get_structured_model("analyst", Response)
+        return {"response": aggregator.invoke(_aggregation_messages(state))}
+
+    with_claims = _records_claims(state, runtime)
+    structured_llm = models_registry.get_structured_model(
+        "analyst", ClaimsResponse if with_claims else Response
+    )
+    messages = _analyst_messages(state, runtime, with_claims)
+
+    if not _cascade_enabled(state, runtime):
+        response = structured_llm.invoke(messages)
+        return {"response": _store_claim_verdicts(state, runtime, response)}
+
+    try:
+        response = structured_llm.invoke(messages)
+    except _PARSE_ERRORS:
+        response = None
+    return _analyst_update(state, runtime, response)
+
+
+# Variantes assíncronas dos nós (usadas por ``graph.ainvoke``/``abatch``)
+
+
+@track_node_metrics("prefilter", base_model="lexical")
+async def aprefilter_node(state: AgentState, runtime: Runtime[RuntimeContext]):
+    return _prefilter(state, runtime)
+
+
+@track_node_metrics("entry")
+async def aentry_node(state: AgentState, runtime: Runtime[RuntimeContext]):
+    # Triagem em lote com outros posts em andamento, se configurada
+    batcher = runtime.context.entry_batcher
+    if batcher is not None:
+        response = await batcher.classify(state.post)
+        if response is not None:
+            return {"relevance_analysis": response}
+
+    messages = [SystemMessage(content=ENTRY_PROMPT), HumanMessage(content=state.post)]
+    entry_model = runtime.context.models_registry.get_structured_model("entry", RelevanceAnalysis)
+    response = await entry_model.ainvoke(messages)
+    return {"relevance_analysis": response}
+
+
+@track_node_metrics("planner")
+async def aplan_node(state: AgentState, runtime: Runtime[RuntimeContext]):
+    messages = [SystemMessage(content=PLAN_PROMPT), HumanMessage(content=state.post)]
+    planner_model = runtime.context.models_registry.get_model("planner")
+    response = await planner_model.ainvoke(messages)
+    return {"plan": response.content, **_lookup_claims(response.content, state.post, runtime)}
+
+
+@track_node_metrics("researcher")
+async def aresearch_node(state: AgentState, runtime: Runtime[RuntimeContext]):
+    # Chamada LLM para gerar queries
+    queries_model = runtime.context.models_registry.get_structured_model("researcher", Queries)
+    queries: Queries = await queries_model.ainvoke(
+        [
+            SystemMessage(content=RESEARCHER_PROMPT),
+            HumanMessage(content=f"PLAN: {state.plan}"),
+        ]
+    )
+
+    content = state.content_ids
+    if isinstance(content, str):
+        content = [content]
+
+    new_content, all_responses = await asearch_queries(
+        _tavily(runtime),
+        queries.queries,
+        max_results=2,
+        max_concurrency=runtime.context.max_search_concurrency,
+        snippet_store=runtime.context.snippet_store,
+    )
+    content.extend(new_content)
+    return {"content_ids": content, "references": all_responses}
+
+
+@track_node_metrics("evidence", base_model="bm25")
+async def aevidence_node(state: AgentState, runtime: Runtime[RuntimeContext]):
+    return _select_evidence(state, runtime)
+
+
+@track_node_metrics("analyst")
+async def aanalyst_node(state: AgentState, runtime: Runtime[RuntimeContext]):
+    models_registry = runtime.context.models_registry
+    if state.claims_resolved:
+        # Todas as afirmações com veredito em cache: só agrega, sem evidências
+        aggregator = models_registry.get_structured_model("analyst", Response)
+        return {"response": await aggregator.ainvoke(_aggregation_messages(state))}
+
+    with_claims = _records_claims(state, runtime)
+    structured_llm = models_registry.get_structured_model(
+        "analyst", ClaimsResponse if with_claims else Response
+    )
+    messages = _analyst_messages(state, runtime, with_claims)
+
+    if not _cascade_enabled(state, runtime):
+        response = await structured_llm.ainvoke(messages)
+        return {"response": _store_claim_verdicts(state, runtime, response)}
+
+    try:
+        response = await structured_llm.ainvoke(messages)
+    except _PARSE_ERRORS:
+        response = None
+    return _analyst_update(state, runtime, response)
+
+
+# Planner especulativo: roda em paralelo com o entry (ligado por
+# ``RuntimeContext.speculative_planner``). O plano é aproveitado se o post for
+# relevante e descartado se não for; as métricas do entry registram a latência
+# ganha (``speculative_saved_s``) e os tokens desperdiçados
+# (``speculative_wasted_tokens``). O planner recebe uma cópia do estado com
+# ``metrics`` próprio, então o entry e o planner não disputam o mesmo dict.
+
+_speculation_executor: Optional[ThreadPoolExecutor] = None
+_speculation_executor_lock = threading.Lock()
+
+
+def _get_speculation_executor() -> ThreadPoolExecutor:
+    global _speculation_executor
+    with _speculation_executor_lock:
+        if _speculation_executor is None:
+            _speculation_executor = ThreadPoolExecutor(thread_name_prefix="speculative-planner")
+        return _speculation_executor
+
+
+def _speculation_result(
+    entry_result: dict, plan_result: Optional[dict], start_time: float, end_time: float
+) -> dict:
+    """Junta entry e plano especulativo e registra o ganho/desperdício nas métricas do entry."""
+    metrics = entry_result["metrics"]
+    entry_metrics = metrics["entry"]
+
+    if not entry_result["relevance_analysis"].relevant:
+        # Plano descartado; se ainda estava em andamento foi cancelado/abandonado
+        # e os tokens parciais não são observáveis
+        if plan_result is not None:
+            entry_metrics.speculative_wasted_tokens = plan_result["metrics"]["planner"].total_tokens
+        return entry_result
+
+    plan_metrics = plan_result["metrics"]["planner"]
+    sequential = entry_metrics.execution_time + plan_metrics.execution_time
+    entry_metrics.speculative_saved_s = max(0.0, sequential - (end_time - start_time))
+    plan_update = {k: v for k, v in plan_result.items() if k != "metrics"}
+    return {
+        **entry_result,
+        **plan_update,
+        "metrics": {**metrics, "planner": plan_metrics},
+    }
+
+
+def triage_node(state: AgentState, runtime: Runtime[RuntimeContext]):
+    if not runtime.context.speculative_planner:
+        return entry_node(state, runtime)
+
+    start_time = time.time()
+    plan_state = state.model_copy(update={"metrics": {}})
+    plan_future = _get_speculation_executor().submit(
+        contextvars.copy_context().run, plan_node, plan_state, runtime
+    )
+    try:
+        entry_result = entry_node(state, runtime)
+    except BaseException:
+        # Um planner já em execução não para; o resultado dele é descartado
+        plan_future.cancel()
+        raise
+
+    if entry_result["relevance_analysis"].relevant:
+        plan_result = plan_future.result()
+    else:
+        plan_result = None
+        if plan_future.done() and not plan_future.cancelled() and plan_future.exception() is None:
+            plan_result = plan_future.result()
+        plan_future.cancel()
+    return _speculation_result(entry_result, plan_result, start_time, time.time())
+
+
+async def atriage_node(state: AgentState, runtime: Runtime[RuntimeContext]):
+    if not runtime.context.speculative_planner:
+        return await aentry_node(state, runtime)
+
+    start_time = time.time()
+    plan_state = state.model_copy(update={"metrics": {}})
+    plan_task = asyncio.create_task(aplan_node(plan_state, runtime))
+    try:
+        entry_result = await aentry_node(state, runtime)
+    except BaseException:
+        plan_task.cancel()
+        raise
+
+    if entry_result["relevance_analysis"].relevant:
+        plan_result = await plan_task
+    else:
+        plan_result = None
+        if plan_task.done() and not plan_task.cancelled() and plan_task.exception() is None:
+            plan_result = plan_task.result()
+        plan_task.cancel()
+    return _speculation_result(entry_result, plan_result, start_time, time.time())
+
+
+# Nós do grafo v2 (passagem única): uma chamada structured-output devolve
+# relevância, plano e queries; a busca não chama LLM.
+
+
+def _triage_messages(state: AgentState, prompt: str) -> list:
+    return [SystemMessage(content=prompt), HumanMessage(content=state.post)]
+
+
+def _triage_update(response: TriagePlan) -> dict:
+    update = {
+        "relevance_analysis": RelevanceAnalysis(
+            relevant=response.relevant, reasoning=response.reasoning
+        ),
+        "plan": response.plan,
+        "queries": response.queries[:3],
+    }
+    if isinstance(response, TriageAnalysis):
+        update["response"] = Response(
+            score=response.score, justification=response.justification
+        )
+    return update
+
+
+@track_node_metrics("triage")
+def fused_triage_node(state: AgentState, runtime: Runtime[RuntimeContext]):
+    model = runtime.context.models_registry.get_structured_model("triage", TriagePlan)
+    response = model.invoke(
+        _triage_messages(state, TRIAGE_PROMPT)
+    )
+    return _triage_update(response)
+
+
+@track_node_metrics("triage")
+def fused_analysis_node(state: AgentState, runtime: Runtime[RuntimeContext]):
+    model = runtime.context.models_registry.get_structured_model("triage", TriageAnalysis)
+    response = model.invoke(
+        _triage_messages(state, TRIAGE_ANALYSIS_PROMPT)
+    )
+    return _triage_update(response)
+
+
+@track_node_metrics("search", base_model="tavily")
+def search_node(state: AgentState, runtime: Runtime[RuntimeContext]):
+    content, references = search_queries(
+        _tavily(runtime),
+        state.queries,
+        max_results=2,
+        max_concurrency=runtime.context.max_search_concurrency,
+        snippet_store=runtime.context.snippet_store,
+    )
+    return {"content_ids": list(state.content_ids or []) + content, "references": references}
+
+
+@track_node_metrics("triage")
+async def afused_triage_node(state: AgentState, runtime: Runtime[RuntimeContext]):
+    model = runtime.context.models_registry.get_structured_model("triage", TriagePlan)
+    response = await model.ainvoke(
+        _triage_messages(state, TRIAGE_PROMPT)
+    )
+    return _triage_update(response)
+
+
+@track_node_metrics("triage")
+async def afused_analysis_node(state: AgentState, runtime: Runtime[RuntimeContext]):
+    model = runtime.context.models_registry.get_structured_model("triage", TriageAnalysis)
+    response = await model.ainvoke(
+        _triage_messages(state, TRIAGE_ANALYSIS_PROMPT)
+    )
+    return _triage_update(response)
+
+
+@track_node_metrics("search", base_model="tavily")
+async def asearch_node(state: AgentState, runtime: Runtime[RuntimeContext]):
+    content, references = await asearch_queries(
+        _tavily(runtime),
+        state.queries,
+        max_results=2,
+        max_concurrency=runtime.context.max_search_concurrency,
+        snippet_store=runtime.context.snippet_store,
+    )
+    return {"content_ids": list(state.content_ids or []) + content, "references": references}
+
+
+# Escalonamento da cascata do analyst
+
+
+def _escalation_result(state: AgentState, response: Optional[Response], revision: int) -> dict:
+    if response is None:
+        # Nenhuma tentativa válida: fica a resposta do modelo barato, se houver
+        if state.metrics.get("analyst") is None or state.metrics["analyst"].score is None:
+            raise OutputParserException("analyst_escalation: no parsable response")
+        return {"revision_number": revision, "needs_escalation": False}
+    set_node_metric("score", response.score)
+    return {"response": response, "revision_number": revision, "needs_escalation": False}
+
+
+@track_node_metrics("analyst_escalation")
+def escalation_node(state: AgentState, runtime: Runtime[RuntimeContext]):
+    with_claims = _records_claims(state, runtime)
+    structured_llm = runtime.context.models_registry.get_structured_model(
+        "analyst_escalation", ClaimsResponse if with_claims else Response
+    )
+    messages = _analyst_messages(state, runtime, with_claims)
+
+    # A resposta do modelo forte é final mesmo se incerta; só falhas de
+    # parsing são tentadas de novo
+    response = None
+    revision = state.revision_number
+    while response is None and revision < state.max_revisions:
+        revision += 1
+        try:
+            response = structured_llm.invoke(messages)
+        except _PARSE_ERRORS:
+            response = None
+    response = _store_claim_verdicts(state, runtime, response)
+    return _escalation_result(state, response, revision)
+
+
+@track_node_metrics("analyst_escalation")
+async def aescalation_node(state: AgentState, runtime: Runtime[RuntimeContext]):
+    with_claims = _records_claims(state, runtime)
+    structured_llm = runtime.context.models_registry.get_structured_model(
+        "analyst_escalation", ClaimsResponse if with_claims else Response
+    )
+    messages = _analyst_messages(state, runtime, with_claims)
+
+    response = None
+    revision = state.revision_number
+    while response is None and revision < state.max_revisions:
+        revision += 1
+        try:
+            response = await structured_llm.ainvoke(messages)
+        except _PARSE_ERRORS:
+            response = None
+    response = _store_claim_verdicts(state, runtime, response)
+    return _escalation_result(state, response, revision)
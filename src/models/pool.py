@@ -0,0 +1,352 @@
+import asyncio
+import json
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from src.models.resilience import EndpointGuard, ResilienceConfig, ResilientModel
+from src.models.routing import EndpointBalancer, RoutedModel
+from src.models.wrappers import RunnableWrapper
+
+DEFAULT_IDLE_TTL = 30 * 60  # segundos sem uso até o cliente ser descartado
+
+OLLAMA_DEFAULT_PORT = 11434
+# Prefixos "provider:modelo" aceitos pelo init_chat_model; em "llama3.1:8b" o
+# que vem antes do ":" é o nome do modelo, não o provider
+KNOWN_PROVIDERS = frozenset(
+    """openai anthropic azure_openai azure_ai google_vertexai google_genai google_anthropic_vertex
+    bedrock bedrock_converse cohere fireworks together mistralai huggingface groq ollama
+    deepseek xai perplexity ibm nvidia""".split()
+)
+
+
+def infer_provider(config: Any) -> Optional[str]:
+    """
+    Provider de um ModelConfig: o configurado, o prefixo ``provider:`` do nome
+    (só providers conhecidos) ou ``ollama`` quando a URL usa a porta padrão dele.
+    """
+    if config.model_provider:
+        return config.model_provider
+    prefix = config.model.split(":", 1)[0] if ":" in config.model else None
+    if prefix in KNOWN_PROVIDERS:
+        return prefix
+    urls = [config.base_url] if config.base_url else list(getattr(config, "base_urls", None) or [])
+    for url in urls:
+        try:
+            if urlparse(url).port == OLLAMA_DEFAULT_PORT:
+                return "ollama"
+        except ValueError:
+            continue
+    return None
+
+
+def endpoint_key(config: Any) -> str:
+    """Identifica o servidor de um ModelConfig (base_url, ou o provider quando não há URL)."""
+    if config.base_url:
+        return config.base_url.rstrip("/")
+    return infer_provider(config) or "default"
+
+
+def config_key(config: Any) -> str:
+    """Chave de cache de um ModelConfig (pydantic não-frozen não é hashable)."""
+    return config.model_dump_json()
+
+
+class EndpointLimiter:
+    """
+    Limita chamadas simultâneas a um endpoint.
+
+    Chamadas síncronas (threads) e assíncronas (por event loop) usam semáforos
+    separados, cada um com o mesmo limite.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self._sync = threading.BoundedSemaphore(limit)
+        self._async: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    def _async_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._async.get(loop)
+            if semaphore is None:
+                semaphore = self._async[loop] = asyncio.Semaphore(self.limit)
+            return semaphore
+
+    def _enter(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def _exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+class ConcurrencyLimitedModel(RunnableWrapper):
+    """Modelo cujas chamadas passam pelo ``EndpointLimiter`` do seu endpoint."""
+
+    def __init__(self, bound: Any, limiter: EndpointLimiter):
+        super().__init__(bound)
+        self.limiter = limiter
+
+    def _call(self, call):
+        with self.limiter._sync:
+            self.limiter._enter()
+            try:
+                return call()
+            finally:
+                self.limiter._exit()
+
+    async def _acall(self, acall):
+        async with self.limiter._async_semaphore():
+            self.limiter._enter()
+            try:
+                return await acall()
+            finally:
+                self.limiter._exit()
+
+
+class ModelClientPool:
+    """
+    Pool de clientes de chat compartilhado pelo processo inteiro.
+
+    - Um cliente por ModelConfig, criado uma única vez mesmo com várias threads
+      pedindo ao mesmo tempo (lock por chave); o cliente reaproveita sua sessão
+      HTTP entre posts e entre instâncias de ModelsRegistry
+    - Limite opcional de chamadas simultâneas por endpoint (``base_url``)
+    - Clientes sem uso há mais de ``idle_ttl`` segundos são descartados
+    - Opcional: limite de taxa adaptativo, retries e circuit breaker por
+      endpoint (``resilience``/``endpoint_resilience``, ver
+      ``src.models.resilience``), compartilhados pelos modelos do endpoint
+    - ModelConfig com ``base_urls``: um cliente por URL e um ``RoutedModel``
+      que balanceia as chamadas entre elas (ver ``src.models.routing``)
+
+    Exemplo:
+        set_model_pool(ModelClientPool(endpoint_limits={"http://localhost:11434": 4}))
+    """
+
+    def __init__(
+        self,
+        default_limit: Optional[int] = None,
+        endpoint_limits: Optional[Dict[str, int]] = None,
+        idle_ttl: Optional[float] = DEFAULT_IDLE_TTL,
+        resilience: Optional[ResilienceConfig] = None,
+        endpoint_resilience: Optional[Dict[str, ResilienceConfig]] = None,
+        failure_threshold: int = 3,
+        ejection_s: float = 30.0,
+        health_check_interval_s: Optional[float] = None,
+    ):
+        self.default_limit = default_limit
+        self.endpoint_limits = {
+            k.rstrip("/"): v for k, v in (endpoint_limits or {}).items()
+        }
+        self.idle_ttl = idle_ttl
+        self.resilience = resilience
+        self.endpoint_resilience = {
+            k.rstrip("/"): v for k, v in (endpoint_resilience or {}).items()
+        }
+        # Roteamento entre as base_urls de um ModelConfig
+        self.failure_threshold = failure_threshold
+        self.ejection_s = ejection_s
+        self.health_check_interval_s = health_check_interval_s
+
+        self._clients: Dict[str, Any] = {}
+        self._last_used: Dict[str, float] = {}
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._limiters: Dict[str, EndpointLimiter] = {}
+        self._guards: Dict[str, EndpointGuard] = {}
+        self._balancers: Dict[str, EndpointBalancer] = {}
+        # (config, schema, include_raw, método) -> (cliente, runnable estruturado)
+        self._structured: Dict[Tuple[str, Any, bool, Optional[str]], Tuple[Any, Any]] = {}
+        self._lock = threading.Lock()
+        self._last_eviction = time.monotonic()
+
+        # Totais do processo
+        self.created = 0
+        self.evicted = 0
+
+    def _limiter_for(self, endpoint: str) -> Optional[EndpointLimiter]:
+        limit = self.endpoint_limits.get(endpoint, self.default_limit)
+        if limit is None:
+            return None
+        with self._lock:
+            limiter = self._limiters.get(endpoint)
+            if limiter is None:
+                limiter = self._limiters[endpoint] = EndpointLimiter(limit)
+            return limiter
+
+    def _guard_for(self, endpoint: str) -> Optional[EndpointGuard]:
+        config = self.endpoint_resilience.get(endpoint, self.resilience)
+        if config is None:
+            return None
+        with self._lock:
+            guard = self._guards.get(endpoint)
+            if guard is None:
+                guard = self._guards[endpoint] = EndpointGuard(endpoint, config)
+            return guard
+
+    def get(self, config: Any, factory: Callable[[Any], Any]) -> Any:
+        """Retorna o cliente para ``config``, criando-o com ``factory`` se necessário."""
+        key = config_key(config)
+        now = time.monotonic()
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._last_used[key] = now
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        if client is None:
+            # Só uma thread cria o cliente de uma mesma config
+            with key_lock:
+                with self._lock:
+                    client = self._clients.get(key)
+                if client is None:
+                    if getattr(config, "base_urls", None):
+                        client = self._create_routed(key, config, factory)
+                    else:
+                        client = self._create(config, factory)
+                    with self._lock:
+                        self._clients[key] = client
+                        self._last_used[key] = now
+                        self.created += 1
+
+        if self.idle_ttl is not None and now - self._last_eviction > self.idle_ttl / 4:
+            self.evict_idle()
+        return client
+
+    def _create(self, config: Any, factory: Callable[[Any], Any]) -> Any:
+        client = factory(config)
+        endpoint = endpoint_key(config)
+        limiter = self._limiter_for(endpoint)
+        if limiter is not None:
+            client = ConcurrencyLimitedModel(client, limiter)
+        # Por fora do limite de concorrência: o backoff não segura a vaga
+        guard = self._guard_for(endpoint)
+        if guard is not None:
+            client = ResilientModel(client, guard)
+        return client
+
+    def _create_routed(self, key: str, config: Any, factory: Callable[[Any], Any]) -> RoutedModel:
+        urls = [url.rstrip("/") for url in config.base_urls]
+        members = {
+            url: self.get(config.model_copy(update={"base_url": url, "base_urls": None}), factory)
+            for url in urls
+        }
+        with self._lock:
+            # O balanceador sobrevive ao descarte do cliente ocioso (mantém as estatísticas)
+            balancer = self._balancers.get(key)
+            if balancer is None:
+                balancer = self._balancers[key] = EndpointBalancer(
+                    urls,
+                    strategy=config.routing,
+                    failure_threshold=self.failure_threshold,
+                    ejection_s=self.ejection_s,
+                )
+                if self.health_check_interval_s:
+                    balancer.start_health_checks(self.health_check_interval_s)
+        return RoutedModel(members, balancer)
+
+    def get_structured(
+        self,
+        config: Any,
+        factory: Callable[[Any], Any],
+        schema: Any,
+        include_raw: bool = False,
+        method: Optional[str] = None,
+    ) -> Any:
+        """
+        ``StructuredModel`` de ``schema`` sobre o cliente de ``config``, montado
+        uma única vez (refeito só se o cliente for descartado e recriado).
+        """
+        from src.models.structured import StructuredModel
+
+        client = self.get(config, factory)
+        schema_key = schema if isinstance(schema, type) else json.dumps(schema, sort_keys=True)
+        key = (config_key(config), schema_key, include_raw, method)
+        with self._lock:
+            entry = self._structured.get(key)
+        if entry is not None and entry[0] is client:
+            return entry[1]
+        structured = StructuredModel(client, schema, include_raw=include_raw, method=method)
+        with self._lock:
+            self._structured[key] = (client, structured)
+        return structured
+
+    def evict_idle(self) -> int:
+        """Descarta clientes sem uso há mais de ``idle_ttl``. Retorna quantos saíram."""
+        if self.idle_ttl is None:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            self._last_eviction = now
+            expired = [k for k, t in self._last_used.items() if now - t > self.idle_ttl]
+            for key in expired:
+                self._clients.pop(key, None)
+                self._last_used.pop(key, None)
+                self._key_locks.pop(key, None)
+            if expired:
+                expired = set(expired)
+                for key in [k for k in self._structured if k[0] in expired]:
+                    del self._structured[key]
+            self.evicted += len(expired)
+        return len(expired)
+
+    def in_flight(self) -> Dict[str, int]:
+        """Chamadas em andamento por endpoint (só endpoints com limite)."""
+        with self._lock:
+            return {endpoint: l.in_flight for endpoint, l in self._limiters.items()}
+
+    def endpoint_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Por endpoint: retries, 429s, estado do circuito e taxa atual (com
+        ``resilience``); chamadas em andamento, latência média e saúde (endpoints
+        de ModelConfigs com ``base_urls``).
+        """
+        with self._lock:
+            guards = dict(self._guards)
+            balancers = list(self._balancers.values())
+        stats = {endpoint: guard.stats() for endpoint, guard in guards.items()}
+        for balancer in balancers:
+            for url, routing in balancer.stats().items():
+                entry = stats.setdefault(url, {})
+                for name, value in routing.items():
+                    if name in ("in_flight", "routed_calls", "routed_failures", "ejections"):
+                        # Vários modelos no mesmo endpoint: soma
+                        value += entry.get(name, 0)
+                    elif name == "latency_ewma_s" and entry.get(name) is not None:
+                        value = max(value or 0.0, entry[name])
+                    elif name == "healthy":
+                        value = value and entry.get(name, True)
+                    entry[name] = value
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+            self._last_used.clear()
+            self._key_locks.clear()
+            self._structured.clear()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+_default_pool = ModelClientPool()
+
+
+def get_model_pool() -> ModelClientPool:
+    """Pool usado por todos os ModelsRegistry que não recebem um pool próprio."""
+    return _default_pool
+
+
+def set_model_pool(pool: ModelClientPool):
+    """Substitui o pool padrão do processo (ex: para configurar limites por endpoint)."""
+    global _default_pool
+    _default_pool = pool
@@ -28,6 +28,14 @@ Exemplos (não repita, use apenas como guia):
 
 Seja objetivo e conciso no reasoning."""
 
+ENTRY_BATCH_PROMPT = ENTRY_PROMPT + """
+
+MODO LOTE:
+- Você receberá VÁRIOS posts, um por linha, no formato "[id] texto do post"
+- Avalie cada post de forma independente, com os mesmos critérios acima
+- Retorne no campo "results" exatamente um item por post, com "id" (o mesmo id recebido), "relevant" e "reasoning"
+- Não omita nenhum post e não invente ids"""
+
 PLAN_PROMPT = """Você é um agente especializado em análise de conteúdo de redes sociais. Sua tarefa é receber um post de rede social e identificar as bases factuais que precisam ser verificadas para determinar se o conteúdo é verdadeiro.
 
 Para cada post, você deve:
@@ -73,3 +81,39 @@ Seja objetivo, baseie-se apenas nas evidências encontradas e seja transparente
 Resultados das pesquisas:
 {content}
 """
+
+TRIAGE_PROMPT = ENTRY_PROMPT + """
+
+MODO PASSAGEM ÚNICA (triagem + plano + queries):
+Além de "relevant" e "reasoning", retorne:
+- "plan" (string): se o post for relevante, uma lista clara das bases factuais a verificar (datas, números, eventos, pessoas, organizações), priorizando as afirmações que, se falsas, invalidariam o post. Se não for relevante, string vazia
+- "queries" (lista de strings): se o post for relevante, no máximo 3 queries de busca específicas e objetivas para verificar as bases factuais mais críticas do plano, priorizando fontes confiáveis. Se não for relevante, lista vazia"""
+
+TRIAGE_ANALYSIS_PROMPT = TRIAGE_PROMPT + """
+
+Retorne também, com base apenas no seu conhecimento (sem pesquisa na web):
+- "score" (número entre 0 e 1): probabilidade de o post ser fake news (0.0 = muito provável que seja verdadeiro, 0.5 = incerto, 1.0 = muito provável que seja fake news). Se não for relevante, use 0.5
+- "justification" (string): justificativa concisa (2-4 frases) do score, explicitando limitações por não haver pesquisa. Se não for relevante, string vazia"""
+
+# Vai na mensagem do usuário, junto das afirmações: o system prompt continua
+# igual ao do analyst e as instruções não ficam depois de ``{content}``
+ANALYST_CLAIMS_PROMPT = """Claims:
+{claims}
+
+Retorne também, em "results", o veredito de cada afirmação acima (identificada por "[id]"):
+- "id" (string): o id da afirmação
+- "score" (número entre 0 e 1): probabilidade de a afirmação ser falsa, na mesma escala do score do post
+- "justification" (string): justificativa concisa (1-2 frases) com base nas pesquisas"""
+
+CLAIM_AGGREGATION_PROMPT = """Você é um analista especializado em detecção de fake news e verificação de fatos em redes sociais. As afirmações factuais deste post já foram verificadas anteriormente, com pesquisa na internet; os vereditos estão abaixo.
+
+Sua tarefa é apenas agregar esses vereditos:
+1. Considerar como as afirmações se combinam no post (uma afirmação central falsa torna o post enganoso, mesmo que as demais sejam verdadeiras)
+2. Determinar uma probabilidade (score) entre 0 e 1 de o post ser fake news (0.0 = muito provável que seja verdadeiro, 0.5 = incerto, 1.0 = muito provável que seja fake news)
+3. Fornecer uma justificativa clara e concisa (2-4 frases), citando os vereditos usados
+
+Baseie-se apenas nos vereditos abaixo.
+
+Vereditos das afirmações (score: probabilidade de a afirmação ser falsa):
+{verdicts}
+"""
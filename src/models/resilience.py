@@ -0,0 +1,421 @@
+"""
+Limite de taxa adaptativo, retries e circuit breaker por endpoint.
+
+Cada endpoint (servidor de modelos ou Tavily) tem um ``EndpointGuard``
+compartilhado por todas as chamadas do processo:
+
+- Token buckets de requisições/s e de tokens/min. A taxa de requisições é
+  adaptativa (AIMD): cai pela metade a cada 429 e volta a subir aos poucos a
+  cada sucesso, até o limite configurado. Assim o throughput se acomoda na
+  capacidade real do endpoint em vez de virar uma sequência de falhas
+- Retries com backoff exponencial e jitter (respeitando ``Retry-After``) para
+  erros transitórios: 429, 408, 5xx, timeouts e falhas de conexão
+- Circuit breaker: depois de ``failure_threshold`` falhas transitórias
+  seguidas (timeouts, 5xx, conexão; 429 só reduz a taxa) o endpoint é
+  considerado fora do ar e novas chamadas esperam ``reset_timeout_s`` (em vez de falhar); uma chamada de teste decide se ele
+  volta
+
+Exemplo:
+    set_model_pool(ModelClientPool(
+        resilience=ResilienceConfig(requests_per_s=4, tokens_per_min=60_000),
+    ))
+    tavily = create_tavily_client(api_key, resilience=ResilienceConfig(requests_per_s=5))
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from langchain_core.messages import convert_to_messages
+from langchain_core.runnables import RunnableConfig
+from pydantic import BaseModel, Field
+
+from src.models.wrappers import RunnableWrapper
+
+TRANSIENT_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+# Nomes de exceções transitórias de SDKs opcionais (httpx, requests, ollama,
+# openai, tavily), comparados pelo nome para não importar os pacotes
+TRANSIENT_NAMES = ("Timeout", "Connect", "RateLimit", "UsageLimitExceeded", "Overloaded", "ServiceUnavailable")
+RATE_LIMIT_NAMES = ("RateLimit", "UsageLimitExceeded")
+
+
+class ResilienceConfig(BaseModel):
+    """Política de um endpoint. Limites None = sem limite."""
+
+    requests_per_s: Optional[float] = Field(default=None, description="Teto de requisições por segundo")
+    tokens_per_min: Optional[int] = Field(default=None, description="Teto de tokens (prompt + completion) por minuto")
+    min_requests_per_s: float = Field(default=0.2, description="Piso da taxa adaptativa")
+    max_attempts: int = Field(default=4, description="Tentativas por chamada (1 = sem retry)")
+    base_delay_s: float = Field(default=0.5)
+    max_delay_s: float = Field(default=30.0)
+    failure_threshold: int = Field(default=5, description="Falhas transitórias seguidas até abrir o circuito")
+    reset_timeout_s: float = Field(default=30.0, description="Pausa com o circuito aberto")
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _names(exc: BaseException) -> str:
+    return " ".join(cls.__name__ for cls in type(exc).__mro__)
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    return _status_code(exc) == 429 or any(n in _names(exc) for n in RATE_LIMIT_NAMES)
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Erro que vale tentar de novo (o endpoint pode responder na próxima)."""
+    if isinstance(exc, (TimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return True
+    status = _status_code(exc)
+    if status is not None:
+        return status in TRANSIENT_STATUS
+    return any(n in _names(exc) for n in TRANSIENT_NAMES)
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Espera pedida pelo servidor (``Retry-After`` ou ``retry_after_seconds``)."""
+    value = getattr(exc, "retry_after_seconds", None)
+    if value is None:
+        headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+        value = headers.get("retry-after") if hasattr(headers, "get") else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _count(name: str, amount: float = 1):
+    # Import tardio: observability importa src.models
+    from src.utils.observability import increment_node_counter
+
+    increment_node_counter(name, amount)
+
+
+class TokenBucket:
+    """Token bucket thread-safe; ``acquire`` devolve quanto esperar antes de tentar de novo."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """
+        Consome ``amount`` e devolve 0, ou devolve quanto esperar sem consumir
+        nada. Sem reserva antecipada, uma mudança de ``rate`` vale na hora
+        para quem está esperando.
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) / self.rate
+
+    def adjust(self, amount: float):
+        """Corrige o consumo depois da chamada (ex: tokens reais vs estimados)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens - amount)
+
+
+class CircuitBreaker:
+    """
+    closed -> (``failure_threshold`` falhas seguidas) -> open -> (após
+    ``reset_timeout``) -> half-open: uma chamada de teste; sucesso fecha,
+    falha reabre. Uma chamada de teste que termina sem sucesso nem falha do
+    endpoint (429, erro da requisição, cancelamento) só libera a vaga para
+    outra: o circuito continua half-open até um sucesso de verdade.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened = 0  # vezes que o circuito abriu
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def wait_time(self) -> float:
+        """0 se a chamada pode seguir; senão, quanto esperar antes de perguntar de novo."""
+        with self._lock:
+            if self.state == "closed":
+                return 0.0
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                return remaining
+            if not self._probe_in_flight:
+                self.state = "half_open"
+                self._probe_in_flight = True
+                return 0.0
+            return min(1.0, self.reset_timeout)
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """Libera a chamada de teste sem sucesso nem falha; a próxima chamada faz o teste."""
+        with self._lock:
+            if self.state == "half_open":
+                self._probe_in_flight = False
+
+    def record_response(self):
+        """
+        O endpoint respondeu, mas com erro da requisição (ex: 400, parsing):
+        zera as falhas seguidas se fechado; em half-open só libera o teste.
+        """
+        with self._lock:
+            if self.state == "closed":
+                self.failures = 0
+            elif self.state == "half_open":
+                self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.opened += 1
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+
+class EndpointGuard:
+    """Limites, retries e circuit breaker de um endpoint (compartilhado entre chamadas)."""
+
+    def __init__(self, name: str, config: Optional[ResilienceConfig] = None):
+        self.name = name
+        self.config = config or ResilienceConfig()
+        c = self.config
+        # Sem rajadas: as requisições saem espaçadas em 1/taxa
+        self.requests = TokenBucket(c.requests_per_s, 1.0) if c.requests_per_s else None
+        self.tokens = (
+            TokenBucket(c.tokens_per_min / 60.0, c.tokens_per_min) if c.tokens_per_min else None
+        )
+        self.breaker = CircuitBreaker(c.failure_threshold, c.reset_timeout_s)
+        self._lock = threading.Lock()
+        self._successes: Deque[float] = deque(maxlen=256)
+        self._last_decrease = 0.0
+
+        # Totais do processo
+        self.calls = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.failures = 0
+        self.waited_s = 0.0
+
+    # Taxa adaptativa (AIMD)
+
+    def _on_success(self):
+        now = time.monotonic()
+        with self._lock:
+            self._successes.append(now)
+            if self.requests is None:
+                return
+            ceiling = self.config.requests_per_s or float("inf")
+            # Aumento aditivo: ~+1 req/s a cada segundo sem 429
+            rate = self.requests.rate
+            self.requests.rate = min(ceiling, rate + 1.0 / max(rate, 1.0))
+
+    def _on_rate_limited(self, sent_at: float):
+        now = time.monotonic()
+        with self._lock:
+            self.rate_limited += 1
+            # Chamadas enviadas antes da última redução (ou logo depois dela,
+            # enquanto a janela de cota do servidor ainda tem as antigas)
+            # refletem a taxa antiga: o 429 delas não reduz de novo
+            if sent_at < self._last_decrease or now - self._last_decrease < 1.0:
+                return
+            self._last_decrease = now
+            floor = self.config.min_requests_per_s
+            if self.requests is None:
+                # Sem limite configurado: começa da metade da vazão recente
+                window = [t for t in self._successes if t > now - 10.0]
+                observed = len(window) / 10.0
+                rate = max(floor, observed / 2)
+                self.requests = TokenBucket(rate, 1.0)
+            else:
+                self.requests.rate = max(floor, self.requests.rate / 2)
+
+    @property
+    def current_rate(self) -> Optional[float]:
+        return self.requests.rate if self.requests is not None else None
+
+    # Espera / backoff
+
+    def _acquire(self, estimated_tokens: int) -> float:
+        """Libera a chamada nos buckets (0) ou devolve quanto esperar."""
+        if self.requests is not None:
+            wait = self.requests.acquire(1)
+            if wait:
+                return wait
+        if self.tokens is not None and estimated_tokens:
+            wait = self.tokens.acquire(estimated_tokens)
+            if wait:
+                if self.requests is not None:
+                    self.requests.adjust(-1)  # devolve a requisição
+                return wait
+        return 0.0
+
+    def _backoff(self, attempt: int, exc: BaseException) -> float:
+        server_wait = retry_after(exc)
+        if server_wait is not None:
+            return min(server_wait, self.config.max_delay_s)
+        cap = min(self.config.max_delay_s, self.config.base_delay_s * 2 ** attempt)
+        return random.uniform(0, cap)  # full jitter
+
+    def _failed(self, exc: BaseException, attempt: int, sent_at: float) -> Optional[float]:
+        """Registra a falha; devolve o backoff se vale tentar de novo, None se não."""
+        if not is_transient(exc):
+            # Erro da requisição (ex: 400, parsing): o endpoint está respondendo
+            self.breaker.record_response()
+            return None
+        self.failures += 1
+        if is_rate_limited(exc):
+            # Endpoint ocupado, não fora do ar: reduz a taxa sem abrir o circuito
+            self._on_rate_limited(sent_at)
+            self.breaker.release_probe()
+        else:
+            self.breaker.record_failure()
+        if attempt + 1 >= self.config.max_attempts:
+            return None
+        self.retries += 1
+        _count("retries")
+        return self._backoff(attempt, exc)
+
+    def _succeeded(self, result: Any, estimated_tokens: int):
+        self.breaker.record_success()
+        self._on_success()
+        if self.tokens is not None:
+            used = _usage_tokens(result)
+            if used is not None:
+                self.tokens.adjust(used - estimated_tokens)
+
+    def _waited(self, seconds: float):
+        self.waited_s += seconds
+        _count("throttled_s", seconds)
+
+    def call(self, fn: Callable[[], Any], estimated_tokens: int = 0) -> Any:
+        self.calls += 1
+        attempt = 0
+        while True:
+            # Circuito aberto: a chamada espera o endpoint voltar em vez de falhar
+            while (wait := self.breaker.wait_time()) > 0:
+                self._waited(min(wait, 1.0))
+                time.sleep(min(wait, 1.0))
+            while (wait := self._acquire(estimated_tokens)) > 0:
+                self._waited(wait)
+                time.sleep(wait)
+            sent_at = time.monotonic()
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._failed(e, attempt, sent_at)
+                if delay is None:
+                    raise
+                self._waited(delay)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                # Interrompida (KeyboardInterrupt, ...): não prende a chamada de teste
+                self.breaker.release_probe()
+                raise
+            self._succeeded(result, estimated_tokens)
+            return result
+
+    async def acall(self, afn: Callable[[], Awaitable[Any]], estimated_tokens: int = 0) -> Any:
+        self.calls += 1
+        attempt = 0
+        while True:
+            # Circuito aberto: a chamada espera o endpoint voltar em vez de falhar
+            while (wait := self.breaker.wait_time()) > 0:
+                self._waited(min(wait, 1.0))
+                await asyncio.sleep(min(wait, 1.0))
+            while (wait := self._acquire(estimated_tokens)) > 0:
+                self._waited(wait)
+                await asyncio.sleep(wait)
+            sent_at = time.monotonic()
+            try:
+                result = await afn()
+            except Exception as e:
+                delay = self._failed(e, attempt, sent_at)
+                if delay is None:
+                    raise
+                self._waited(delay)
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                # Task cancelada: não prende a chamada de teste
+                self.breaker.release_probe()
+                raise
+            self._succeeded(result, estimated_tokens)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "failures": self.failures,
+            "waited_s": self.waited_s,
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.opened,
+            "requests_per_s": self.current_rate,
+        }
+
+
+def _usage_tokens(result: Any) -> Optional[int]:
+    if isinstance(result, dict):
+        result = result.get("raw")
+    usage = getattr(result, "usage_metadata", None)
+    return usage.get("total_tokens") if usage else None
+
+
+def estimate_prompt_tokens(input: Any) -> int:
+    """Estimativa de tokens do prompt (~4 caracteres por token)."""
+    try:
+        messages = convert_to_messages(input)
+    except Exception:
+        return 0
+    return sum(len(str(m.content)) for m in messages) // 4
+
+
+class ResilientModel(RunnableWrapper):
+    """Modelo cujas chamadas passam pelo ``EndpointGuard`` do seu endpoint."""
+
+    def __init__(self, bound: Any, guard: EndpointGuard, completion_tokens: int = 256):
+        super().__init__(bound)
+        self.guard = guard
+        # Reservado no bucket de tokens/min antes da chamada; corrigido depois pelo uso real
+        self.completion_tokens = completion_tokens
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        estimated = estimate_prompt_tokens(input) + self.completion_tokens
+        return self.guard.call(lambda: self.bound.invoke(input, config, **kwargs), estimated)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        estimated = estimate_prompt_tokens(input) + self.completion_tokens
+        return await self.guard.acall(lambda: self.bound.ainvoke(input, config, **kwargs), estimated)
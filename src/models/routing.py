@@ -0,0 +1,239 @@
+"""
+Roteamento de um modelo entre várias instâncias (ex: várias máquinas com Ollama).
+
+``ModelConfig(base_urls=[...])`` vira um ``RoutedModel``: um cliente por URL
+(cada um com o limite de concorrência e o ``EndpointGuard`` do seu endpoint no
+pool) e um ``EndpointBalancer`` que escolhe a URL de cada chamada:
+
+- ``least_outstanding``: menos chamadas em andamento (empate: menor latência)
+- ``latency``: menor espera estimada, latência média (EWMA) × (em andamento + 1)
+
+Um endpoint com ``failure_threshold`` falhas transitórias seguidas é ejetado
+por ``ejection_s`` segundos; a chamada que falhou é refeita em outro endpoint.
+Health checks ativos (GET na ``base_url``) são opcionais, em thread de fundo.
+
+Exemplo:
+    ModelsRegistry(
+        analyst=ModelConfig(
+            model="llama3.1:8b",
+            model_provider="ollama",
+            base_urls=["http://gpu-1:11434", "http://gpu-2:11434"],
+            routing="latency",
+        ),
+    )
+"""
+
+import random
+import threading
+import time
+import urllib.request
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from langchain_core.runnables import RunnableConfig
+
+from src.models.resilience import is_transient
+from src.models.wrappers import RunnableWrapper
+
+ROUTING_STRATEGIES = ("least_outstanding", "latency")
+
+
+class EndpointState:
+    """Estado de um endpoint no balanceador."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.in_flight = 0
+        self.latency_ewma: Optional[float] = None
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "latency_ewma_s": self.latency_ewma,
+            "routed_calls": self.calls,
+            "routed_failures": self.failures,
+            "ejections": self.ejections,
+            "healthy": self.healthy(time.monotonic()),
+        }
+
+
+class EndpointBalancer:
+    """Escolhe o endpoint de cada chamada e acompanha latência, carga e saúde. Thread-safe."""
+
+    def __init__(
+        self,
+        urls: Iterable[str],
+        strategy: str = "least_outstanding",
+        failure_threshold: int = 3,
+        ejection_s: float = 30.0,
+        ewma_alpha: float = 0.2,
+    ):
+        if strategy not in ROUTING_STRATEGIES:
+            raise ValueError(f"Unknown routing strategy '{strategy}' (expected one of {ROUTING_STRATEGIES})")
+        self.endpoints = {url: EndpointState(url) for url in urls}
+        if not self.endpoints:
+            raise ValueError("EndpointBalancer needs at least one endpoint")
+        self.strategy = strategy
+        self.failure_threshold = failure_threshold
+        self.ejection_s = ejection_s
+        self.ewma_alpha = ewma_alpha
+        self._lock = threading.Lock()
+        self._health_stop: Optional[threading.Event] = None
+
+    def _score(self, endpoint: EndpointState) -> tuple:
+        latency = endpoint.latency_ewma or 0.0  # sem medida ainda: experimenta primeiro
+        if self.strategy == "latency":
+            return (latency * (endpoint.in_flight + 1), endpoint.in_flight, random.random())
+        return (endpoint.in_flight, latency, random.random())
+
+    def acquire(self, exclude: Iterable[str] = ()) -> EndpointState:
+        """
+        Escolhe o endpoint da próxima chamada e o marca como ocupado. Com todos
+        ejetados, usa o que sai da ejeção primeiro (em vez de falhar).
+        """
+        exclude = set(exclude)
+        now = time.monotonic()
+        with self._lock:
+            candidates = [e for e in self.endpoints.values() if e.url not in exclude]
+            healthy = [e for e in candidates if e.healthy(now)]
+            if healthy:
+                endpoint = min(healthy, key=self._score)
+            else:
+                endpoint = min(candidates, key=lambda e: e.ejected_until)
+            endpoint.in_flight += 1
+            endpoint.calls += 1
+            return endpoint
+
+    def release(self, endpoint: EndpointState, elapsed: float, error: Optional[BaseException] = None):
+        with self._lock:
+            endpoint.in_flight -= 1
+            if error is None or not is_transient(error):
+                # Respondeu (mesmo que com erro da requisição): endpoint saudável
+                endpoint.consecutive_failures = 0
+                if error is None:
+                    previous = endpoint.latency_ewma
+                    endpoint.latency_ewma = (
+                        elapsed if previous is None
+                        else previous + self.ewma_alpha * (elapsed - previous)
+                    )
+                return
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.consecutive_failures >= self.failure_threshold:
+                self._eject(endpoint)
+
+    def _eject(self, endpoint: EndpointState):
+        if endpoint.healthy(time.monotonic()):
+            endpoint.ejections += 1
+        endpoint.ejected_until = time.monotonic() + self.ejection_s
+        endpoint.consecutive_failures = 0
+
+    # Health checks ativos
+
+    def check_health(self, timeout: float = 2.0, probe: Optional[Callable[[str], bool]] = None):
+        """Testa cada endpoint; os que não respondem são ejetados, os que voltaram são readmitidos."""
+        probe = probe or (lambda url: _http_probe(url, timeout))
+        for endpoint in list(self.endpoints.values()):
+            ok = probe(endpoint.url)
+            with self._lock:
+                if ok:
+                    endpoint.ejected_until = 0.0
+                    endpoint.consecutive_failures = 0
+                else:
+                    self._eject(endpoint)
+
+    def start_health_checks(self, interval_s: float = 10.0, timeout: float = 2.0):
+        """Roda ``check_health`` a cada ``interval_s`` numa thread daemon."""
+        if self._health_stop is not None:
+            return
+        stop = self._health_stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval_s):
+                self.check_health(timeout)
+
+        threading.Thread(target=run, name="endpoint-health", daemon=True).start()
+
+    def stop_health_checks(self):
+        if self._health_stop is not None:
+            self._health_stop.set()
+            self._health_stop = None
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {url: endpoint.stats() for url, endpoint in self.endpoints.items()}
+
+
+def _http_probe(url: str, timeout: float) -> bool:
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            return response.status < 500
+    except Exception:
+        return False
+
+
+class RoutedModel(RunnableWrapper):
+    """
+    Modelo servido por vários endpoints: cada chamada vai para o endpoint
+    escolhido pelo ``EndpointBalancer``; falhas transitórias são refeitas nos
+    outros endpoints antes de chegar ao nó.
+    """
+
+    def __init__(self, members: Dict[str, Any], balancer: EndpointBalancer):
+        super().__init__(next(iter(members.values())))
+        self.members = members
+        self.balancer = balancer
+
+    def _map(self, fn: Callable[[Any], Any]) -> "RoutedModel":
+        return RoutedModel({url: fn(member) for url, member in self.members.items()}, self.balancer)
+
+    def with_structured_output(self, *args, **kwargs) -> "RoutedModel":
+        return self._map(lambda member: member.with_structured_output(*args, **kwargs))
+
+    def bind_tools(self, *args, **kwargs) -> "RoutedModel":
+        return self._map(lambda member: member.bind_tools(*args, **kwargs))
+
+    def _failover(self, tried: List[str], error: BaseException) -> bool:
+        return is_transient(error) and len(tried) < len(self.members)
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        tried: List[str] = []
+        while True:
+            endpoint = self.balancer.acquire(exclude=tried)
+            start = time.perf_counter()
+            try:
+                result = self.members[endpoint.url].invoke(input, config, **kwargs)
+            except Exception as e:
+                self.balancer.release(endpoint, time.perf_counter() - start, e)
+                tried.append(endpoint.url)
+                if not self._failover(tried, e):
+                    raise
+                continue
+            self.balancer.release(endpoint, time.perf_counter() - start)
+            return result
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        tried: List[str] = []
+        while True:
+            endpoint = self.balancer.acquire(exclude=tried)
+            start = time.perf_counter()
+            try:
+                result = await self.members[endpoint.url].ainvoke(input, config, **kwargs)
+            except Exception as e:
+                self.balancer.release(endpoint, time.perf_counter() - start, e)
+                tried.append(endpoint.url)
+                if not self._failover(tried, e):
+                    raise
+                continue
+            self.balancer.release(endpoint, time.perf_counter() - start)
+            return result
+
+    def __repr__(self) -> str:
+        return f"RoutedModel({list(self.members)}, strategy={self.balancer.strategy!r})"
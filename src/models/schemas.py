@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, model_serializer
 from typing import List, Optional
 
 
@@ -9,13 +9,62 @@ class RelevanceAnalysis(BaseModel):
     relevant: bool
     reasoning: str
 
+class PostRelevanceAnalysis(RelevanceAnalysis):
+    id: str
+
+
+class BatchRelevanceAnalysis(BaseModel):
+    results: List[PostRelevanceAnalysis]
+
+class TriagePlan(RelevanceAnalysis):
+    """Saída única do v2: relevância, plano e queries numa só chamada."""
+
+    plan: str = ""
+    queries: List[str] = []
+
+
 class Response(BaseModel):
     score: float
     justification: str
 
 
+class Reference(BaseModel):
+    """Resultado de busca compacto; o texto fica no ``SnippetStore`` (``content_hash``)."""
+
+    url: str
+    title: str = ""
+    score: Optional[float] = None
+    content_hash: str = ""
+
+
+class ClaimVerdict(BaseModel):
+    id: str
+    score: float
+    justification: str
+
+
+class ClaimsResponse(Response):
+    """Resposta do analyst com o veredito de cada afirmação do plano (cache de afirmações)."""
+
+    results: List[ClaimVerdict] = []
+
+
+# Campos opcionais de ``Metrics``, omitidos da serialização quando no padrão
+FEATURE_METRICS = (
+    "cache_hits", "cache_misses", "batch_size", "tokens_saved", "passage_ids",
+    "speculative_saved_s", "speculative_wasted_tokens", "score", "parse_failures",
+    "repaired", "retries", "throttled_s", "memoized", "claim_hits", "claim_misses",
+)
+
+
 class Metrics(BaseModel):
-    """Métricas de execução de um nó do grafo"""
+    """
+    Métricas de execução de um nó do grafo.
+
+    Os campos de ``FEATURE_METRICS`` são de funcionalidades opcionais (cache,
+    lote, cascata...) e só são serializados quando diferem do padrão; ao
+    reconstruir (``Metrics(**dados)``) os ausentes voltam ao padrão.
+    """
 
     base_model: str # nome do modelo base utilizado
     execution_time: float  # em segundos
@@ -24,6 +73,29 @@ class Metrics(BaseModel):
     total_tokens: int = 0
     start_time: Optional[str] = None
     end_time: Optional[str] = None
+    cache_hits: int = 0  # buscas servidas pelo cache de resultados
+    cache_misses: int = 0  # buscas que foram ao Tavily
+    batch_size: int = 0  # posts que dividiram a mesma chamada LLM (0 = sem lote)
+    tokens_saved: int = 0  # tokens de evidência cortados do prompt do analyst
+    passage_ids: List[str] = []  # passagens de evidência selecionadas ("<trecho>:<passagem>")
+    speculative_saved_s: float = 0.0  # latência ganha com o planner especulativo (plano aproveitado)
+    speculative_wasted_tokens: int = 0  # tokens do plano especulativo descartado (post irrelevante)
+    score: Optional[float] = None  # score de cada tentativa da cascata do analyst
+    parse_failures: int = 0  # respostas estruturadas rejeitadas pelo parser
+    repaired: int = 0  # dessas, as recuperadas localmente (src.models.structured)
+    retries: int = 0  # chamadas repetidas após erro transitório (429, timeout, 5xx)
+    throttled_s: float = 0.0  # espera nos limites de taxa, backoff e circuito aberto
+    memoized: bool = False  # saída reaproveitada do StageCache (tempo e tokens da execução original)
+    claim_hits: int = 0  # afirmações do plano com veredito no cache
+    claim_misses: int = 0  # afirmações do plano sem veredito válido
+
+    @model_serializer(mode="wrap")
+    def _drop_unset_features(self, handler):
+        data = handler(self)
+        for name in FEATURE_METRICS:
+            if name in data and data[name] == type(self).model_fields[name].default:
+                del data[name]
+        return data
 
     @property
     def formatted_time(self) -> str:
@@ -37,3 +109,10 @@ class Metrics(BaseModel):
             f"Base model: {self.base_model} | "
             f"Tokens: {self.total_tokens} ({self.prompt_tokens} prompt + {self.completion_tokens} completion)"
         )
+
+
+class TriageAnalysis(TriagePlan):
+    """Variante do v2 que também devolve o score final, sem pesquisa na web."""
+
+    score: float = 0.5
+    justification: str = ""
@@ -1,18 +1,47 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional
 from datetime import datetime
 
 from typing import TypedDict, List, Dict, Optional
-from src.models.schemas import RelevanceAnalysis, Response, Metrics
+from src.models.schemas import RelevanceAnalysis, Reference, Response, Metrics
 
 
 class AgentState(BaseModel):
     post: str = Field(default="")
     relevance_analysis: Optional[RelevanceAnalysis] = Field(default=None)
     plan: str = Field(default="")
-    content: List[str] = Field(default=[])
-    references: List[dict] = Field(default=[])
+    # Queries de busca (v2: geradas junto com o plano)
+    queries: List[str] = Field(default=[])
+    # Hashes dos trechos das buscas; o texto fica no SnippetStore (src.utils.snippet_store).
+    # Substitui o antigo ``content`` (texto), para que leitores antigos falhem em vez de ler hashes
+    content_ids: List[str] = Field(default=[])
+    # Passagens selecionadas para o analyst (None = usar todos os trechos)
+    evidence: Optional[List[str]] = Field(default=None)
+    references: List[Reference] = Field(default=[])
     response: Response = Field(default=Response(score=0.0, justification=""))
+    # Cascata do analyst: tentativas no modelo de escalonamento (até ``max_revisions``)
     revision_number: int = Field(default=0)
     max_revisions: int = Field(default=3)
+    # Resposta do analyst incerta ou inválida: vai para ``analyst_escalation``
+    needs_escalation: bool = Field(default=False)
+    # Cache de afirmações: afirmações atômicas do plano e os vereditos encontrados no cache
+    claims: List[str] = Field(default=[])
+    claim_verdicts: List[dict] = Field(default=[])
     metrics: Optional[Dict[str, Metrics]] = Field(default={})
+
+    @model_validator(mode="before")
+    @classmethod
+    def _migrate_content(cls, data):
+        # Checkpoints antigos: ``content`` com o texto dos trechos vira
+        # ``content_ids`` (texto sem hash passa direto por ``SnippetStore.texts``)
+        if isinstance(data, dict) and "content" in data:
+            data = dict(data)
+            legacy = data.pop("content") or []
+            if not data.get("content_ids"):
+                data["content_ids"] = [legacy] if isinstance(legacy, str) else list(legacy)
+        return data
+
+    @property
+    def claims_resolved(self) -> bool:
+        """Todas as afirmações do plano têm veredito em cache (pesquisa desnecessária)."""
+        return bool(self.claims) and len(self.claim_verdicts) == len(self.claims)
@@ -0,0 +1,162 @@
+"""
+Saída estruturada dos nós: runnables pré-montados, decodificação restrita e reparo.
+
+``ModelsRegistry.get_structured_model(node, schema)`` devolve um
+``StructuredModel`` montado uma única vez por (config do modelo, schema) e
+guardado no pool de clientes, em vez de um ``with_structured_output`` novo a
+cada chamada. Para modelos do Ollama o método default é ``json_schema``: o
+servidor restringe a geração ao JSON Schema do ``schema`` (``format``), então
+a saída de modelos pequenos sempre é JSON válido.
+
+Se mesmo assim a resposta não puder ser lida, ``repair_structured`` tenta
+recuperá-la localmente, sem nova chamada ao modelo (cercas de código, texto
+em volta do JSON, vírgulas sobrando, literais Python, objeto embrulhado numa
+chave). As falhas de parsing e os reparos são contados nas métricas do nó
+(``parse_failures`` e ``repaired``).
+"""
+
+import ast
+import json
+import re
+from typing import Any, Optional
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.runnables import RunnableConfig
+from pydantic import ValidationError
+
+from src.models.pool import infer_provider
+from src.models.wrappers import RunnableWrapper
+from src.utils.observability import increment_node_counter
+
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.S | re.I)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_PY_LITERAL_RE = re.compile(r"\b(True|False|None)\b")
+
+
+def _json_candidates(text: str):
+    """Trechos do texto que podem ser o objeto JSON, do mais ao menos provável."""
+    for match in _FENCE_RE.finditer(text):
+        yield match.group(1)
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        yield text[start:end + 1]
+    elif start != -1:
+        # Resposta truncada: fecha as chaves que ficaram abertas
+        fragment = text[start:].rstrip().rstrip(",")
+        if fragment.count('"') % 2:
+            fragment += '"'
+        yield fragment + "}" * max(1, fragment.count("{") - fragment.count("}"))
+
+
+def _loads(candidate: str) -> Optional[Any]:
+    for text in (
+        candidate,
+        _TRAILING_COMMA_RE.sub(r"\1", candidate),
+        _PY_LITERAL_RE.sub(lambda m: _PY_LITERALS[m.group(1)], _TRAILING_COMMA_RE.sub(r"\1", candidate)),
+    ):
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            continue
+    # Dict Python ({'score': 0.5, ...})
+    try:
+        return ast.literal_eval(candidate)
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        return None
+
+
+def _validate(data: Any, schema: Any) -> Optional[Any]:
+    if isinstance(schema, dict):
+        return data if isinstance(data, dict) else None
+    try:
+        return schema.model_validate(data)
+    except ValidationError:
+        pass
+    # {"RelevanceAnalysis": {...}} ou {"properties": {...}}: um único objeto embrulhado
+    if isinstance(data, dict) and len(data) == 1:
+        (inner,) = data.values()
+        if isinstance(inner, dict):
+            return _validate(inner, schema)
+    return None
+
+
+def repair_structured(raw: Any, schema: Any) -> Optional[Any]:
+    """Tenta ler ``schema`` de uma mensagem que o parser rejeitou; None se não der."""
+    for call in getattr(raw, "tool_calls", None) or []:
+        repaired = _validate(call.get("args"), schema)
+        if repaired is not None:
+            return repaired
+    content = getattr(raw, "content", raw)
+    if not isinstance(content, str):
+        content = json.dumps(content) if isinstance(content, (dict, list)) else str(content or "")
+    for candidate in _json_candidates(content):
+        data = _loads(candidate)
+        if data is not None:
+            repaired = _validate(data, schema)
+            if repaired is not None:
+                return repaired
+    return None
+
+
+def structured_output_method(config: Any) -> Optional[str]:
+    """
+    Método do ``with_structured_output`` para ``config``: o configurado, ou
+    ``json_schema`` (decodificação restrita ao schema) para o Ollama.
+    """
+    if config.structured_output_method is not None:
+        return config.structured_output_method
+    return "json_schema" if infer_provider(config) == "ollama" else None
+
+
+class StructuredModel(RunnableWrapper):
+    """
+    ``model.with_structured_output(schema, include_raw=True)`` montado uma vez.
+    Respostas que o parser rejeita passam por ``repair_structured``; sem reparo
+    possível, levanta ``OutputParserException`` (ou devolve o dict com
+    ``parsing_error`` se ``include_raw``).
+    """
+
+    def __init__(self, model: Any, schema: Any, include_raw: bool = False, method: Optional[str] = None):
+        kwargs = {"method": method} if method else {}
+        super().__init__(model.with_structured_output(schema, include_raw=True, **kwargs))
+        self.schema = schema
+        self.include_raw = include_raw
+        self.method = method
+
+    def _finish(self, output: Any) -> Any:
+        if not isinstance(output, dict) or "parsed" not in output:
+            # Modelo sem suporte a include_raw: já devolveu o objeto lido
+            return output
+        if output.get("parsing_error") is None and output.get("parsed") is not None:
+            return output if self.include_raw else output["parsed"]
+
+        increment_node_counter("parse_failures")
+        repaired = repair_structured(output.get("raw"), self.schema)
+        if repaired is not None:
+            increment_node_counter("repaired")
+            output = {**output, "parsed": repaired, "parsing_error": None}
+            return output if self.include_raw else repaired
+        if self.include_raw:
+            return output
+        error = output.get("parsing_error")
+        if isinstance(error, Exception):
+            raise error
+        raise OutputParserException(f"Could not parse {getattr(self.schema, '__name__', 'output')}")
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        try:
+            output = self.bound.invoke(input, config, **kwargs)
+        except (OutputParserException, ValidationError):
+            # Parser que levanta mesmo com include_raw: sem mensagem para reparar
+            increment_node_counter("parse_failures")
+            raise
+        return self._finish(output)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        try:
+            output = await self.bound.ainvoke(input, config, **kwargs)
+        except (OutputParserException, ValidationError):
+            increment_node_counter("parse_failures")
+            raise
+        return self._finish(output)
@@ -0,0 +1,68 @@
+import copy
+from typing import Any, Awaitable, Callable, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+
+class RunnableWrapper(Runnable):
+    """
+    Envolve um modelo (ou runnable derivado dele) e intercepta ``invoke``/``ainvoke``.
+
+    Subclasses sobrescrevem ``_call``/``_acall`` para adicionar comportamento
+    (limite de concorrência, retries, ...). ``with_structured_output`` e
+    ``bind_tools`` devolvem o runnable derivado envolvido pelo mesmo wrapper,
+    então o comportamento vale também para as chamadas estruturadas dos nós.
+    Demais atributos são repassados ao objeto envolvido.
+    """
+
+    def __init__(self, bound: Any):
+        self.bound = bound
+
+    # Pontos de extensão
+
+    def _call(self, call: Callable[[], Any]) -> Any:
+        return call()
+
+    async def _acall(self, acall: Callable[[], Awaitable[Any]]) -> Any:
+        return await acall()
+
+    # Interface Runnable
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        return self._call(lambda: self.bound.invoke(input, config, **kwargs))
+
+    async def ainvoke(
+        self, input: Any, config: Optional[RunnableConfig] = None, **kwargs
+    ) -> Any:
+        return await self._acall(lambda: self.bound.ainvoke(input, config, **kwargs))
+
+    def rewrap(self, bound: Any) -> "RunnableWrapper":
+        """Cópia rasa deste wrapper (mesmo estado compartilhado) envolvendo ``bound``."""
+        wrapper = copy.copy(self)
+        wrapper.bound = bound
+        return wrapper
+
+    def with_structured_output(self, *args, **kwargs) -> "RunnableWrapper":
+        return self.rewrap(self.bound.with_structured_output(*args, **kwargs))
+
+    def bind_tools(self, *args, **kwargs) -> "RunnableWrapper":
+        return self.rewrap(self.bound.bind_tools(*args, **kwargs))
+
+    def get_name(self, suffix: Optional[str] = None, *, name: Optional[str] = None) -> str:
+        return self.bound.get_name(suffix, name=name)
+
+    @property
+    def InputType(self) -> Any:
+        return self.bound.InputType
+
+    @property
+    def OutputType(self) -> Any:
+        return self.bound.OutputType
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "bound":
+            raise AttributeError(name)
+        return getattr(self.bound, name)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.bound!r})"
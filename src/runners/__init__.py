@@ -0,0 +1,45 @@
+import importlib
+from typing import TYPE_CHECKING
+
+# Reexportações carregadas no primeiro acesso (``python -m src.runners --help``
+# não importa o LangChain/LangGraph)
+_EXPORTS = {
+    "aanalyze_post": "src.runners.batch",
+    "arun_batch": "src.runners.batch",
+    "run_batch": "src.runners.batch",
+    "build_result": "src.runners.batch",
+    "build_error_result": "src.runners.batch",
+    "ResumeIndex": "src.runners.resume",
+}
+
+__all__ = [
+    "aanalyze_post",
+    "arun_batch",
+    "run_batch",
+    "build_result",
+    "build_error_result",
+    "ResumeIndex",
+]
+
+if TYPE_CHECKING:
+    from src.runners.batch import (
+        aanalyze_post,
+        arun_batch,
+        run_batch,
+        build_result,
+        build_error_result,
+    )
+    from src.runners.resume import ResumeIndex
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,3 @@
+from src.runners.cli import main
+
+main()
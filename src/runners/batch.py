@@ -0,0 +1,318 @@
+import asyncio
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, AsyncIterable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from src.graphs import get_graph, graph_options
+from src.models.context import ModelsRegistry
+from src.utils.dedup import PostDeduplicator, duplicate_result
+from src.utils.metrics_export import MetricsAggregator
+from src.utils.observability import UsageMetadataCallbackHandler, set_callback_handler
+
+# ``triage`` é a chamada única do v2 (sem modelo próprio, usa o do planner)
+NODES = ["entry", "planner", "triage", "researcher", "analyst"]
+
+# (id_mention, full_text)
+PostItem = Tuple[str, str]
+
+# Canônicos cujo resultado fica guardado para as duplicatas (os mais recentes)
+DEFAULT_MAX_CANONICAL_RESULTS = 10_000
+
+
+def get_models_config(models_registry: ModelsRegistry) -> Dict[str, str]:
+    """Retorna o nome do modelo configurado para cada node."""
+    config = {node: models_registry.get_model_name(node) for node in NODES}
+    if models_registry.analyst_escalation is not None:
+        config["analyst_escalation"] = models_registry.get_model_name("analyst_escalation")
+    return config
+
+
+def build_result(
+    post_id: str,
+    post_text: str,
+    resp: Dict[str, Any],
+    start_time: datetime,
+    models_config: Dict[str, str],
+) -> Dict[str, Any]:
+    """Converte o estado final do grafo em um registro serializável (uma linha do JSONL)."""
+    result = {
+        "id_mention": post_id,
+        "full_text": post_text,
+        "success": True,
+        "error": None,
+        "timestamp": start_time.isoformat(),
+        "processing_time_s": (datetime.now() - start_time).total_seconds(),
+        "models_config": models_config,
+    }
+
+    # Relevance analysis
+    rel_analysis = resp["relevance_analysis"]
+    if hasattr(rel_analysis, "model_dump"):
+        rel_analysis = rel_analysis.model_dump()
+    result["relevant"] = rel_analysis.get("relevant", False)
+    result["relevance_reasoning"] = rel_analysis.get("reasoning", "")
+
+    # If relevant, include full analysis
+    if result["relevant"]:
+        result["plan"] = resp.get("plan", "")
+
+        response = resp.get("response")
+        if response:
+            if hasattr(response, "model_dump"):
+                response = response.model_dump()
+            result["score"] = response.get("score")
+            result["justification"] = response.get("justification", "")
+
+        # Referências compactas (url, title, score, content_hash); o texto dos
+        # trechos fica no SnippetStore (src.utils.snippet_store.rehydrate)
+        result["references"] = [
+            ref.model_dump() if hasattr(ref, "model_dump") else ref
+            for ref in resp.get("references", [])
+        ]
+    else:
+        result["plan"] = None
+        result["score"] = None
+        result["justification"] = None
+        result["references"] = []
+
+    # Metrics
+    metrics = {}
+    for node_name, node_metrics in resp.get("metrics", {}).items():
+        if hasattr(node_metrics, "model_dump"):
+            metrics[node_name] = node_metrics.model_dump()
+        else:
+            metrics[node_name] = node_metrics
+    result["metrics"] = metrics
+
+    return result
+
+
+def build_error_result(
+    post_id: str,
+    post_text: str,
+    error: Exception,
+    start_time: datetime,
+    models_config: Dict[str, str],
+) -> Dict[str, Any]:
+    """Registro de falha no mesmo formato de ``build_result``."""
+    return {
+        "id_mention": post_id,
+        "full_text": post_text,
+        "success": False,
+        "error": str(error),
+        "timestamp": start_time.isoformat(),
+        "processing_time_s": (datetime.now() - start_time).total_seconds(),
+        "models_config": models_config,
+        "relevant": None,
+        "relevance_reasoning": None,
+        "plan": None,
+        "score": None,
+        "justification": None,
+        "references": [],
+        "metrics": {},
+    }
+
+
+async def aanalyze_post(
+    post_id: str,
+    post_text: str,
+    models_registry: ModelsRegistry,
+    tavily: Any,
+    graph=None,
+    max_revisions: int = 3,
+    extra_context: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Analisa um único post com ``graph.ainvoke`` (default: ``agraph`` do v1,
+    com os nós opcionais que ``extra_context`` configura).
+
+    Cada chamada cria seu próprio callback handler; como ele é guardado em um
+    ContextVar, tasks concorrentes no mesmo event loop não se misturam.
+
+    Se o grafo tiver checkpointer e o post tiver sido interrompido numa
+    execução anterior (mesmo ``thread_id``), a execução continua do último nó
+    concluído. Os checkpoints de posts concluídos com sucesso são apagados.
+    """
+    callback = UsageMetadataCallbackHandler()
+    set_callback_handler(callback)
+
+    config = {
+        "configurable": {"thread_id": f"analysis_{post_id}"},
+        "callbacks": [callback],
+    }
+    runtime_context = {
+        "models_registry": models_registry,
+        "tavily": tavily,
+        **(extra_context or {}),
+    }
+    initial_state = {"post": post_text, "max_revisions": max_revisions}
+    models_config = get_models_config(models_registry)
+    if graph is None:
+        graph = get_graph("v1", use_async=True, **graph_options(runtime_context))
+
+    start_time = datetime.now()
+    try:
+        graph_input = initial_state
+        if graph.checkpointer is not None:
+            snapshot = await graph.aget_state(config)
+            if snapshot.next:
+                graph_input = None  # retoma a partir dos nós pendentes
+        resp = await graph.ainvoke(graph_input, context=runtime_context, config=config)
+        result = build_result(post_id, post_text, resp, start_time, models_config)
+        if graph.checkpointer is not None:
+            await graph.checkpointer.adelete_thread(config["configurable"]["thread_id"])
+        return result
+    except Exception as e:
+        return build_error_result(post_id, post_text, e, start_time, models_config)
+
+
+async def _aiterate(posts: Union[Iterable[PostItem], AsyncIterable[PostItem]]):
+    if hasattr(posts, "__aiter__"):
+        async for item in posts:
+            yield item
+    else:
+        for item in posts:
+            yield item
+
+
+async def arun_batch(
+    posts: Union[Iterable[PostItem], AsyncIterable[PostItem]],
+    models_registry: ModelsRegistry,
+    tavily: Any,
+    max_concurrency: int = 64,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    graph=None,
+    deduplicator: Optional[PostDeduplicator] = None,
+    extra_context: Optional[Dict[str, Any]] = None,
+    metrics: Optional[MetricsAggregator] = None,
+    keep_results: bool = True,
+    max_canonical_results: int = DEFAULT_MAX_CANONICAL_RESULTS,
+) -> List[Dict[str, Any]]:
+    """
+    Processa um lote de posts com no máximo ``max_concurrency`` posts em andamento.
+
+    Os posts são consumidos sob demanda por ``max_concurrency`` workers, então
+    entradas grandes (inclusive iteradores/geradores) não são materializadas.
+
+    Args:
+        posts: Iterável (sync ou async) de tuplas ``(id_mention, full_text)``
+        models_registry: Registry de modelos compartilhado entre os posts
+        tavily: Cliente Tavily compartilhado entre os posts
+        max_concurrency: Número máximo de posts processados simultaneamente
+        on_result: Callback chamado a cada resultado (ex: gravar no JSONL)
+        graph: Grafo compilado a usar (default: ``agraph`` do v1, com os nós
+            opcionais que ``extra_context`` configura, ver ``graph_options``)
+        deduplicator: Se informado, duplicatas (exatas ou quase) de um post já
+            visto no lote reaproveitam o resultado do canônico em vez de
+            passar pelo grafo (ver ``src.utils.dedup``)
+        extra_context: Campos adicionais do RuntimeContext compartilhados por
+            todos os posts (ex: ``prefilter``, ``entry_batcher``)
+        metrics: Agregador alimentado a cada post iniciado/concluído (ver
+            ``src.utils.metrics_export``)
+        keep_results: Se False, os resultados só são entregues a ``on_result``
+            e não acumulados em memória (a lista retornada fica vazia)
+        max_canonical_results: Canônicos recentes (LRU) cujo resultado fica em
+            memória para as duplicatas; duplicatas de canônicos mais antigos
+            passam pelo grafo
+
+    Returns:
+        Lista com os resultados, na ordem de conclusão
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be >= 1")
+
+    results: List[Dict[str, Any]] = []
+    source = _aiterate(posts)
+    source_lock = asyncio.Lock()
+    # Resultado (futuro) dos canônicos recentes, aguardado pelas suas duplicatas.
+    # Guarda só o que ``duplicate_result`` usa (sem texto e métricas) e None
+    # para falhas, que não são reaproveitadas
+    canonical_results: "OrderedDict[str, asyncio.Future]" = OrderedDict()
+
+    def emit(result: Dict[str, Any]):
+        if keep_results:
+            results.append(result)
+        if metrics is not None:
+            metrics.post_finished(result)
+        if on_result:
+            on_result(result)
+
+    async def worker():
+        loop = asyncio.get_running_loop()
+        while True:
+            async with source_lock:
+                try:
+                    post_id, post_text = await source.__anext__()
+                except StopAsyncIteration:
+                    return
+
+            if metrics is not None:
+                metrics.post_started()
+
+            future = None
+            if deduplicator is not None:
+                canonical_id = deduplicator.add(post_id, post_text)
+                if canonical_id is None:
+                    future = canonical_results[post_id] = loop.create_future()
+                    while len(canonical_results) > max_canonical_results:
+                        canonical_results.popitem(last=False)
+                elif canonical_id in canonical_results:
+                    canonical_results.move_to_end(canonical_id)
+                    # shield: cancelar esta duplicata não cancela o futuro compartilhado
+                    canonical = await asyncio.shield(canonical_results[canonical_id])
+                    if canonical is not None:
+                        emit(duplicate_result(canonical, post_id, post_text))
+                        continue
+
+            result = None
+            try:
+                result = await aanalyze_post(
+                    post_id,
+                    post_text,
+                    models_registry,
+                    tavily,
+                    graph=graph,
+                    extra_context=extra_context,
+                )
+            finally:
+                # Sempre completado (None em falha ou cancelamento): duplicatas
+                # esperando este canônico seguem para o grafo em vez de travar
+                if future is not None and not future.done():
+                    future.set_result(
+                        {**result, "full_text": None, "metrics": {}}
+                        if result is not None and result["success"]
+                        else None
+                    )
+            emit(result)
+
+    await asyncio.gather(*(worker() for _ in range(max_concurrency)))
+    return results
+
+
+def run_batch(
+    posts: Iterable[PostItem],
+    models_registry: ModelsRegistry,
+    tavily: Any,
+    max_concurrency: int = 64,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    deduplicator: Optional[PostDeduplicator] = None,
+    extra_context: Optional[Dict[str, Any]] = None,
+    metrics: Optional[MetricsAggregator] = None,
+    keep_results: bool = True,
+    max_canonical_results: int = DEFAULT_MAX_CANONICAL_RESULTS,
+) -> List[Dict[str, Any]]:
+    """Versão síncrona de ``arun_batch`` (abre seu próprio event loop)."""
+    return asyncio.run(
+        arun_batch(
+            posts,
+            models_registry,
+            tavily,
+            max_concurrency=max_concurrency,
+            on_result=on_result,
+            deduplicator=deduplicator,
+            extra_context=extra_context,
+            metrics=metrics,
+            keep_results=keep_results,
+            max_canonical_results=max_canonical_results,
+        )
+    )
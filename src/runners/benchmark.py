@@ -0,0 +1,294 @@
+"""
+Benchmark offline do pipeline, com ``FakeChatModel`` e ``FakeTavilyClient``
+(sem Ollama e sem créditos do Tavily).
+
+Varre níveis de concorrência, tamanhos de post e proporções de posts
+relevantes; para cada combinação mede posts/s, p50/p95 por post e por nó e o
+overhead do framework (tempo por post com os fakes em latência zero, ou seja,
+só LangGraph, callbacks, métricas, seleção de evidências e o runner).
+
+    python -m src.runners.benchmark                     # roda e compara com o baseline
+    python -m src.runners.benchmark --save-baseline     # grava o baseline
+    python -m src.runners.benchmark --concurrency 1 16 --posts 64 --mode sync
+
+Com ``--baseline`` existente, casos com queda de posts/s ou aumento do p95
+acima de ``--tolerance`` são listados como regressão (código de saída 1).
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.graphs import get_graph
+from src.models.fakes import FakeChatModel, FakeModelsRegistry, FakeTavilyClient
+from src.runners.batch import (
+    PostItem,
+    build_error_result,
+    build_result,
+    get_models_config,
+    run_batch,
+)
+from src.utils.metrics_export import MetricsAggregator, _quantile
+from src.utils.observability import UsageMetadataCallbackHandler, set_callback_handler
+
+DEFAULT_BASELINE_PATH = "benchmarks/baseline.json"
+
+
+@dataclass
+class BenchmarkSettings:
+    """Parâmetros dos fakes e do lote, iguais para todos os casos da grade."""
+
+    posts: int = 32
+    llm_latency_s: float = 0.05
+    llm_sigma: float = 0.3
+    completion_tokens: int = 60
+    search_latency_s: float = 0.1
+    search_sigma: float = 0.3
+    mode: str = "async"  # "async" (arun_batch + agraph) ou "sync" (graph.invoke em threads)
+    seed: int = 0
+
+
+@dataclass
+class BenchmarkCase:
+    concurrency: int
+    post_words: int
+    relevance_ratio: float
+
+    @property
+    def key(self) -> str:
+        return f"c{self.concurrency}-w{self.post_words}-r{self.relevance_ratio:g}"
+
+
+def make_posts(n: int, words: int, seed: int = 0) -> List[PostItem]:
+    """Posts sintéticos com ``words`` palavras cada."""
+    posts = []
+    for i in range(n):
+        rng = random.Random(f"{seed}:post:{i}")
+        text = " ".join(f"palavra{rng.randrange(5000)}" for _ in range(words))
+        posts.append((f"bench_{i}", text))
+    return posts
+
+
+def _analyze_post_sync(post_id: str, post_text: str, models_registry, tavily) -> Dict[str, Any]:
+    callback = UsageMetadataCallbackHandler()
+    set_callback_handler(callback)
+    config = {"configurable": {"thread_id": f"bench_{post_id}"}, "callbacks": [callback]}
+    models_config = get_models_config(models_registry)
+    start_time = datetime.now()
+    try:
+        resp = get_graph("v1").invoke(
+            {"post": post_text},
+            context={"models_registry": models_registry, "tavily": tavily},
+            config=config,
+        )
+        return build_result(post_id, post_text, resp, start_time, models_config)
+    except Exception as e:
+        return build_error_result(post_id, post_text, e, start_time, models_config)
+
+
+def _run_batch(
+    posts: List[PostItem],
+    models_registry,
+    tavily,
+    concurrency: int,
+    mode: str,
+    aggregator: MetricsAggregator,
+) -> List[Dict[str, Any]]:
+    if mode == "async":
+        return run_batch(
+            posts, models_registry, tavily, max_concurrency=concurrency, metrics=aggregator
+        )
+
+    def run(item: PostItem) -> Dict[str, Any]:
+        aggregator.post_started()
+        result = _analyze_post_sync(item[0], item[1], models_registry, tavily)
+        aggregator.post_finished(result)
+        return result
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(run, posts))
+
+
+def run_case(
+    case: BenchmarkCase, settings: BenchmarkSettings, zero_latency: bool = False
+) -> Dict[str, Any]:
+    """Roda um caso da grade e devolve suas métricas agregadas."""
+    model = FakeChatModel(
+        relevance_ratio=case.relevance_ratio,
+        latency_median_s=0.0 if zero_latency else settings.llm_latency_s,
+        latency_sigma=settings.llm_sigma,
+        completion_tokens=settings.completion_tokens,
+        seed=settings.seed,
+    )
+    tavily = FakeTavilyClient(
+        latency_median_s=0.0 if zero_latency else settings.search_latency_s,
+        latency_sigma=settings.search_sigma,
+        seed=settings.seed,
+    )
+    models_registry = FakeModelsRegistry(model=model)
+    posts = make_posts(settings.posts, case.post_words, settings.seed)
+    aggregator = MetricsAggregator()
+
+    start = time.perf_counter()
+    results = _run_batch(posts, models_registry, tavily, case.concurrency, settings.mode, aggregator)
+    wall = time.perf_counter() - start
+
+    latencies = sorted(r["processing_time_s"] for r in results)
+    snapshot = aggregator.snapshot()
+    return {
+        "posts": len(results),
+        "errors": snapshot["errors"],
+        "relevant": snapshot["relevant"],
+        "wall_s": wall,
+        "posts_per_s": len(results) / wall if wall else 0.0,
+        "p50_s": _quantile(latencies, 0.5),
+        "p95_s": _quantile(latencies, 0.95),
+        "tokens": sum(m["prompt_tokens"] + m["completion_tokens"] for m in snapshot["models"].values()),
+        "search_calls": tavily.calls,
+        "nodes": {
+            name: {"p50_s": node["p50"], "p95_s": node["p95"]}
+            for name, node in snapshot["nodes"].items()
+        },
+    }
+
+
+def run_benchmark(
+    cases: Sequence[BenchmarkCase], settings: BenchmarkSettings, verbose: bool = True
+) -> Dict[str, Any]:
+    """
+    Roda a grade. Cada caso é executado duas vezes: com a latência simulada e
+    com os fakes em latência zero (overhead do framework).
+    """
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "settings": asdict(settings),
+        "cases": {},
+    }
+    for case in cases:
+        row = {**asdict(case), **run_case(case, settings)}
+        overhead = run_case(case, settings, zero_latency=True)
+        # Custo do framework amortizado por post (com concorrência, a latência
+        # individual em latência zero mede fila, não custo)
+        row["overhead_ms_per_post"] = overhead["wall_s"] / max(1, overhead["posts"]) * 1000
+        row["overhead_share"] = overhead["wall_s"] / row["wall_s"] if row["wall_s"] else 0.0
+        report["cases"][case.key] = row
+        if verbose:
+            print(
+                f"{case.key:<18} {row['posts_per_s']:8.2f} posts/s  "
+                f"p50 {row['p50_s']:.3f}s  p95 {row['p95_s']:.3f}s  "
+                f"overhead {row['overhead_ms_per_post']:.1f} ms/post "
+                f"({row['overhead_share']:.1%})"
+            )
+    return report
+
+
+def compare_with_baseline(
+    report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.15
+) -> List[str]:
+    """
+    Regressões em relação ao baseline: queda de posts/s ou aumento de p95
+    (por post e por nó) acima de ``tolerance``. Só compara casos presentes nos dois.
+    """
+    regressions = []
+    for key, row in report["cases"].items():
+        base = baseline.get("cases", {}).get(key)
+        if base is None:
+            continue
+        if row["posts_per_s"] < base["posts_per_s"] * (1 - tolerance):
+            regressions.append(
+                f"{key}: posts/s {base['posts_per_s']:.2f} -> {row['posts_per_s']:.2f}"
+            )
+        if row["p95_s"] > base["p95_s"] * (1 + tolerance):
+            regressions.append(f"{key}: p95 {base['p95_s']:.3f}s -> {row['p95_s']:.3f}s")
+        for node, stats in row["nodes"].items():
+            base_node = base["nodes"].get(node)
+            if base_node and stats["p95_s"] > base_node["p95_s"] * (1 + tolerance):
+                regressions.append(
+                    f"{key}: {node} p95 {base_node['p95_s']:.3f}s -> {stats['p95_s']:.3f}s"
+                )
+    return regressions
+
+
+def load_baseline(path: str = DEFAULT_BASELINE_PATH) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(report: Dict[str, Any], path: str = DEFAULT_BASELINE_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark offline do pipeline (modelos e Tavily falsos)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--post-words", type=int, nargs="+", default=[15, 150])
+    parser.add_argument("--relevance", type=float, nargs="+", default=[0.2, 0.8])
+    parser.add_argument("--posts", type=int, default=BenchmarkSettings.posts, help="Posts por caso")
+    parser.add_argument("--llm-latency", type=float, default=BenchmarkSettings.llm_latency_s, help="Mediana por chamada LLM (s)")
+    parser.add_argument("--llm-sigma", type=float, default=BenchmarkSettings.llm_sigma, help="Sigma da lognormal das chamadas LLM")
+    parser.add_argument("--completion-tokens", type=int, default=BenchmarkSettings.completion_tokens)
+    parser.add_argument("--search-latency", type=float, default=BenchmarkSettings.search_latency_s, help="Mediana por busca (s)")
+    parser.add_argument("--search-sigma", type=float, default=BenchmarkSettings.search_sigma)
+    parser.add_argument("--mode", choices=["async", "sync"], default="async")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Grava o resultado como baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Variação tolerada antes de acusar regressão")
+    parser.add_argument("--output", default=None, help="Grava o relatório completo (JSON)")
+    args = parser.parse_args(argv)
+
+    settings = BenchmarkSettings(
+        posts=args.posts,
+        llm_latency_s=args.llm_latency,
+        llm_sigma=args.llm_sigma,
+        completion_tokens=args.completion_tokens,
+        search_latency_s=args.search_latency,
+        search_sigma=args.search_sigma,
+        mode=args.mode,
+        seed=args.seed,
+    )
+    cases = [
+        BenchmarkCase(concurrency=c, post_words=w, relevance_ratio=r)
+        for c in args.concurrency
+        for w in args.post_words
+        for r in args.relevance
+    ]
+    report = run_benchmark(cases, settings)
+
+    if args.output:
+        save_baseline(report, args.output)
+    if args.save_baseline:
+        save_baseline(report, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"WARNING: no baseline at {args.baseline}; not compared (record one with --save-baseline)")
+        return 0
+    if baseline.get("settings") != report["settings"]:
+        print(f"WARNING: baseline {args.baseline} was recorded with different settings; not compared")
+        return 0
+    regressions = compare_with_baseline(report, baseline, tolerance=args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions:
+        print(f"No regressions against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,436 @@
+"""
+Processamento em lote pela linha de comando.
+
+    python -m src.runners input/*.csv --output output/results.jsonl --concurrency 16
+
+Os CSVs (colunas ``id_mention`` e ``full_text``) são lidos em streaming, linha a
+linha; cada resultado é anexado ao JSONL (e opcionalmente a um CSV) assim que
+fica pronto. Posts já presentes no índice de retomada (``<output>.idx``) são
+pulados, então basta rodar o mesmo comando de novo para continuar uma execução
+interrompida. A memória usada não depende do tamanho da entrada: só os posts
+em andamento, 8 bytes por id já processado e os ids desde a última
+compactação do índice (no máximo ``DEFAULT_COMPACT_EVERY``) ficam em memória.
+"""
+
+import argparse
+import asyncio
+import csv
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional
+
+from dotenv import load_dotenv
+
+from src.graphs import GRAPH_VERSIONS, build
+from src.graphs.checkpoint import aopen_checkpointer
+from src.runners.resume import ResumeIndex
+from src.utils.dedup import PostDeduplicator
+
+# LangChain, modelos, Tavily e métricas só são importados em ``main`` (depois
+# do parse dos argumentos): ``--help`` e erros de argumento respondem na hora
+if TYPE_CHECKING:
+    from src.models.context import ModelsRegistry
+    from src.models.resilience import ResilienceConfig
+    from src.runners.batch import PostItem
+
+CSV_COLUMNS = [
+    "id_mention", "full_text", "success", "error",
+    "relevant", "relevance_reasoning",
+    "score", "justification", "plan",
+    "processing_time_s", "timestamp",
+]
+
+
+def iter_csv_posts(
+    paths: Iterable[str],
+    id_column: str = "id_mention",
+    text_column: str = "full_text",
+    skip: Optional[ResumeIndex] = None,
+) -> Iterator["PostItem"]:
+    """
+    Lê ``(id, texto)`` dos CSVs em streaming, sem carregar os arquivos.
+
+    Args:
+        paths: Arquivos CSV, lidos em sequência
+        id_column: Coluna com o id do post
+        text_column: Coluna com o texto do post
+        skip: Índice de ids já processados, que são pulados
+    """
+    csv.field_size_limit(sys.maxsize)
+    for path in paths:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                post_id, text = row.get(id_column), row.get(text_column)
+                if not post_id or text is None:
+                    continue
+                if skip is not None and post_id in skip:
+                    continue
+                yield post_id, text
+
+
+class ResultWriter:
+    """
+    Anexa cada resultado ao JSONL (e ao CSV, se configurado) e registra o id
+    no índice de retomada. Uma linha por resultado, gravada na hora: uma
+    execução interrompida perde no máximo os posts em andamento.
+
+    Com ``retry_failed=True``, falhas são gravadas mas não entram no índice,
+    então são tentadas de novo na próxima execução. ``store`` (ex: um
+    ``ResultStore`` Parquet) recebe cada resultado via ``append``.
+    """
+
+    def __init__(
+        self,
+        jsonl_path: str,
+        index: ResumeIndex,
+        csv_path: Optional[str] = None,
+        progress_every: int = 100,
+        retry_failed: bool = False,
+        store: Any = None,
+    ):
+        self.index = index
+        self.store = store
+        self.retry_failed = retry_failed
+        self.progress_every = progress_every
+        self.written = 0
+        self.failed = 0
+        self._start = time.time()
+        self._lock = threading.Lock()
+
+        self._jsonl = open(jsonl_path, "a", encoding="utf-8")
+        self._csv = None
+        self._csv_writer = None
+        if csv_path:
+            write_header = not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0
+            self._csv = open(csv_path, "a", encoding="utf-8", newline="")
+            self._csv_writer = csv.DictWriter(
+                self._csv, fieldnames=CSV_COLUMNS, extrasaction="ignore"
+            )
+            if write_header:
+                self._csv_writer.writeheader()
+
+    def __call__(self, result: Dict[str, Any]):
+        with self._lock:
+            self._jsonl.write(json.dumps(result, ensure_ascii=False) + "\n")
+            self._jsonl.flush()
+            if self._csv_writer is not None:
+                self._csv_writer.writerow(result)
+                self._csv.flush()
+            if self.store is not None:
+                self.store.append(result)
+            self.written += 1
+            success = result.get("success", True)
+            if not success:
+                self.failed += 1
+            # Só entra no índice depois de gravado
+            if success or not self.retry_failed:
+                self.index.add(result["id_mention"])
+            if self.progress_every and self.written % self.progress_every == 0:
+                rate = self.written / max(time.time() - self._start, 1e-9) * 60
+                print(
+                    f"{self.written} posts ({self.failed} failed), {rate:.1f} posts/min",
+                    flush=True,
+                )
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+        self._jsonl.close()
+        if self._csv is not None:
+            self._csv.close()
+
+
+def rotate_outputs(paths: Iterable[Optional[str]]) -> List[str]:
+    """
+    Renomeia saídas existentes para ``<nome>.<timestamp><ext>`` (ex:
+    ``results.20240501T120000.jsonl``), para uma execução sem retomada começar
+    de arquivos vazios em vez de duplicar linhas. Retorna os novos caminhos.
+    """
+    stamp = time.strftime("%Y%m%dT%H%M%S")
+    rotated = []
+    for path in paths:
+        if not path or not os.path.exists(path):
+            continue
+        root, ext = os.path.splitext(path.rstrip(os.sep))
+        target = f"{root}.{stamp}{ext}"
+        os.replace(path, target)
+        rotated.append(target)
+    return rotated
+
+
+def build_resilience(
+    args: argparse.Namespace, requests_per_s: Optional[float], tokens_per_min: Optional[int] = None
+) -> Optional["ResilienceConfig"]:
+    """Política de um endpoint a partir dos argumentos, ou None se nenhum foi informado."""
+    from src.models.resilience import ResilienceConfig
+
+    if requests_per_s is None and tokens_per_min is None and args.retries is None:
+        return None
+    config = ResilienceConfig(requests_per_s=requests_per_s, tokens_per_min=tokens_per_min)
+    if args.retries is not None:
+        config.max_attempts = args.retries + 1
+    return config
+
+
+def build_models_registry(args: argparse.Namespace) -> "ModelsRegistry":
+    """Registry com um ModelConfig por node, a partir dos argumentos da CLI."""
+    from src.models.context import ModelConfig, ModelsRegistry
+    from src.runners.batch import NODES
+
+    provider = {"model_provider": args.provider}
+    if len(args.base_url) > 1:
+        provider.update(base_urls=args.base_url, routing=args.routing)
+    else:
+        provider["base_url"] = args.base_url[0]
+    return ModelsRegistry(
+        **{
+            node: ModelConfig(
+                model=getattr(args, node), temperature=args.temperature, **provider
+            )
+            for node in NODES
+            # Sem --triage, o triage do v2 usa o modelo do planner
+            if getattr(args, node) is not None
+        },
+        default_temperature=args.temperature,
+    )
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.runners",
+        description="Analisa posts de CSVs em lote, com gravação incremental e retomada.",
+    )
+    parser.add_argument("inputs", nargs="*", default=["input/*.csv"], help="CSVs (aceita glob)")
+    parser.add_argument("--output", default="output/analysis_results.jsonl", help="JSONL de resultados")
+    parser.add_argument("--csv", default=None, help="CSV resumido (opcional)")
+    parser.add_argument("--parquet", default=None, help="Dataset Parquet de resultados (opcional)")
+    parser.add_argument(
+        "--snippet-store",
+        default=None,
+        help="SQLite com o texto dos trechos citados nas referências (default: <output>.snippets.sqlite)",
+    )
+    parser.add_argument("--concurrency", type=int, default=16, help="Posts em andamento")
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Não pula posts já processados; saídas existentes são renomeadas com um timestamp",
+    )
+    parser.add_argument("--graph", choices=GRAPH_VERSIONS, default="v1", help="Versão do grafo")
+    parser.add_argument("--dedup", action="store_true", help="Reaproveita resultados de posts duplicados")
+    parser.add_argument(
+        "--evidence-budget",
+        type=int,
+        default=None,
+        help="Orçamento (tokens estimados) das evidências do analyst, ex: 2000 (default: todo o conteúdo)",
+    )
+    parser.add_argument(
+        "--search-cache",
+        default=None,
+        help="SQLite de respostas do Tavily (ex: cache/search_cache.sqlite); buscas repetidas não gastam créditos",
+    )
+    parser.add_argument(
+        "--claim-cache",
+        default=None,
+        help="SQLite de vereditos por afirmação (ex: cache/claim_cache.sqlite); posts cujas "
+        "afirmações já foram verificadas pulam a pesquisa (grafo v1)",
+    )
+    parser.add_argument("--claim-ttl-hours", type=float, default=72.0, help="Validade dos vereditos em cache")
+    parser.add_argument(
+        "--checkpoints",
+        default=None,
+        help="SQLite de checkpoints (ex: cache/checkpoints.sqlite); posts que falharam "
+        "são retomados do último nó concluído na próxima execução",
+    )
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument("--record", default=None, help="Grava chamadas LLM/Tavily neste cassete")
+    cassette.add_argument("--replay", default=None, help="Serve chamadas LLM/Tavily deste cassete (offline)")
+    parser.add_argument(
+        "--replay-realtime", action="store_true", help="No replay, respeita a latência gravada"
+    )
+    parser.add_argument("--entry", default="qwen2.5:1.5b")
+    parser.add_argument("--planner", default="llama3.1:8b")
+    parser.add_argument("--triage", default=None, help="Modelo da triagem do grafo v2 (default: o do --planner)")
+    parser.add_argument("--researcher", default="llama3.1:8b")
+    parser.add_argument("--analyst", default="llama3.1:8b")
+    parser.add_argument("--provider", default="ollama")
+    parser.add_argument(
+        "--base-url",
+        nargs="+",
+        default=["http://localhost:11434"],
+        help="Uma ou mais instâncias do servidor de modelos (várias = chamadas balanceadas)",
+    )
+    parser.add_argument(
+        "--routing",
+        choices=["least_outstanding", "latency"],
+        default="least_outstanding",
+        help="Balanceamento entre as instâncias de --base-url",
+    )
+    parser.add_argument(
+        "--health-check-interval", type=float, default=None, help="Health check das instâncias a cada N s"
+    )
+    parser.add_argument("--temperature", type=float, default=0.0)
+    parser.add_argument("--rps", type=float, default=None, help="Teto de requisições/s ao servidor de modelos (adaptativo)")
+    parser.add_argument("--tpm", type=int, default=None, help="Teto de tokens/min ao servidor de modelos")
+    parser.add_argument("--tavily-rps", type=float, default=None, help="Teto de buscas/s ao Tavily (adaptativo)")
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=None,
+        help="Tentativas extras após 429/timeout/5xx (com backoff e circuit breaker)",
+    )
+    parser.add_argument("--metrics-port", type=int, default=None, help="Porta do endpoint /metrics")
+    parser.add_argument("--metrics-snapshots", default=None, help="JSONL de snapshots de métricas")
+    parser.add_argument("--progress-every", type=int, default=100)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    load_dotenv()
+
+    from src.models.pool import ModelClientPool, get_model_pool, set_model_pool
+    from src.runners.batch import arun_batch
+    from src.utils.cassette import Cassette
+    from src.utils.metrics_export import (
+        JsonlSnapshotWriter,
+        MetricsAggregator,
+        start_metrics_server,
+    )
+    from src.utils.search import create_tavily_client
+    from src.utils.snippet_store import SnippetStore, set_snippet_store
+
+    paths = sorted({p for pattern in args.inputs for p in glob.glob(pattern)})
+    if not paths:
+        raise SystemExit(f"No input CSV found in {args.inputs}")
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+
+    if args.no_resume:
+        for suffix in (".idx", ".log"):
+            if os.path.exists(args.output + suffix):
+                os.remove(args.output + suffix)
+        for path in rotate_outputs([args.output, args.csv, args.parquet]):
+            print(f"Previous output moved to {path}", flush=True)
+        index = ResumeIndex(args.output)
+    else:
+        index = ResumeIndex.for_output(args.output)
+    print(f"{len(paths)} input file(s), {len(index)} post(s) already processed", flush=True)
+
+    model_resilience = build_resilience(args, args.rps, args.tpm)
+    if model_resilience is not None or args.health_check_interval:
+        set_model_pool(
+            ModelClientPool(
+                resilience=model_resilience, health_check_interval_s=args.health_check_interval
+            )
+        )
+    tavily_resilience = build_resilience(args, args.tavily_rps)
+
+    metrics = MetricsAggregator(pool=get_model_pool())
+    server = start_metrics_server(metrics, port=args.metrics_port) if args.metrics_port else None
+    snapshots = (
+        JsonlSnapshotWriter(metrics, args.metrics_snapshots) if args.metrics_snapshots else None
+    )
+
+    store = None
+    if args.parquet:
+        from src.utils.result_store import ResultStore
+
+        store = ResultStore(args.parquet)
+
+    writer = ResultWriter(
+        args.output,
+        index,
+        csv_path=args.csv,
+        progress_every=args.progress_every,
+        retry_failed=bool(args.checkpoints),
+        store=store,
+    )
+
+    cassette = None
+    if args.record or args.replay:
+        cassette = Cassette(
+            args.record or args.replay,
+            mode="record" if args.record else "replay",
+            realtime=args.replay_realtime,
+        )
+
+    # Texto dos trechos das buscas, uma vez por conteúdo; o JSONL guarda só os hashes
+    snippet_store = SnippetStore(args.snippet_store or os.path.splitext(args.output)[0] + ".snippets.sqlite")
+    set_snippet_store(snippet_store)
+
+    search_cache = None
+    if args.search_cache:
+        from src.utils.search_cache import SearchCache
+
+        search_cache = SearchCache(args.search_cache)
+
+    claim_cache = None
+    if args.claim_cache:
+        from src.utils.claim_cache import ClaimVerdictCache
+
+        claim_cache = ClaimVerdictCache(args.claim_cache, ttl_seconds=args.claim_ttl_hours * 3600)
+
+    async def arun():
+        batch_kwargs = dict(
+            max_concurrency=args.concurrency,
+            on_result=writer,
+            deduplicator=PostDeduplicator() if args.dedup else None,
+            metrics=metrics,
+            keep_results=False,
+            extra_context={
+                "claim_cache": claim_cache,
+                "search_cache": search_cache,
+                "evidence_token_budget": args.evidence_budget,
+            },
+        )
+        posts = iter_csv_posts(paths, skip=None if args.no_resume else index)
+        models_registry = build_models_registry(args)
+        if cassette is None:
+            tavily = create_tavily_client(
+                api_key=os.environ["TAVILY_API_KEY"], resilience=tavily_resilience
+            )
+        else:
+            # No replay nenhum serviço externo é usado (nem a chave do Tavily)
+            models_registry.cassette = cassette
+            live = None
+            if cassette.mode == "record":
+                live = create_tavily_client(
+                    api_key=os.environ["TAVILY_API_KEY"], resilience=tavily_resilience
+                )
+            tavily = cassette.wrap_tavily(live)
+
+        # Só o nó de evidências é configurável pela CLI (``--evidence-budget``)
+        graph_options = {"evidence": args.evidence_budget is not None}
+        if not args.checkpoints:
+            graph = build(args.graph, use_async=True, **graph_options)
+            await arun_batch(posts, models_registry, tavily, graph=graph, **batch_kwargs)
+            return
+        async with aopen_checkpointer(args.checkpoints) as saver:
+            graph = build(args.graph, use_async=True, checkpointer=saver, **graph_options)
+            await arun_batch(posts, models_registry, tavily, graph=graph, **batch_kwargs)
+
+    try:
+        asyncio.run(arun())
+    finally:
+        writer.close()
+        index.close()
+        if cassette is not None:
+            cassette.close()
+        if claim_cache is not None:
+            claim_cache.close()
+        if search_cache is not None:
+            search_cache.close()
+        snippet_store.close()
+        if snapshots is not None:
+            snapshots.stop()
+        if server is not None:
+            server.shutdown()
+
+    print(f"Done: {writer.written} post(s) written ({writer.failed} failed) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
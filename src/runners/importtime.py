@@ -0,0 +1,166 @@
+"""
+Benchmark do tempo de import dos módulos de entrada (CLI, workers, pacotes).
+
+Cada alvo é importado num interpretador novo com ``python -X importtime``; o
+tempo é a soma dos ``self`` de todos os módulos carregados (melhor de
+``--repeat`` execuções). Também verifica que os alvos leves não carregam
+dependências pesadas (LangChain, LangGraph, Tavily, ...), que devem ficar para
+o primeiro uso.
+
+    python -m src.runners.importtime                   # mede e compara com o baseline
+    python -m src.runners.importtime --save-baseline   # grava o baseline
+
+Sai com código 1 se algum alvo carregar um módulo proibido ou ficar mais lento
+que o baseline além de ``--tolerance`` (e de ``--min-delta-ms``, para ignorar
+ruído em alvos de poucos milissegundos).
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.runners.benchmark import load_baseline, save_baseline
+
+DEFAULT_BASELINE_PATH = "benchmarks/import_baseline.json"
+
+HEAVY = ("langchain", "langchain_core", "langgraph", "tavily", "pyarrow")
+
+# Alvo -> pacotes que o import do alvo não pode carregar
+TARGETS: Dict[str, Tuple[str, ...]] = {
+    "src.runners.cli": HEAVY,  # --help e validação de argumentos
+    "src.models": HEAVY,
+    "src.utils": HEAVY,
+    "src.graphs": HEAVY,
+    "src.models.schemas": HEAVY,
+    "src.utils.dedup": HEAVY,
+    # Worker: precisa do langchain_core, mas não compila grafo nem cria clientes
+    "src.runners.batch": ("langchain", "langgraph", "tavily", "pyarrow"),
+}
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, bool]]:
+    """
+    Linhas de ``-X importtime`` como ``(módulo, self_us, cumulative_us,
+    top_level)``; ``top_level`` = importado diretamente, não por outro módulo.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        # A indentação do nome é a profundidade do import (1 espaço + 2 por nível)
+        rows.append((name.strip(), int(self_us), int(cumulative_us), not name.startswith("  ")))
+    return rows
+
+
+def measure(target: str, python: str = sys.executable) -> Dict[str, Any]:
+    """Importa ``target`` num processo novo; devolve o tempo e os pacotes carregados."""
+    code = f"import json, sys; import {target}; print(json.dumps(sorted(sys.modules)))"
+    proc = subprocess.run(
+        [python, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.getcwd(),
+    )
+    rows = parse_importtime(proc.stderr)
+    top = [(name, cumulative) for name, _, cumulative, top_level in rows if top_level]
+    return {
+        "ms": sum(self_us for _, self_us, _, _ in rows) / 1000,
+        "modules": json.loads(proc.stdout.strip().splitlines()[-1]),
+        # Imports diretos mais caros (com tudo o que eles puxaram)
+        "top": sorted(top, key=lambda item: -item[1])[:5],
+    }
+
+
+def run_importtime(
+    targets: Dict[str, Sequence[str]], repeat: int = 5, verbose: bool = True
+) -> Dict[str, Any]:
+    report = {
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "targets": {},
+    }
+    for target, forbidden in targets.items():
+        runs = [measure(target) for _ in range(repeat)]
+        best = min(runs, key=lambda run: run["ms"])
+        loaded = sorted(
+            {name.split(".")[0] for name in best["modules"]} & set(forbidden)
+        )
+        report["targets"][target] = {"ms": best["ms"], "forbidden_loaded": loaded}
+        if verbose:
+            heaviest = ", ".join(f"{name} {us / 1000:.0f}ms" for name, us in best["top"])
+            flag = f"  LOADS {', '.join(loaded)}" if loaded else ""
+            print(f"{target:<22} {best['ms']:8.1f} ms  [{heaviest}]{flag}")
+    return report
+
+
+def compare_with_baseline(
+    report: Dict[str, Any],
+    baseline: Optional[Dict[str, Any]],
+    tolerance: float = 0.25,
+    min_delta_ms: float = 20.0,
+) -> List[str]:
+    """Módulos proibidos carregados e alvos mais lentos que o baseline."""
+    problems = []
+    for target, row in report["targets"].items():
+        if row["forbidden_loaded"]:
+            problems.append(f"{target}: imports {', '.join(row['forbidden_loaded'])} eagerly")
+        base = (baseline or {}).get("targets", {}).get(target)
+        if base is None:
+            continue
+        delta = row["ms"] - base["ms"]
+        if delta > max(base["ms"] * tolerance, min_delta_ms):
+            problems.append(f"{target}: {base['ms']:.1f} ms -> {row['ms']:.1f} ms")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Tempo de import dos módulos de entrada")
+    parser.add_argument("targets", nargs="*", default=list(TARGETS), help="Módulos (default: todos)")
+    parser.add_argument("--repeat", type=int, default=5, help="Execuções por alvo (vale a melhor)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Grava o resultado como baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Aumento relativo tolerado")
+    parser.add_argument("--min-delta-ms", type=float, default=20.0, help="Aumento absoluto tolerado (ms)")
+    args = parser.parse_args(argv)
+
+    targets = {target: TARGETS.get(target, HEAVY) for target in args.targets}
+    report = run_importtime(targets, repeat=args.repeat)
+
+    if args.save_baseline:
+        save_baseline(report, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+
+    baseline = None if args.save_baseline else load_baseline(args.baseline)
+    if baseline is None and not args.save_baseline:
+        print(
+            f"WARNING: no baseline at {args.baseline}; import times not compared "
+            "(record one with --save-baseline)"
+        )
+    elif baseline is not None and baseline.get("python") != report["python"]:
+        print(
+            f"WARNING: baseline {args.baseline} was recorded with Python {baseline.get('python')}; "
+            "import times not compared"
+        )
+        baseline = None
+    problems = compare_with_baseline(report, baseline, args.tolerance, args.min_delta_ms)
+    for line in problems:
+        print(f"REGRESSION {line}")
+    if not problems:
+        print(
+            "No import-time regressions"
+            if baseline is not None
+            else "No eager heavy imports (times not compared)"
+        )
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
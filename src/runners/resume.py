@@ -0,0 +1,154 @@
+import hashlib
+import heapq
+import json
+import os
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Set
+
+# Ids recentes (em um set, ~70-100 bytes cada) antes da compactação automática
+DEFAULT_COMPACT_EVERY = 65_536
+
+
+def id_digest(post_id: str) -> int:
+    """Hash de 64 bits de um id (8 bytes por post no arquivo ordenado)."""
+    return int.from_bytes(
+        hashlib.blake2b(str(post_id).encode("utf-8"), digest_size=8).digest(), "little"
+    )
+
+
+class ResumeIndex:
+    """
+    Índice compacto dos ids já processados, para retomar uma execução.
+
+    Guarda só um hash de 64 bits por id, em dois arquivos ao lado do JSONL:
+
+    - ``<path>.idx``: hashes ordenados; carregado de uma vez com
+      ``array.frombytes`` (milissegundos mesmo para milhões de ids), ocupa
+      8 bytes por id em memória e é consultado por busca binária
+    - ``<path>.log``: hashes adicionados desde a última compactação
+      (append-only, um ``add`` por resultado gravado)
+
+    Os ids do log ficam também num ``set`` em memória (~70-100 bytes por id).
+    A cada ``compact_every`` ids novos, e em ``close()``, ``compact()`` funde o
+    log no arquivo ordenado, então a memória fica em ~8 bytes por id mais no
+    máximo ``compact_every`` ids recentes. Se o processo morrer antes, o log é
+    relido na próxima abertura.
+
+    Exemplo:
+        index = ResumeIndex.for_output("output/results.jsonl")
+        if post_id not in index: ...
+        index.add(post_id)
+        index.close()
+    """
+
+    def __init__(self, path: str, compact_every: int = DEFAULT_COMPACT_EVERY):
+        self.path = path
+        self.compact_every = compact_every
+        self.sorted_path = path + ".idx"
+        self.log_path = path + ".log"
+        self._lock = threading.Lock()
+
+        self._sorted = array("Q")
+        if os.path.exists(self.sorted_path):
+            with open(self.sorted_path, "rb") as f:
+                self._sorted.frombytes(f.read())
+        else:
+            # Marca o índice como existente, mesmo vazio (ver ``for_output``)
+            open(self.sorted_path, "wb").close()
+
+        self._recent: Set[int] = set()
+        if os.path.exists(self.log_path):
+            log = array("Q")
+            with open(self.log_path, "rb") as f:
+                data = f.read()
+            # Ignora um registro incompleto no fim (escrita interrompida)
+            log.frombytes(data[: len(data) - len(data) % log.itemsize])
+            # Sem os já compactados (processo morto entre gravar o .idx e esvaziar o log)
+            self._recent.update(d for d in log if not self._has_sorted(d))
+
+        self._log = open(self.log_path, "ab")
+
+    @classmethod
+    def for_output(cls, jsonl_path: str) -> "ResumeIndex":
+        """
+        Índice de um arquivo de resultados JSONL. Se o JSONL já existe mas o
+        índice não (ex: saídas geradas pelo notebook), o índice é construído
+        uma vez a partir do JSONL.
+        """
+        index_path = jsonl_path
+        rebuild = os.path.exists(jsonl_path) and not (
+            os.path.exists(index_path + ".idx") or os.path.exists(index_path + ".log")
+        )
+        index = cls(index_path)
+        if rebuild:
+            index.extend(_iter_jsonl_ids(jsonl_path))
+            index.compact()
+        return index
+
+    def __contains__(self, post_id: str) -> bool:
+        digest = id_digest(post_id)
+        return digest in self._recent or self._has_sorted(digest)
+
+    def __len__(self) -> int:
+        # ``_recent`` nunca contém hashes de ``_sorted``: a soma não conta id repetido
+        return len(self._sorted) + len(self._recent)
+
+    def add(self, post_id: str):
+        digest = id_digest(post_id)
+        with self._lock:
+            if digest in self._recent or self._has_sorted(digest):
+                return
+            self._recent.add(digest)
+            self._log.write(digest.to_bytes(8, "little"))
+            self._log.flush()
+            if len(self._recent) >= self.compact_every:
+                self._compact()
+
+    def extend(self, post_ids: Iterable[str]):
+        for post_id in post_ids:
+            self.add(post_id)
+
+    def compact(self):
+        """Funde os ids recentes no arquivo ordenado e esvazia o log."""
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        if not self._recent:
+            return
+        merged = array("Q", heapq.merge(self._sorted, sorted(self._recent)))
+
+        tmp_path = self.sorted_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            merged.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.sorted_path)
+
+        self._sorted = merged
+        self._recent.clear()
+        self._log.close()
+        self._log = open(self.log_path, "wb")
+
+    def _has_sorted(self, digest: int) -> bool:
+        i = bisect_left(self._sorted, digest)
+        return i < len(self._sorted) and self._sorted[i] == digest
+
+    def close(self):
+        self.compact()
+        self._log.close()
+        if os.path.exists(self.log_path) and os.path.getsize(self.log_path) == 0:
+            os.remove(self.log_path)
+
+
+def _iter_jsonl_ids(jsonl_path: str):
+    with open(jsonl_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                post_id = json.loads(line).get("id_mention")
+            except (json.JSONDecodeError, AttributeError):
+                continue
+            if post_id is not None:
+                yield post_id
@@ -1,10 +1,41 @@
-from src.utils.observability import (
-    UsageMetadataCallbackHandler,
-    track_node_metrics,
-    print_metrics_summary,
-    set_callback_handler,
-    get_callback_handler,
-)
+import importlib
+from typing import TYPE_CHECKING
+
+# Reexportações carregadas no primeiro acesso: ``import src.utils.dedup``
+# não deve pagar o import do Tavily, do LangChain e do LangGraph
+_EXPORTS = {
+    "UsageMetadataCallbackHandler": "src.utils.observability",
+    "track_node_metrics": "src.utils.observability",
+    "print_metrics_summary": "src.utils.observability",
+    "set_callback_handler": "src.utils.observability",
+    "get_callback_handler": "src.utils.observability",
+    "increment_node_counter": "src.utils.observability",
+    "set_node_metric": "src.utils.observability",
+    "create_tavily_client": "src.utils.search",
+    "search_queries": "src.utils.search",
+    "asearch_queries": "src.utils.search",
+    "SearchCache": "src.utils.search_cache",
+    "CachedTavilyClient": "src.utils.search_cache",
+    "PostDeduplicator": "src.utils.dedup",
+    "dedup_posts": "src.utils.dedup",
+    "normalize_post": "src.utils.dedup",
+    "LexicalPrefilter": "src.utils.prefilter",
+    "NaiveBayesModel": "src.utils.prefilter",
+    "Cassette": "src.utils.cassette",
+    "CassetteMissError": "src.utils.cassette",
+    "MetricsAggregator": "src.utils.metrics_export",
+    "JsonlSnapshotWriter": "src.utils.metrics_export",
+    "start_metrics_server": "src.utils.metrics_export",
+    "StageCache": "src.utils.stage_cache",
+    "ClaimVerdictCache": "src.utils.claim_cache",
+    "split_claims": "src.utils.claim_cache",
+    "normalize_claim": "src.utils.claim_cache",
+    "SnippetStore": "src.utils.snippet_store",
+    "rehydrate": "src.utils.snippet_store",
+    "get_snippet_store": "src.utils.snippet_store",
+    "set_snippet_store": "src.utils.snippet_store",
+    "MissingSnippetsError": "src.utils.snippet_store",
+}
 
 __all__ = [
     "UsageMetadataCallbackHandler",
@@ -12,4 +43,73 @@ __all__ = [
     "print_metrics_summary",
     "set_callback_handler",
     "get_callback_handler",
+    "increment_node_counter",
+    "set_node_metric",
+    "create_tavily_client",
+    "search_queries",
+    "asearch_queries",
+    "SearchCache",
+    "CachedTavilyClient",
+    "PostDeduplicator",
+    "dedup_posts",
+    "normalize_post",
+    "LexicalPrefilter",
+    "NaiveBayesModel",
+    "Cassette",
+    "CassetteMissError",
+    "MetricsAggregator",
+    "JsonlSnapshotWriter",
+    "start_metrics_server",
+    "StageCache",
+    "ClaimVerdictCache",
+    "split_claims",
+    "normalize_claim",
+    "SnippetStore",
+    "rehydrate",
+    "get_snippet_store",
+    "set_snippet_store",
+    "MissingSnippetsError",
 ]
+
+if TYPE_CHECKING:
+    from src.utils.observability import (
+        UsageMetadataCallbackHandler,
+        track_node_metrics,
+        print_metrics_summary,
+        set_callback_handler,
+        get_callback_handler,
+        increment_node_counter,
+        set_node_metric,
+    )
+    from src.utils.search import create_tavily_client, search_queries, asearch_queries
+    from src.utils.search_cache import SearchCache, CachedTavilyClient
+    from src.utils.dedup import PostDeduplicator, dedup_posts, normalize_post
+    from src.utils.prefilter import LexicalPrefilter, NaiveBayesModel
+    from src.utils.cassette import Cassette, CassetteMissError
+    from src.utils.metrics_export import (
+        MetricsAggregator,
+        JsonlSnapshotWriter,
+        start_metrics_server,
+    )
+    from src.utils.stage_cache import StageCache
+    from src.utils.claim_cache import ClaimVerdictCache, split_claims, normalize_claim
+    from src.utils.snippet_store import (
+        SnippetStore,
+        rehydrate,
+        get_snippet_store,
+        set_snippet_store,
+        MissingSnippetsError,
+    )
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
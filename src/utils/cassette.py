@@ -0,0 +1,337 @@
+"""
+Cassete de gravação/reprodução das chamadas ao modelo de chat e ao Tavily.
+
+Em modo ``record`` toda chamada de modelo (mensagem bruta, com
+``usage_metadata``) e toda busca do Tavily são gravadas com a latência
+original. Em modo ``replay`` as mesmas chamadas são servidas do arquivo, sem
+serviços externos: na latência gravada (``realtime=True``) ou o mais rápido
+possível. Serve para repetir um lote de produção de forma determinística e
+medir só o pipeline.
+
+O arquivo é um JSONL gzip endereçado por conteúdo: cada resposta é gravada
+uma única vez (linha ``blob``, chave = sha256 do conteúdo) e cada chamada
+aponta para o seu blob (linha ``call``, chave = sha256 da requisição).
+
+Exemplo:
+    cassette = Cassette("cache/run.cassette.gz", mode="record")
+    models_registry = ModelsRegistry(..., cassette=cassette)
+    tavily = cassette.wrap_tavily(create_tavily_client(api_key))
+    ...
+    cassette.close()
+
+    cassette = Cassette("cache/run.cassette.gz", mode="replay")
+    models_registry = ModelsRegistry(..., cassette=cassette)
+    tavily = cassette.wrap_tavily(None)
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    convert_to_messages,
+    message_to_dict,
+    messages_from_dict,
+)
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+
+from src.models.wrappers import RunnableWrapper
+from src.utils.search_cache import make_cache_key
+
+MODES = ("record", "replay")
+
+
+class CassetteMissError(KeyError):
+    """Chamada sem resposta gravada no cassete (modo replay)."""
+
+
+def _digest(payload: Any) -> str:
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _schema_name(schema: Any) -> str:
+    if isinstance(schema, dict):
+        return schema.get("title") or _digest(schema)[:16]
+    return getattr(schema, "__name__", str(schema))
+
+
+def llm_request_key(model: str, schema: Optional[str], messages: Any) -> str:
+    """Chave de uma chamada de modelo: config do modelo, schema e mensagens."""
+    messages = convert_to_messages(messages)
+    return _digest(
+        {"model": model, "schema": schema, "messages": [[m.type, m.content] for m in messages]}
+    )
+
+
+def search_request_key(query: str, max_results: int, **kwargs) -> str:
+    """Chave de uma busca (a mesma normalização do ``SearchCache``)."""
+    return make_cache_key(query, max_results, **kwargs)
+
+
+class Cassette:
+    """
+    Arquivo de gravação/reprodução. Thread-safe.
+
+    Args:
+        path: Arquivo do cassete (JSONL gzip)
+        mode: "record" (acrescenta ao arquivo) ou "replay" (só leitura)
+        realtime: No replay, espera a latência gravada de cada chamada
+    """
+
+    def __init__(self, path: str, mode: str = "replay", realtime: bool = False):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}' (expected one of {MODES})")
+        self.path = path
+        self.mode = mode
+        self.realtime = realtime
+        self._lock = threading.Lock()
+
+        self._blobs: Dict[str, Any] = {}
+        # chave da requisição -> [(blob, latência)], servidas em ordem no replay
+        self._calls: Dict[Tuple[str, str], List[Tuple[str, float]]] = defaultdict(list)
+        self._served: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._replay_models: Dict[str, "ReplayChatModel"] = {}
+
+        self.recorded = 0
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.exists(path):
+            self._load()
+        self._file = None
+        if mode == "record":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = gzip.open(path, "at", encoding="utf-8")
+
+    def _load(self):
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if entry["type"] == "blob":
+                        self._blobs[entry["id"]] = entry["data"]
+                    else:
+                        self._calls[(entry["kind"], entry["key"])].append(
+                            (entry["blob"], entry["latency"])
+                        )
+        except (EOFError, gzip.BadGzipFile, zlib.error):
+            # Final truncado (processo interrompido durante a gravação)
+            pass
+
+    # Gravação / leitura
+
+    def record(self, kind: str, key: str, payload: Any, latency: float):
+        blob_id = _digest(payload)
+        with self._lock:
+            lines = []
+            if blob_id not in self._blobs:
+                self._blobs[blob_id] = payload
+                lines.append({"type": "blob", "id": blob_id, "data": payload})
+            self._calls[(kind, key)].append((blob_id, latency))
+            lines.append(
+                {"type": "call", "kind": kind, "key": key, "blob": blob_id, "latency": round(latency, 4)}
+            )
+            for line in lines:
+                self._file.write(json.dumps(line, ensure_ascii=False) + "\n")
+            self.recorded += 1
+
+    def lookup(self, kind: str, key: str) -> Tuple[Any, float]:
+        """
+        Resposta gravada para a chamada. Requisições repetidas recebem as
+        respostas na ordem em que foram gravadas (a última se repete).
+        """
+        with self._lock:
+            calls = self._calls.get((kind, key))
+            if not calls:
+                self.misses += 1
+                raise CassetteMissError(f"No recorded {kind} call for key {key[:12]}")
+            index = min(self._served[(kind, key)], len(calls) - 1)
+            self._served[(kind, key)] += 1
+            self.hits += 1
+            blob_id, latency = calls[index]
+            return self._blobs[blob_id], latency
+
+    def wait(self, latency: float):
+        if self.realtime and latency > 0:
+            time.sleep(latency)
+
+    async def await_latency(self, latency: float):
+        if self.realtime and latency > 0:
+            await asyncio.sleep(latency)
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __len__(self) -> int:
+        return sum(len(calls) for calls in self._calls.values())
+
+    # Integração com ModelsRegistry / RuntimeContext
+
+    def wrap_model(self, model: Any, config: Any) -> Any:
+        """Modelo a usar para ``config`` (chamado por ``ModelsRegistry.get_model``)."""
+        model_key = config.model_dump_json()
+        if self.mode == "record":
+            return RecordingModel(model, self, model_key)
+        with self._lock:
+            replay = self._replay_models.get(model_key)
+            if replay is None:
+                replay = self._replay_models[model_key] = ReplayChatModel(
+                    cassette=self, model_key=model_key, model_name=config.model
+                )
+            return replay
+
+    def wrap_tavily(self, client: Any) -> Any:
+        """Cliente a usar em ``RuntimeContext.tavily`` (no replay ``client`` é ignorado)."""
+        if self.mode == "replay":
+            return ReplayTavilyClient(self)
+        return RecordingTavilyClient(client, self)
+
+
+class RecordingModel(RunnableWrapper):
+    """Grava a mensagem bruta (com ``usage_metadata``) de cada chamada do modelo."""
+
+    def __init__(self, bound: Any, cassette: Cassette, model_key: str):
+        super().__init__(bound)
+        self.cassette = cassette
+        self.model_key = model_key
+        self.schema: Optional[str] = None
+        self.include_raw = False
+
+    def with_structured_output(self, schema: Any, include_raw: bool = False, **kwargs):
+        # A mensagem bruta é necessária para gravar: pede sempre include_raw
+        # e devolve ao nó o formato que ele pediu
+        wrapper = self.rewrap(self.bound.with_structured_output(schema, include_raw=True, **kwargs))
+        wrapper.schema = _schema_name(schema)
+        wrapper.include_raw = include_raw
+        return wrapper
+
+    def _record(self, input: Any, result: Any, latency: float) -> Any:
+        raw = result if self.schema is None else result["raw"]
+        key = llm_request_key(self.model_key, self.schema, input)
+        self.cassette.record("llm", key, message_to_dict(raw), latency)
+        if self.schema is None or self.include_raw:
+            return result
+        if result.get("parsing_error") is not None:
+            raise result["parsing_error"]
+        return result["parsed"]
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        start = time.perf_counter()
+        result = self.bound.invoke(input, config, **kwargs)
+        return self._record(input, result, time.perf_counter() - start)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs) -> Any:
+        start = time.perf_counter()
+        result = await self.bound.ainvoke(input, config, **kwargs)
+        return self._record(input, result, time.perf_counter() - start)
+
+
+def _parse_structured(message: AIMessage, schema: Any) -> Any:
+    if message.tool_calls:
+        data = message.tool_calls[0]["args"]
+    else:
+        try:
+            data = json.loads(message.content)
+        except (TypeError, json.JSONDecodeError) as e:
+            raise OutputParserException(f"Invalid JSON in recorded response: {e}") from e
+    if isinstance(schema, dict):
+        return data
+    return schema.model_validate(data)
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    Modelo de chat que devolve as mensagens gravadas no cassete. Como é um
+    ``BaseChatModel``, os callbacks (e a contagem de tokens por nó) funcionam
+    como numa execução real.
+    """
+
+    cassette: Any
+    model_key: str
+    model_name: str = "replay"
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette-replay"
+
+    def with_structured_output(self, schema: Any, include_raw: bool = False, **kwargs):
+        def parse(message: AIMessage) -> Any:
+            if not include_raw:
+                return _parse_structured(message, schema)
+            try:
+                parsed, error = _parse_structured(message, schema), None
+            except Exception as e:
+                parsed, error = None, e
+            return {"raw": message, "parsed": parsed, "parsing_error": error}
+
+        return self.bind(cassette_schema=_schema_name(schema)) | RunnableLambda(parse)
+
+    def _lookup(self, messages: List[Any], schema: Optional[str]) -> Tuple[ChatResult, float]:
+        payload, latency = self.cassette.lookup("llm", llm_request_key(self.model_key, schema, messages))
+        message = messages_from_dict([payload])[0]
+        return ChatResult(generations=[ChatGeneration(message=message)]), latency
+
+    def _generate(self, messages, stop=None, run_manager=None, cassette_schema=None, **kwargs):
+        result, latency = self._lookup(messages, cassette_schema)
+        self.cassette.wait(latency)
+        return result
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, cassette_schema=None, **kwargs):
+        result, latency = self._lookup(messages, cassette_schema)
+        await self.cassette.await_latency(latency)
+        return result
+
+
+class RecordingTavilyClient:
+    """Wrapper de TavilyClient que grava cada busca no cassete."""
+
+    def __init__(self, client: Any, cassette: Cassette):
+        self.client = client
+        self.cassette = cassette
+
+    def search(self, query: str, max_results: int = 5, **kwargs) -> dict:
+        start = time.perf_counter()
+        response = self.client.search(query=query, max_results=max_results, **kwargs)
+        latency = time.perf_counter() - start
+        self.cassette.record("search", search_request_key(query, max_results, **kwargs), response, latency)
+        return response
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+
+class ReplayTavilyClient:
+    """Substituto do TavilyClient que serve as buscas gravadas no cassete."""
+
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+
+    def search(self, query: str, max_results: int = 5, **kwargs) -> dict:
+        response, latency = self.cassette.lookup(
+            "search", search_request_key(query, max_results, **kwargs)
+        )
+        self.cassette.wait(latency)
+        return response
@@ -0,0 +1,172 @@
+"""
+Cache de vereditos por afirmação, compartilhado entre posts.
+
+Posts diferentes repetem as mesmas afirmações ("Cloroquina cura COVID").
+O plano do planner é dividido em afirmações atômicas (``split_claims``) e cada
+uma, normalizada (``normalize_claim``), aponta para o último veredito do
+analyst sobre ela: score, justificativa e fontes (``Reference``, com o hash do
+trecho no ``SnippetStore``), com TTL.
+
+Os itens do plano são passos de verificação ("Verificar a data do evento"),
+muitas vezes genéricos. A chave de uma afirmação usa só palavras que também
+estão no post, sem termos genéricos de verificação, e precisa de pelo menos
+``MIN_CLAIM_TOKENS`` delas: passos genéricos não viram chave compartilhada
+entre posts sem relação.
+
+Quando todas as afirmações de um post têm veredito válido, o grafo v1 pula
+a pesquisa e o analyst só agrega os vereditos (``CLAIM_AGGREGATION_PROMPT``).
+Hits e misses ficam nas métricas do planner (``claim_hits``/``claim_misses``).
+
+Exemplo:
+    RuntimeContext(..., claim_cache=ClaimVerdictCache("cache/claim_cache.sqlite"))
+"""
+
+import hashlib
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.utils.dedup import normalize_post
+from src.utils.evidence import STOPWORDS
+from src.utils.search_cache import DEFAULT_MAX_ENTRIES, SearchCache
+
+DEFAULT_CLAIM_CACHE_PATH = "cache/claim_cache.sqlite"
+DEFAULT_CLAIM_TTL_SECONDS = 3 * 24 * 3600
+DEFAULT_MAX_CLAIMS = 8
+MIN_CLAIM_TOKENS = 4
+
+_LIST_ITEM_RE = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s+(.+)$")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+_MARKDOWN_RE = re.compile(r"[*_`#>]+")
+# Verbos de instrução do plano ("Verificar se ...") que não fazem parte da afirmação
+_FILLER = frozenset("verificar confirmar checar conferir avaliar investigar identificar".split())
+# Termos genéricos dos passos de verificação, que não identificam uma afirmação
+_GENERIC = frozenset(
+    """afirmacao afirmacoes alegacao alegacoes autor autoria buscar citada citadas
+    citado citados consultar contexto dado dados data datas evento eventos existe
+    fato fatos fonte fontes informacao informacoes mencionada mencionadas mencionado
+    mencionados noticia noticias numero numeros oficiais oficial origem post postagem
+    procurar publicacao publicacoes real relacionadas relacionados veracidade
+    verdade verdadeira verdadeiro""".split()
+)
+
+
+def _tokens(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKD", normalize_post(text))
+    return "".join(c for c in text if not unicodedata.combining(c)).split()
+
+
+def normalize_claim(claim: str, post: Optional[str] = None) -> str:
+    """
+    Forma canônica de uma afirmação: sem acentos, pontuação, stopwords, verbos
+    de instrução e termos genéricos, de forma que "Verificar se a cloroquina
+    cura a COVID-19" e "cloroquina cura covid 19" tenham a mesma chave. Com
+    ``post``, só ficam as palavras que também aparecem no post.
+    """
+    allowed = set(_tokens(post)) if post is not None else None
+    return " ".join(
+        t
+        for t in _tokens(claim)
+        if t not in STOPWORDS
+        and t not in _FILLER
+        and t not in _GENERIC
+        and (allowed is None or t in allowed)
+    )
+
+
+def claim_key(claim: str, post: Optional[str] = None) -> str:
+    return hashlib.sha256(normalize_claim(claim, post).encode("utf-8")).hexdigest()
+
+
+def split_claims(
+    plan: str, post: Optional[str] = None, max_claims: int = DEFAULT_MAX_CLAIMS
+) -> List[str]:
+    """
+    Afirmações atômicas do plano: os itens de lista (ou, sem lista, as frases),
+    sem títulos de seção e sem repetições após a normalização. Itens com menos
+    de ``MIN_CLAIM_TOKENS`` palavras específicas (do ``post``, se informado)
+    ficam de fora.
+    """
+    lines = (plan or "").splitlines()
+    items = [m.group(1) for m in map(_LIST_ITEM_RE.match, lines) if m]
+    if not items:
+        items = _SENTENCE_RE.split(plan or "")
+
+    claims: List[str] = []
+    seen = set()
+    for item in items:
+        text = _MARKDOWN_RE.sub("", item).strip()
+        if not text or text.endswith(":"):
+            continue
+        key = normalize_claim(text, post)
+        if len(key.split()) < MIN_CLAIM_TOKENS or key in seen:
+            continue
+        seen.add(key)
+        claims.append(text)
+    return claims[:max_claims]
+
+
+def compact_references(references: Iterable[Any]) -> List[Dict[str, Any]]:
+    """Referências do post (``Reference``) como dicts, sem URLs repetidas."""
+    seen = set()
+    compact = []
+    for reference in references:
+        if reference.url in seen:
+            continue
+        seen.add(reference.url)
+        compact.append(reference.model_dump())
+    return compact
+
+
+def format_verdicts(verdicts: List[Dict[str, Any]]) -> str:
+    """Vereditos em texto para o prompt de agregação."""
+    lines = []
+    for i, verdict in enumerate(verdicts, 1):
+        sources = ", ".join(r["url"] for r in verdict.get("references", []) if r.get("url"))
+        lines.append(
+            f"[{i}] {verdict['claim']}\n"
+            f"    score: {verdict['score']:.2f}\n"
+            f"    justificativa: {verdict['justification']}"
+            + (f"\n    fontes: {sources}" if sources else "")
+        )
+    return "\n".join(lines)
+
+
+class ClaimVerdictCache(SearchCache):
+    """
+    Vereditos por afirmação normalizada, persistidos em SQLite com TTL e
+    evicção LRU (mesmo armazenamento do ``SearchCache``). Thread-safe.
+    """
+
+    table = "claim_verdicts"
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CLAIM_CACHE_PATH,
+        ttl_seconds: Optional[float] = DEFAULT_CLAIM_TTL_SECONDS,
+        max_entries: Optional[int] = DEFAULT_MAX_ENTRIES,
+    ):
+        super().__init__(path, ttl_seconds=ttl_seconds, max_entries=max_entries)
+
+    def get_verdict(self, claim: str, post: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Veredito válido (dentro do TTL) da afirmação, ou None. ``post`` como em ``split_claims``."""
+        return self.get(claim_key(claim, post))
+
+    def set_verdict(
+        self,
+        claim: str,
+        score: float,
+        justification: str,
+        references: Optional[List[Dict[str, Any]]] = None,
+        post: Optional[str] = None,
+    ):
+        self.set(
+            claim_key(claim, post),
+            claim,
+            {
+                "claim": claim,
+                "score": score,
+                "justification": justification,
+                "references": references or [],
+            },
+        )
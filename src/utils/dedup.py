@@ -0,0 +1,198 @@
+import re
+import threading
+import unicodedata
+import zlib
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_URL_RE = re.compile(r"(https?://\S+|www\.\S+)")
+_HASHTAG_RE = re.compile(r"#\w+")
+_RETWEET_RE = re.compile(r"^\s*rt\s+@\w+:?", re.IGNORECASE)
+_NON_WORD_RE = re.compile(r"[^\w\s]|_")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Primo de Mersenne usado nas permutações do MinHash
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def normalize_post(text: str, strip_hashtags: bool = True) -> str:
+    """
+    Normaliza o texto de um post para comparação.
+
+    Remove prefixo de retweet, URLs, hashtags, emoji e pontuação; aplica NFKC,
+    casefold e colapsa espaços. Reposts que só diferem nesses pontos ficam iguais.
+    """
+    text = unicodedata.normalize("NFKC", text or "")
+    text = _RETWEET_RE.sub(" ", text)
+    text = _URL_RE.sub(" ", text)
+    if strip_hashtags:
+        text = _HASHTAG_RE.sub(" ", text)
+    text = _NON_WORD_RE.sub(" ", text.casefold())
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def _shingles(text: str, size: int) -> set:
+    if len(text) <= size:
+        return {text}
+    return {text[i : i + size] for i in range(len(text) - size + 1)}
+
+
+class PostDeduplicator:
+    """
+    Índice online de posts para detectar duplicatas exatas e quase-duplicatas.
+
+    - Duplicata exata: mesmo texto após ``normalize_post``
+    - Quase-duplicata: similaridade de Jaccard (estimada via MinHash sobre
+      shingles de caracteres, com índice LSH por bandas) >= ``threshold``
+
+    O primeiro post visto de cada grupo é o canônico; os seguintes apontam para ele.
+    Thread-safe.
+
+    Exemplo:
+        dedup = PostDeduplicator()
+        dedup.add("1", "Cloroquina cura COVID!!! #fato")  # -> None (canônico)
+        dedup.add("2", "cloroquina cura covid https://t.co/x")  # -> "1"
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.85,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 4,
+        min_length: int = 20,
+    ):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        # Textos normalizados mais curtos que isso só casam por igualdade exata
+        self.min_length = min_length
+
+        # Coeficientes fixos (determinísticos entre execuções) das permutações
+        self._perms: List[Tuple[int, int]] = [
+            (
+                (zlib.crc32(f"a{i}".encode()) << 16 | 1) % _MERSENNE_PRIME,
+                zlib.crc32(f"b{i}".encode()) % _MERSENNE_PRIME,
+            )
+            for i in range(num_perm)
+        ]
+
+        self._exact: Dict[str, str] = {}
+        self._signatures: Dict[str, Tuple[int, ...]] = {}
+        self._buckets: List[Dict[Tuple[int, ...], List[str]]] = [
+            {} for _ in range(bands)
+        ]
+        self._lock = threading.Lock()
+
+    def _signature(self, normalized: str) -> Tuple[int, ...]:
+        hashes = [
+            zlib.crc32(s.encode("utf-8"))
+            for s in _shingles(normalized, self.shingle_size)
+        ]
+        return tuple(
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._perms
+        )
+
+    def _band_keys(self, signature: Tuple[int, ...]) -> Iterable[Tuple[int, ...]]:
+        for band in range(self.bands):
+            yield signature[band * self.rows : (band + 1) * self.rows]
+
+    @staticmethod
+    def _similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+        return sum(a == b for a, b in zip(sig_a, sig_b)) / len(sig_a)
+
+    def add(self, post_id: str, text: str) -> Optional[str]:
+        """
+        Registra um post e retorna o ``id`` do canônico se ele for duplicata.
+
+        Returns:
+            ``None`` se o post é novo (vira canônico do seu grupo), ou o id
+            do post canônico do qual ele é duplicata
+        """
+        normalized = normalize_post(text)
+        if not normalized:
+            # Posts só com hashtags/emoji/links: compara as hashtags em si
+            normalized = "#" + normalize_post(text, strip_hashtags=False)
+
+        with self._lock:
+            canonical = self._exact.get(normalized)
+            if canonical is not None:
+                return canonical
+
+            signature = None
+            if len(normalized) >= self.min_length:
+                signature = self._signature(normalized)
+                best_id, best_sim = None, 0.0
+                seen = set()
+                for band, key in enumerate(self._band_keys(signature)):
+                    for candidate in self._buckets[band].get(key, ()):
+                        if candidate in seen:
+                            continue
+                        seen.add(candidate)
+                        sim = self._similarity(signature, self._signatures[candidate])
+                        if sim > best_sim:
+                            best_id, best_sim = candidate, sim
+                if best_id is not None and best_sim >= self.threshold:
+                    self._exact[normalized] = best_id
+                    return best_id
+
+            # Post novo: vira canônico
+            self._exact[normalized] = post_id
+            if signature is not None:
+                self._signatures[post_id] = signature
+                for band, key in enumerate(self._band_keys(signature)):
+                    self._buckets[band].setdefault(key, []).append(post_id)
+            return None
+
+    def __len__(self) -> int:
+        """Número de posts canônicos indexados."""
+        return len(set(self._exact.values()))
+
+
+def dedup_posts(
+    posts: Iterable[Tuple[str, str]], deduplicator: Optional[PostDeduplicator] = None
+) -> Tuple[List[Tuple[str, str]], Dict[str, str]]:
+    """
+    Separa posts canônicos das duplicatas.
+
+    Returns:
+        Tupla ``(unique, duplicates)``: lista de ``(id, texto)`` a processar e
+        mapa ``id_duplicata -> id_canonico``
+    """
+    deduplicator = deduplicator or PostDeduplicator()
+    unique: List[Tuple[str, str]] = []
+    duplicates: Dict[str, str] = {}
+    for post_id, text in posts:
+        canonical = deduplicator.add(post_id, text)
+        if canonical is None:
+            unique.append((post_id, text))
+        else:
+            duplicates[post_id] = canonical
+    return unique, duplicates
+
+
+def duplicate_result(canonical_result: dict, post_id: str, post_text: str) -> dict:
+    """
+    Gera o resultado de uma duplicata a partir do resultado do canônico.
+
+    As métricas ficam vazias (nenhuma chamada LLM foi feita para a duplicata) e
+    ``duplicate_of`` aponta para o ``id_mention`` canônico.
+    """
+    result = dict(canonical_result)
+    result.update(
+        {
+            "id_mention": post_id,
+            "full_text": post_text,
+            "duplicate_of": canonical_result["id_mention"],
+            "timestamp": datetime.now().isoformat(),
+            "processing_time_s": 0.0,
+            "metrics": {},
+        }
+    )
+    return result
@@ -0,0 +1,162 @@
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from src.utils.dedup import _shingles, normalize_post
+
+DEFAULT_TOKEN_BUDGET = 2000
+DEFAULT_PASSAGE_WORDS = 60
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+# Palavras muito frequentes em português, ignoradas no ranking
+STOPWORDS = frozenset(
+    """a ao aos as com como da das de do dos e em entre era essa esse esta este
+    foi for foram ha isso isto ja mais mas na nas nao no nos o os ou para pela
+    pelas pelo pelos por qual quando que se sem ser seu sua sao tambem tem um uma
+    the and of to in is for on""".split()
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa de tokens sem tokenizer (~4 caracteres por token)."""
+    return (len(text) + 3) // 4
+
+
+def _terms(text: str) -> List[str]:
+    return [
+        t for t in normalize_post(text, strip_hashtags=False).split()
+        if len(t) > 1 and t not in STOPWORDS
+    ]
+
+
+def split_passages(
+    content: List[str], max_words: int = DEFAULT_PASSAGE_WORDS
+) -> List[Tuple[str, str]]:
+    """
+    Divide cada trecho retornado pela busca em passagens de até ``max_words``
+    palavras, respeitando o fim das frases quando possível.
+
+    Returns:
+        Lista de ``(id, texto)``, com id ``"<trecho>:<passagem>"``
+    """
+    passages = []
+    for doc_index, text in enumerate(content):
+        current: List[str] = []
+        count = 0
+        part = 0
+        for sentence in _SENTENCE_RE.split(text or ""):
+            words = sentence.split()
+            if not words:
+                continue
+            if current and count + len(words) > max_words:
+                passages.append((f"{doc_index}:{part}", " ".join(current)))
+                part += 1
+                current, count = [], 0
+            # Frases maiores que o limite são cortadas em pedaços
+            while len(words) > max_words:
+                passages.append((f"{doc_index}:{part}", " ".join(words[:max_words])))
+                part += 1
+                words = words[max_words:]
+            current.extend(words)
+            count += len(words)
+        if current:
+            passages.append((f"{doc_index}:{part}", " ".join(current)))
+    return passages
+
+
+def bm25_scores(
+    query: str, documents: List[str], k1: float = 1.5, b: float = 0.75
+) -> List[float]:
+    """Scores Okapi BM25 de cada documento para ``query`` (IDF calculado nos próprios documentos)."""
+    docs = [_terms(d) for d in documents]
+    if not docs:
+        return []
+    avg_len = sum(len(d) for d in docs) / len(docs) or 1.0
+    doc_freq: Counter = Counter()
+    for d in docs:
+        doc_freq.update(set(d))
+
+    query_terms = set(_terms(query))
+    n = len(docs)
+    idf: Dict[str, float] = {
+        t: math.log(1 + (n - doc_freq[t] + 0.5) / (doc_freq[t] + 0.5)) for t in query_terms
+    }
+
+    scores = []
+    for d in docs:
+        tf = Counter(d)
+        norm = k1 * (1 - b + b * len(d) / avg_len)
+        scores.append(
+            sum(idf[t] * tf[t] * (k1 + 1) / (tf[t] + norm) for t in query_terms if t in tf)
+        )
+    return scores
+
+
+@dataclass
+class EvidenceSelection:
+    passages: List[str] = field(default_factory=list)
+    passage_ids: List[str] = field(default_factory=list)
+    input_tokens: int = 0
+    selected_tokens: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.input_tokens - self.selected_tokens)
+
+
+def select_evidence(
+    content: List[str],
+    query: str,
+    token_budget: int = DEFAULT_TOKEN_BUDGET,
+    max_words: int = DEFAULT_PASSAGE_WORDS,
+    near_duplicate_threshold: float = 0.8,
+) -> EvidenceSelection:
+    """
+    Seleciona as passagens mais relevantes para o analyst dentro de um orçamento de tokens.
+
+    1. Divide o conteúdo da busca em passagens (``split_passages``)
+    2. Descarta duplicatas exatas (após ``normalize_post``) e quase-duplicatas
+       (Jaccard de shingles de caracteres >= ``near_duplicate_threshold``),
+       comuns quando queries diferentes retornam a mesma página
+    3. Ordena por BM25 contra ``query`` (post + plano)
+    4. Inclui as passagens em ordem de score enquanto couberem em ``token_budget``
+
+    As passagens selecionadas voltam na ordem de score (mais relevante primeiro).
+    """
+    input_tokens = estimate_tokens("\n\n".join(content))
+    passages = split_passages(content, max_words=max_words)
+
+    unique: List[Tuple[str, str]] = []
+    seen_texts = set()
+    kept_shingles: List[set] = []
+    for passage_id, text in passages:
+        normalized = normalize_post(text, strip_hashtags=False)
+        if not normalized or normalized in seen_texts:
+            continue
+        shingles = _shingles(normalized, 5)
+        if any(
+            len(shingles & other) / len(shingles | other) >= near_duplicate_threshold
+            for other in kept_shingles
+        ):
+            continue
+        seen_texts.add(normalized)
+        kept_shingles.append(shingles)
+        unique.append((passage_id, text))
+
+    scores = bm25_scores(query, [text for _, text in unique])
+    ranked = sorted(range(len(unique)), key=lambda i: scores[i], reverse=True)
+
+    selection = EvidenceSelection(input_tokens=input_tokens)
+    # Separador "\n\n" entre passagens conta como 1 token
+    for i in ranked:
+        passage_id, text = unique[i]
+        cost = estimate_tokens(text) + 1
+        if selection.selected_tokens + cost > token_budget:
+            continue
+        selection.passages.append(text)
+        selection.passage_ids.append(passage_id)
+        selection.selected_tokens += cost
+    return selection
@@ -0,0 +1,405 @@
+"""
+Métricas agregadas de um lote em execução, a partir dos ``Metrics`` de cada nó.
+
+Expostas em formato texto do Prometheus (endpoint HTTP local) e em snapshots
+periódicos num arquivo JSONL.
+
+Exemplo:
+    aggregator = MetricsAggregator()
+    server = start_metrics_server(aggregator, port=9464)  # GET /metrics
+    snapshots = JsonlSnapshotWriter(aggregator, "output/metrics.jsonl", interval=30)
+    results = run_batch(posts, models_registry, tavily, metrics=aggregator)
+    snapshots.stop(); server.shutdown()
+"""
+
+import bisect
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Tuple
+
+from src.models.schemas import Metrics
+
+# Limites (segundos) dos buckets do histograma de latência por nó
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _quantile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class _Histogram:
+    """Histograma cumulativo (estilo Prometheus) + janela recente para quantis."""
+
+    def __init__(self, window: int):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent: Deque[float] = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def quantiles(self) -> Dict[str, float]:
+        values = sorted(self.recent)
+        return {f"p{int(q * 100)}": _quantile(values, q) for q in QUANTILES}
+
+
+class MetricsAggregator:
+    """
+    Agrega métricas de todos os posts de um lote. Thread-safe.
+
+    Alimentado por ``post_started()``/``post_finished(result)``, onde ``result``
+    é o registro produzido pelo runner (com ``success`` e ``metrics`` por nó).
+    Com ``pool``, inclui também o estado de cada endpoint de modelo
+    (``ModelClientPool.endpoint_stats``: em andamento, latência, saúde, retries).
+    """
+
+    def __init__(self, window: int = 5000, rate_window: float = 60.0, pool: Any = None):
+        self.window = window
+        self.rate_window = rate_window
+        self.pool = pool
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+        self.in_flight = 0
+        self.posts_started = 0
+        self.posts_finished = 0
+        self.errors = 0
+        self.relevant = 0
+        self.duplicates = 0
+        self._finish_times: Deque[float] = deque()
+
+        self._latency: Dict[str, _Histogram] = {}
+        # Por modelo: tokens e tempo gasto nos nós que o usaram
+        self._model_tokens: Dict[str, Dict[str, float]] = {}
+        self._cache = {"hits": 0, "misses": 0}
+        self._speculation = {"saved_s": 0.0, "wasted_tokens": 0}
+        # Cascata do analyst: posts analisados e quantos escalaram
+        self._cascade = {"analyzed": 0, "escalated": 0}
+        # Saída estruturada: respostas rejeitadas pelo parser e quantas foram reparadas
+        self._structured = {"parse_failures": 0, "repaired": 0}
+        # Cache de afirmações: hits/misses e posts resolvidos só com vereditos em cache
+        self._claims = {"hits": 0, "misses": 0, "resolved_posts": 0}
+
+    def post_started(self):
+        with self._lock:
+            self.in_flight += 1
+            self.posts_started += 1
+
+    def post_finished(self, result: Dict[str, Any]):
+        now = time.time()
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            self.posts_finished += 1
+            self._finish_times.append(now)
+            if not result.get("success", True):
+                self.errors += 1
+            if result.get("relevant"):
+                self.relevant += 1
+            if result.get("duplicate_of"):
+                self.duplicates += 1
+            metrics = result.get("metrics") or {}
+            if "analyst" in metrics:
+                self._cascade["analyzed"] += 1
+                if "analyst_escalation" in metrics:
+                    self._cascade["escalated"] += 1
+            for node_name, node_metrics in metrics.items():
+                self._observe_node(node_name, node_metrics)
+            planner = metrics.get("planner")
+            if planner is not None:
+                if isinstance(planner, dict):
+                    planner = Metrics(**planner)
+                if planner.claim_hits and not planner.claim_misses:
+                    self._claims["resolved_posts"] += 1
+
+    def _observe_node(self, node_name: str, node_metrics: Any):
+        if isinstance(node_metrics, dict):
+            node_metrics = Metrics(**node_metrics)
+
+        histogram = self._latency.get(node_name)
+        if histogram is None:
+            histogram = self._latency[node_name] = _Histogram(self.window)
+        histogram.observe(node_metrics.execution_time)
+
+        model = self._model_tokens.setdefault(
+            node_metrics.base_model,
+            {"prompt_tokens": 0, "completion_tokens": 0, "seconds": 0.0},
+        )
+        model["prompt_tokens"] += node_metrics.prompt_tokens
+        model["completion_tokens"] += node_metrics.completion_tokens
+        model["seconds"] += node_metrics.execution_time
+
+        self._cache["hits"] += node_metrics.cache_hits
+        self._cache["misses"] += node_metrics.cache_misses
+        self._speculation["saved_s"] += node_metrics.speculative_saved_s
+        self._speculation["wasted_tokens"] += node_metrics.speculative_wasted_tokens
+        self._structured["parse_failures"] += node_metrics.parse_failures
+        self._structured["repaired"] += node_metrics.repaired
+        self._claims["hits"] += node_metrics.claim_hits
+        self._claims["misses"] += node_metrics.claim_misses
+
+    def _posts_per_minute(self, now: float) -> float:
+        while self._finish_times and now - self._finish_times[0] > self.rate_window:
+            self._finish_times.popleft()
+        elapsed = min(self.rate_window, max(now - self.started_at, 1e-9))
+        return len(self._finish_times) * 60.0 / elapsed
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado atual agregado (serializável em JSON)."""
+        now = time.time()
+        endpoints = self.pool.endpoint_stats() if self.pool is not None else {}
+        with self._lock:
+            cache_total = self._cache["hits"] + self._cache["misses"]
+            claims_total = self._claims["hits"] + self._claims["misses"]
+            return {
+                "timestamp": datetime.now().isoformat(),
+                "elapsed_s": now - self.started_at,
+                "posts_started": self.posts_started,
+                "posts_finished": self.posts_finished,
+                "in_flight": self.in_flight,
+                "errors": self.errors,
+                "relevant": self.relevant,
+                "duplicates": self.duplicates,
+                # Base para decidir se vale ligar o planner especulativo
+                "relevance_rate": self.relevant / self.posts_finished if self.posts_finished else 0.0,
+                "posts_per_min": self._posts_per_minute(now),
+                "nodes": {
+                    name: {
+                        "count": h.count,
+                        "mean_s": h.sum / h.count if h.count else 0.0,
+                        **h.quantiles(),
+                    }
+                    for name, h in self._latency.items()
+                },
+                "models": {
+                    name: {
+                        "prompt_tokens": int(m["prompt_tokens"]),
+                        "completion_tokens": int(m["completion_tokens"]),
+                        # Velocidade de geração enquanto o modelo estava em uso
+                        "completion_tokens_per_s": (
+                            m["completion_tokens"] / m["seconds"] if m["seconds"] else 0.0
+                        ),
+                    }
+                    for name, m in self._model_tokens.items()
+                },
+                "cache": {
+                    **self._cache,
+                    "hit_rate": self._cache["hits"] / cache_total if cache_total else 0.0,
+                },
+                "speculation": dict(self._speculation),
+                "cascade": {
+                    **self._cascade,
+                    "escalation_rate": (
+                        self._cascade["escalated"] / self._cascade["analyzed"]
+                        if self._cascade["analyzed"] else 0.0
+                    ),
+                },
+                "structured_output": dict(self._structured),
+                "claims": {
+                    **self._claims,
+                    "hit_rate": self._claims["hits"] / claims_total if claims_total else 0.0,
+                },
+                "endpoints": endpoints,
+            }
+
+    def prometheus_text(self) -> str:
+        """Renderiza as métricas no formato texto de exposição do Prometheus."""
+        snap = self.snapshot()
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, help_text: str, samples: List[Tuple[str, float]]):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{labels} {value}")
+
+        metric("fnd_posts_started_total", "counter", "Posts submitted", [("", snap["posts_started"])])
+        metric("fnd_posts_finished_total", "counter", "Posts finished", [("", snap["posts_finished"])])
+        metric("fnd_posts_errors_total", "counter", "Posts that failed", [("", snap["errors"])])
+        metric("fnd_posts_duplicates_total", "counter", "Posts served from a duplicate", [("", snap["duplicates"])])
+        metric("fnd_posts_in_flight", "gauge", "Posts currently being processed", [("", snap["in_flight"])])
+        metric("fnd_posts_per_minute", "gauge", "Finished posts per minute (sliding window)", [("", snap["posts_per_min"])])
+
+        with self._lock:
+            histograms = {name: (list(h.buckets), h.count, h.sum) for name, h in self._latency.items()}
+        lines.append("# HELP fnd_node_latency_seconds Node execution time")
+        lines.append("# TYPE fnd_node_latency_seconds histogram")
+        for name, (buckets, count, total) in histograms.items():
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS, buckets):
+                cumulative += n
+                lines.append(f'fnd_node_latency_seconds_bucket{{node="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'fnd_node_latency_seconds_bucket{{node="{name}",le="+Inf"}} {count}')
+            lines.append(f'fnd_node_latency_seconds_sum{{node="{name}"}} {total}')
+            lines.append(f'fnd_node_latency_seconds_count{{node="{name}"}} {count}')
+
+        metric(
+            "fnd_node_latency_quantile_seconds",
+            "gauge",
+            "Node latency quantiles over the recent window",
+            [
+                (f'{{node="{name}",quantile="{q}"}}', node[f"p{int(q * 100)}"])
+                for name, node in snap["nodes"].items()
+                for q in QUANTILES
+            ],
+        )
+        metric(
+            "fnd_model_tokens_total",
+            "counter",
+            "Tokens per model",
+            [
+                (f'{{model="{name}",kind="{kind}"}}', m[f"{kind}_tokens"])
+                for name, m in snap["models"].items()
+                for kind in ("prompt", "completion")
+            ],
+        )
+        metric(
+            "fnd_model_completion_tokens_per_second",
+            "gauge",
+            "Completion tokens per second of node time, per model",
+            [(f'{{model="{name}"}}', m["completion_tokens_per_s"]) for name, m in snap["models"].items()],
+        )
+        metric("fnd_relevance_ratio", "gauge", "Share of finished posts found relevant", [("", snap["relevance_rate"])])
+        metric(
+            "fnd_speculative_planner_saved_seconds_total",
+            "counter",
+            "Latency saved by the speculative planner",
+            [("", snap["speculation"]["saved_s"])],
+        )
+        metric(
+            "fnd_speculative_planner_wasted_tokens_total",
+            "counter",
+            "Tokens spent on discarded speculative plans",
+            [("", snap["speculation"]["wasted_tokens"])],
+        )
+        metric(
+            "fnd_analyst_escalations_total",
+            "counter",
+            "Posts escalated to the stronger analyst model",
+            [("", snap["cascade"]["escalated"])],
+        )
+        metric(
+            "fnd_analyst_escalation_ratio",
+            "gauge",
+            "Share of analyzed posts escalated to the stronger analyst model",
+            [("", snap["cascade"]["escalation_rate"])],
+        )
+        metric(
+            "fnd_search_cache_hit_ratio",
+            "gauge",
+            "Search cache hit rate",
+            [("", snap["cache"]["hit_rate"])],
+        )
+        metric(
+            "fnd_structured_parse_failures_total",
+            "counter",
+            "Structured model responses rejected by the parser",
+            [("", snap["structured_output"]["parse_failures"])],
+        )
+        metric(
+            "fnd_structured_repaired_total",
+            "counter",
+            "Rejected structured responses recovered by local repair",
+            [("", snap["structured_output"]["repaired"])],
+        )
+        metric(
+            "fnd_claim_cache_hit_ratio",
+            "gauge",
+            "Share of plan claims with a cached verdict",
+            [("", snap["claims"]["hit_rate"])],
+        )
+        metric(
+            "fnd_claim_resolved_posts_total",
+            "counter",
+            "Posts analyzed from cached claim verdicts only (research skipped)",
+            [("", snap["claims"]["resolved_posts"])],
+        )
+        endpoints = snap["endpoints"]
+        for name, field, kind, help_text in (
+            ("fnd_endpoint_in_flight", "in_flight", "gauge", "Model calls in flight per endpoint"),
+            ("fnd_endpoint_latency_seconds", "latency_ewma_s", "gauge", "Moving average of model call latency per endpoint"),
+            ("fnd_endpoint_healthy", "healthy", "gauge", "1 if the endpoint is receiving calls, 0 if ejected"),
+            ("fnd_endpoint_calls_total", "routed_calls", "counter", "Model calls routed to the endpoint"),
+            ("fnd_endpoint_failures_total", "routed_failures", "counter", "Transient failures per endpoint"),
+            ("fnd_endpoint_retries_total", "retries", "counter", "Retries after transient errors per endpoint"),
+            ("fnd_endpoint_requests_per_second", "requests_per_s", "gauge", "Current adaptive request rate per endpoint"),
+        ):
+            samples = [
+                (f'{{endpoint="{url}"}}', float(stats[field]))
+                for url, stats in endpoints.items()
+                if stats.get(field) is not None
+            ]
+            if samples:
+                metric(name, kind, help_text, samples)
+        return "\n".join(lines) + "\n"
+
+
+def start_metrics_server(
+    aggregator: MetricsAggregator, port: int = 9464, host: str = "127.0.0.1"
+) -> ThreadingHTTPServer:
+    """
+    Sobe um servidor HTTP local (thread daemon) que responde ``GET /metrics``
+    no formato Prometheus e ``GET /snapshot`` em JSON. Pare com ``server.shutdown()``.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/metrics"):
+                body = aggregator.prometheus_text().encode("utf-8")
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            elif self.path.startswith("/snapshot"):
+                body = json.dumps(aggregator.snapshot(), ensure_ascii=False).encode("utf-8")
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    return server
+
+
+class JsonlSnapshotWriter:
+    """Grava ``aggregator.snapshot()`` como uma linha JSONL a cada ``interval`` segundos."""
+
+    def __init__(self, aggregator: MetricsAggregator, path: str, interval: float = 30.0):
+        self.aggregator = aggregator
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshots", daemon=True)
+        self._thread.start()
+
+    def write(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.aggregator.snapshot(), ensure_ascii=False) + "\n")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def stop(self):
+        """Para a thread e grava um último snapshot."""
+        self._stop.set()
+        self._thread.join()
+        self.write()
@@ -1,113 +1,205 @@
+from __future__ import annotations
+
 import time
+import inspect
+import threading
+import weakref
+from contextvars import ContextVar, Token
 from functools import wraps
-from typing import Callable, Any, Dict, List
+from typing import TYPE_CHECKING, Callable, Any, Dict, Optional
 from datetime import datetime
-from threading import local
+from uuid import UUID
 from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.outputs import LLMResult
+from langchain_core.runnables.config import ensure_config
 from src.models.schemas import Metrics
-from src.models.state import AgentState
-from langgraph.runtime import Runtime
-from src.models.context import RuntimeContext
 
-# Thread-local storage para rastrear qual node está executando
-_thread_local = local()
+if TYPE_CHECKING:
+    # Só para anotações: importar o LangGraph e o ModelsRegistry (init_chat_model)
+    # aqui pesaria em todo import de src.utils
+    from langgraph.runtime import Runtime
+    from src.models.context import RuntimeContext
+    from src.models.state import AgentState
+
+# Callback handler do post em execução. ContextVar isola tanto threads quanto
+# tasks asyncio (cada task copia o contexto no momento em que é criada).
+_callback_handler: ContextVar[Optional["UsageMetadataCallbackHandler"]] = ContextVar(
+    "callback_handler", default=None
+)
+
+class NodeRun:
+    """
+    Uma execução de um nó (de um post). Identifica a quem atribuir tokens e
+    contadores, mesmo com várias threads/tasks rodando o mesmo nó em paralelo.
+    """
+
+    __slots__ = ("node_name", "counters", "__weakref__")
+
+    def __init__(self, node_name: str):
+        self.node_name = node_name
+        # Contadores (ex: cache_hits), copiados para o Metrics do nó ao final
+        self.counters: Dict[str, Any] = {}
+
+
+# Execução de nó corrente. Código chamado pelos nós incrementa contadores via
+# ``increment_node_counter``; o callback handler usa para atribuir tokens.
+_current_node_run: ContextVar[Optional[NodeRun]] = ContextVar(
+    "current_node_run", default=None
+)
+
+_TOKEN_KEYS = ("prompt_tokens", "completion_tokens", "total_tokens")
+
+
+def _extract_usage(msg: Any) -> tuple[int, int, int]:
+    """Extrai (input, output, total) tokens de uma mensagem gerada."""
+    # Tentar extrair de usage_metadata (formato mais recente)
+    if getattr(msg, "usage_metadata", None):
+        usage = msg.usage_metadata
+        return (
+            usage.get("input_tokens", 0),
+            usage.get("output_tokens", 0),
+            usage.get("total_tokens", 0),
+        )
+
+    # Tentar extrair de response_metadata (formato antigo)
+    metadata = getattr(msg, "response_metadata", None)
+    if metadata and "token_usage" in metadata:
+        usage = metadata["token_usage"]
+        return (
+            usage.get("prompt_tokens", 0),
+            usage.get("completion_tokens", 0),
+            usage.get("total_tokens", 0),
+        )
+    return 0, 0, 0
 
 
 class UsageMetadataCallbackHandler(BaseCallbackHandler):
     """
     Callback handler para capturar usage_metadata de chamadas LLM.
-    Armazena métricas de tokens por run_id.
+
+    Cada chamada é atribuída, pelo ``run_id``, à execução de nó (``NodeRun``)
+    ativa no contexto em que ela começou. Por isso um único handler pode ser
+    compartilhado por vários posts rodando em threads ou tasks asyncio sem
+    misturar tokens. Os contadores são acumulados na hora (O(1) por chamada).
     """
 
+    # Sem executor: o handler é thread-safe e precisa ver o contexto do nó
+    run_inline = True
+
     def __init__(self):
-        self.usage_metadata: List[Dict[str, Any]] = []
-        self.current_node: str = None
+        self.current_node: Optional[str] = None
+        self._lock = threading.Lock()
+        # run_id da chamada LLM -> execução de nó dona dela
+        self._run_owners: Dict[UUID, NodeRun] = {}
+        # Tokens por execução de nó (descartados junto com o NodeRun)
+        self._run_usage: "weakref.WeakKeyDictionary[NodeRun, Dict[str, int]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        # Totais acumulados por nome de nó e do handler inteiro
+        self._node_totals: Dict[str, Dict[str, int]] = {}
+        self.totals: Dict[str, int] = dict.fromkeys(_TOKEN_KEYS, 0)
+
+    def _register_run(self, run_id: UUID, parent_run_id: Optional[UUID]):
+        owner = _current_node_run.get()
+        with self._lock:
+            if owner is None and parent_run_id is not None:
+                owner = self._run_owners.get(parent_run_id)
+            if owner is not None:
+                self._run_owners[run_id] = owner
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        self._register_run(run_id, parent_run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        self._register_run(run_id, parent_run_id)
+
+    def on_llm_error(self, error, *, run_id, parent_run_id=None, **kwargs):
+        with self._lock:
+            self._run_owners.pop(run_id, None)
 
     def on_llm_end(self, response: LLMResult, *, run_id, parent_run_id=None, **kwargs):
         """
         Chamado quando uma chamada LLM termina.
-        Captura usage_metadata de cada geração.
+        Soma o usage_metadata de cada geração à execução de nó dona da chamada.
         """
+        input_tokens = output_tokens = total_tokens = 0
         for gen_list in response.generations:
             for gen in gen_list:
-                msg = gen.message
-                input_tokens = 0
-                output_tokens = 0
-                total_tokens = 0
-
-                # Tentar extrair de usage_metadata (formato mais recente)
-                if hasattr(msg, "usage_metadata") and msg.usage_metadata:
-                    usage = msg.usage_metadata
-                    input_tokens = usage.get("input_tokens", 0)
-                    output_tokens = usage.get("output_tokens", 0)
-                    total_tokens = usage.get("total_tokens", 0)
-
-                # Tentar extrair de response_metadata (formato antigo)
-                elif (
-                    hasattr(msg, "response_metadata")
-                    and msg.response_metadata
-                    and total_tokens == 0
-                ):
-                    metadata = msg.response_metadata
-                    if "token_usage" in metadata:
-                        usage = metadata["token_usage"]
-                        input_tokens = usage.get("prompt_tokens", 0)
-                        output_tokens = usage.get("completion_tokens", 0)
-                        total_tokens = usage.get("total_tokens", 0)
-
-                # Adicionar apenas se houver tokens
-                if total_tokens > 0:
-                    self.usage_metadata.append(
-                        {
-                            "run_id": run_id,
-                            "parent_run_id": parent_run_id,
-                            "input_tokens": input_tokens,
-                            "output_tokens": output_tokens,
-                            "total_tokens": total_tokens,
-                            "node": self.current_node
-                        }
-                    )
+                i, o, t = _extract_usage(getattr(gen, "message", None))
+                input_tokens += i
+                output_tokens += o
+                total_tokens += t
+
+        with self._lock:
+            owner = self._run_owners.pop(run_id, None) or _current_node_run.get()
+
+            # Adicionar apenas se houver tokens
+            if total_tokens <= 0:
+                return
+
+            node_name = owner.node_name if owner is not None else self.current_node
+            delta = {
+                "prompt_tokens": input_tokens,
+                "completion_tokens": output_tokens,
+                "total_tokens": total_tokens,
+            }
+            targets = [self.totals]
+            if owner is not None:
+                targets.append(self._run_usage.setdefault(owner, dict.fromkeys(_TOKEN_KEYS, 0)))
+            if node_name is not None:
+                targets.append(
+                    self._node_totals.setdefault(node_name, dict.fromkeys(_TOKEN_KEYS, 0))
+                )
+            for target in targets:
+                for key, value in delta.items():
+                    target[key] += value
+
+    def pop_node_run_usage(self, node_run: NodeRun) -> Dict[str, int]:
+        """Retorna (e descarta) os tokens atribuídos a uma execução de nó."""
+        with self._lock:
+            usage = self._run_usage.pop(node_run, None)
+        return usage or dict.fromkeys(_TOKEN_KEYS, 0)
 
     def get_tokens_for_node(self, node_name: str) -> Dict[str, int]:
         """
-        Retorna tokens totais para um node específico.
-        Soma todos os usage_metadata associados ao node.
+        Retorna tokens totais para um node específico, somando todos os posts
+        que passaram por este handler.
         """
-        prompt_tokens = 0
-        completion_tokens = 0
-        total_tokens = 0
-
-        for usage in self.usage_metadata:
-            if usage.get("node") == node_name:
-                prompt_tokens += usage.get("input_tokens", 0)
-                completion_tokens += usage.get("output_tokens", 0)
-                total_tokens += usage.get("total_tokens", 0)
-
-        return {
-            "prompt_tokens": prompt_tokens,
-            "completion_tokens": completion_tokens,
-            "total_tokens": total_tokens,
-        }
+        with self._lock:
+            return dict(self._node_totals.get(node_name) or dict.fromkeys(_TOKEN_KEYS, 0))
 
     def set_current_node(self, node_name: str):
-        """Define qual node está sendo executado atualmente."""
+        """
+        Define o node usado para chamadas feitas fora de um nó rastreado.
+        Dentro dos nós a atribuição vem do contexto e isto não é necessário.
+        """
         self.current_node = node_name
 
 
 def get_callback_handler() -> UsageMetadataCallbackHandler:
     """
-    Obtém o callback handler do thread-local storage.
-    O callback deve ser configurado antes da execução do grafo.
+    Obtém o callback handler do contexto atual (thread ou task asyncio).
+
+    Usa o handler definido com ``set_callback_handler`` ou, na falta dele, o
+    ``UsageMetadataCallbackHandler`` passado em ``config["callbacks"]`` do grafo.
     """
-    if not hasattr(_thread_local, "callback_handler"):
+    handler = _callback_handler.get()
+    if handler is not None:
+        return handler
+
+    callbacks = ensure_config().get("callbacks")
+    if callbacks is None:
         return None
-    return _thread_local.callback_handler
+    handlers = getattr(callbacks, "handlers", callbacks)
+    for h in handlers:
+        if isinstance(h, UsageMetadataCallbackHandler):
+            return h
+    return None
 
 
 def set_callback_handler(handler: UsageMetadataCallbackHandler):
-    """Define o callback handler no thread-local storage."""
-    _thread_local.callback_handler = handler
+    """Define o callback handler no contexto atual (thread ou task asyncio)."""
+    _callback_handler.set(handler)
 
 
 def get_model_name(runtime: Runtime[RuntimeContext], node_name: str) -> str:
@@ -130,67 +222,180 @@ def get_model_name(runtime: Runtime[RuntimeContext], node_name: str) -> str:
         return "unknown"
 
 
-def track_node_metrics(node_name: str):
+def increment_node_counter(name: str, amount: int = 1):
     """
-    Decorator para rastrear métricas de execução de um nó.
+    Incrementa um contador (campo inteiro de ``Metrics``) do nó em execução.
+    Fora de um nó rastreado por ``track_node_metrics`` não faz nada.
+    """
+    node_run = _current_node_run.get()
+    if node_run is not None:
+        node_run.counters[name] = node_run.counters.get(name, 0) + amount
 
-    Mede tempo de execução, extrai uso de tokens via callback e armazena no state.
-    Também loga métricas no console.
+
+def set_node_metric(name: str, value: Any):
+    """
+    Define um campo de ``Metrics`` (não-contador, ex: lista de ids) do nó em execução.
+    Fora de um nó rastreado por ``track_node_metrics`` não faz nada.
     """
+    node_run = _current_node_run.get()
+    if node_run is not None:
+        node_run.counters[name] = value
 
-    def decorator(func: Callable[[AgentState, Runtime[RuntimeContext]], Dict[str, Metrics]]):
-        @wraps(func)
-        def wrapper(
-            state: AgentState, runtime: Runtime[RuntimeContext]
-        ) -> Dict[str, Metrics]:
-            # Obter callback handler se disponível
-            callback_handler = get_callback_handler()
 
-            # Definir node atual no callback handler
-            if callback_handler:
-                callback_handler.set_current_node(node_name)
+def _start_node(
+    node_name: str,
+) -> tuple[Optional[UsageMetadataCallbackHandler], float, str, NodeRun, Token]:
+    """
+    Prepara o callback handler e marca o início da execução de um nó. O token
+    devolvido restaura a execução anterior (``_current_node_run.reset``) no fim do nó.
+    """
+    # Obter callback handler se disponível
+    callback_handler = get_callback_handler()
+
+    # Execução de nó corrente: chamadas LLM feitas a partir daqui são atribuídas a ela
+    node_run = NodeRun(node_name)
+    token = _current_node_run.set(node_run)
+
+    return callback_handler, time.time(), datetime.now().isoformat(), node_run, token
+
+
+def _finish_node(
+    node_name: str,
+    state: AgentState,
+    runtime: Runtime[RuntimeContext],
+    result: Dict[str, Any],
+    callback_handler: Optional[UsageMetadataCallbackHandler],
+    start_time: float,
+    start_datetime: str,
+    node_run: NodeRun,
+    base_model: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Calcula as métricas do nó e as adiciona ao resultado.
+    Um nó que retorna None foi pulado (ex: etapa desligada) e não gera métricas.
+    """
+    if result is None:
+        return None
 
-            start_time = time.time()
-            start_datetime = datetime.now().isoformat()
+    end_time = time.time()
+    end_datetime = datetime.now().isoformat()
+    execution_time = end_time - start_time
 
-            # Executar o nó
-            result = func(state, runtime)
+    # Inicializar métricas no state se não existir
+    metrics = state.metrics
 
-            end_time = time.time()
-            end_datetime = datetime.now().isoformat()
-            execution_time = end_time - start_time
+    # Extrair nome do modelo base
+    base_model_name = base_model or get_model_name(runtime, node_name)
 
-            # Inicializar métricas no state se não existir
-            metrics = state.metrics
+    # Criar métricas base (tempo e modelo)
+    node_metrics = Metrics(
+        base_model=base_model_name,
+        execution_time=execution_time,
+        start_time=start_datetime,
+        end_time=end_datetime,
+        **node_run.counters,
+    )
 
-            # Extrair nome do modelo base
-            base_model_name = get_model_name(runtime, node_name)
+    # Extrair tokens do callback handler (somados aos já atribuídos via contadores,
+    # ex: a fatia do post numa chamada em lote)
+    if callback_handler:
+        token_usage = callback_handler.pop_node_run_usage(node_run)
+        node_metrics.prompt_tokens += token_usage.get("prompt_tokens", 0)
+        node_metrics.completion_tokens += token_usage.get("completion_tokens", 0)
+        node_metrics.total_tokens += token_usage.get("total_tokens", 0)
 
-            # Criar métricas base (tempo e modelo)
-            node_metrics = Metrics(
-                base_model=base_model_name,
-                execution_time=execution_time,
-                start_time=start_datetime,
-                end_time=end_datetime,
-            )
+    # Armazenar métricas
+    metrics[node_name] = node_metrics
+
+    # # Log no console
+    # print(f"[{node_name}] {node_metrics}")
+
+    # Adicionar métricas ao resultado
+    result["metrics"] = metrics
+
+    return result
 
-            # Extrair tokens do callback handler
-            if callback_handler:
-                token_usage = callback_handler.get_tokens_for_node(node_name)
-                node_metrics.prompt_tokens = token_usage.get("prompt_tokens", 0)
-                node_metrics.completion_tokens = token_usage.get("completion_tokens", 0)
-                node_metrics.total_tokens = token_usage.get("total_tokens", 0)
 
-            # Armazenar métricas
-            metrics[node_name] = node_metrics
+def _get_stage_cache(runtime: Runtime[RuntimeContext]) -> Any:
+    context = getattr(runtime, "context", None)
+    return getattr(context, "stage_cache", None)
 
-            # # Log no console
-            # print(f"[{node_name}] {node_metrics}")
 
-            # Adicionar métricas ao resultado
-            result["metrics"] = metrics
+def track_node_metrics(node_name: str, base_model: Optional[str] = None):
+    """
+    Decorator para rastrear métricas de execução de um nó.
+
+    Mede tempo de execução, extrai uso de tokens via callback e armazena no state.
+    Funciona tanto com nós síncronos quanto com nós ``async def``. Com
+    ``RuntimeContext.stage_cache``, a saída do nó é memoizada por (nó, modelo,
+    estado de entrada).
 
-            return result
+    Args:
+        node_name: Nome do node (chave em ``state.metrics`` e no ModelsRegistry)
+        base_model: Nome fixo a registrar em ``Metrics.base_model``, para nós
+            que não usam modelo do registry (ex: "lexical" no pré-filtro)
+    """
+
+    def decorator(func: Callable[[AgentState, Runtime[RuntimeContext]], Dict[str, Metrics]]):
+        if inspect.iscoroutinefunction(func):
+
+            async def run_async(state: AgentState, runtime: Runtime[RuntimeContext]):
+                callback_handler, start_time, start_datetime, node_run, token = _start_node(
+                    node_name
+                )
+
+                # Executar o nó; depois dele, chamadas fora de nós não são mais atribuídas a ele
+                try:
+                    result = await func(state, runtime)
+                finally:
+                    _current_node_run.reset(token)
+
+                return _finish_node(
+                    node_name, state, runtime, result,
+                    callback_handler, start_time, start_datetime, node_run,
+                    base_model,
+                )
+
+            @wraps(func)
+            async def async_wrapper(
+                state: AgentState, runtime: Runtime[RuntimeContext]
+            ) -> Dict[str, Metrics]:
+                stage_cache = _get_stage_cache(runtime)
+                if stage_cache is not None:
+                    return await stage_cache.arun(
+                        node_name, base_model, state, runtime, lambda: run_async(state, runtime)
+                    )
+                return await run_async(state, runtime)
+
+            return async_wrapper
+
+        def run(state: AgentState, runtime: Runtime[RuntimeContext]):
+            callback_handler, start_time, start_datetime, node_run, token = _start_node(
+                node_name
+            )
+
+            # Executar o nó; depois dele, chamadas fora de nós não são mais atribuídas a ele
+            try:
+                result = func(state, runtime)
+            finally:
+                _current_node_run.reset(token)
+
+            return _finish_node(
+                node_name, state, runtime, result,
+                callback_handler, start_time, start_datetime, node_run,
+                base_model,
+            )
+
+        @wraps(func)
+        def wrapper(
+            state: AgentState, runtime: Runtime[RuntimeContext]
+        ) -> Dict[str, Metrics]:
+            stage_cache = _get_stage_cache(runtime)
+            if stage_cache is not None:
+                return stage_cache.run(
+                    node_name, base_model, state, runtime, lambda: run(state, runtime)
+                )
+            return run(state, runtime)
 
         return wrapper
 
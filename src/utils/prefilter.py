@@ -0,0 +1,371 @@
+"""
+Pré-filtro léxico (sem LLM) executado antes do ``entry_node``.
+
+Combina regras determinísticas com um Naive Bayes multinomial treinado
+offline a partir dos rótulos ``relevant`` gravados em ``output/*.jsonl``.
+Só rejeita posts com alta confiança; os demais seguem para o LLM.
+
+Treino e relatório de precisão/recall:
+    python -m src.utils.prefilter --input "output/*.jsonl" --out output/prefilter.json
+"""
+
+import argparse
+import glob
+import json
+import math
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.utils.dedup import normalize_post
+
+DEFAULT_MODEL_PATH = "output/prefilter.json"
+
+# Textos que, sozinhos, nunca contêm afirmação verificável
+GREETINGS = {
+    "bom dia", "boa tarde", "boa noite", "oi", "ola", "olá", "amem", "amém",
+    "obrigado", "obrigada", "parabens", "parabéns", "kkk", "kkkk", "kkkkk",
+    "top", "lindo", "linda", "show", "sim", "nao", "não",
+}
+
+def _tokens(normalized: str) -> List[str]:
+    words = normalized.split()
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+class NaiveBayesModel:
+    """Naive Bayes multinomial binário (relevante / não relevante) com suavização de Laplace."""
+
+    def __init__(
+        self,
+        log_priors: Optional[Dict[str, float]] = None,
+        token_counts: Optional[Dict[str, Dict[str, int]]] = None,
+        alpha: float = 1.0,
+    ):
+        self.log_priors = log_priors or {"1": math.log(0.5), "0": math.log(0.5)}
+        self.token_counts = token_counts or {"1": {}, "0": {}}
+        self.alpha = alpha
+        self._refresh()
+
+    def _refresh(self):
+        self._totals = {c: sum(v.values()) for c, v in self.token_counts.items()}
+        self._vocab_size = len(set(self.token_counts["1"]) | set(self.token_counts["0"]))
+
+    def fit(self, texts: Iterable[str], labels: Iterable[bool]) -> "NaiveBayesModel":
+        counts = {"1": Counter(), "0": Counter()}
+        docs = Counter()
+        for text, label in zip(texts, labels):
+            c = "1" if label else "0"
+            docs[c] += 1
+            counts[c].update(_tokens(normalize_post(text)))
+
+        n_docs = sum(docs.values())
+        self.log_priors = {
+            c: math.log((docs[c] + self.alpha) / (n_docs + 2 * self.alpha))
+            for c in ("1", "0")
+        }
+        self.token_counts = {c: dict(v) for c, v in counts.items()}
+        self._refresh()
+        return self
+
+    def predict_proba(self, text: str) -> float:
+        """Probabilidade estimada de o post ser relevante."""
+        tokens = _tokens(normalize_post(text))
+        scores = {}
+        denominator_vocab = self._vocab_size + 1
+        for c in ("1", "0"):
+            counts = self.token_counts[c]
+            denominator = self._totals[c] + self.alpha * denominator_vocab
+            log_likelihood = sum(
+                math.log((counts.get(t, 0) + self.alpha) / denominator) for t in tokens
+            )
+            # Verossimilhança média por token: sem isso posts longos saturam em 0/1
+            scores[c] = self.log_priors[c] + log_likelihood / max(len(tokens), 1)
+        # softmax de 2 classes de forma numericamente estável
+        diff = scores["0"] - scores["1"]
+        if diff > 700:
+            return 0.0
+        return 1.0 / (1.0 + math.exp(diff))
+
+    def to_dict(self) -> dict:
+        return {
+            "log_priors": self.log_priors,
+            "token_counts": self.token_counts,
+            "alpha": self.alpha,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "NaiveBayesModel":
+        return cls(**data)
+
+    def save(self, path: str, reject_threshold: Optional[float] = None):
+        """Grava o modelo; ``reject_threshold`` vai junto para ``LexicalPrefilter.from_file``."""
+        data = self.to_dict()
+        if reject_threshold is not None:
+            data["reject_threshold"] = reject_threshold
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "NaiveBayesModel":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        data.pop("reject_threshold", None)
+        return cls.from_dict(data)
+
+
+class LexicalPrefilter:
+    """
+    Decide, sem LLM, se um post pode ser descartado antes do ``entry_node``.
+
+    Args:
+        model: Classificador léxico treinado (opcional; sem ele só as regras valem)
+        reject_threshold: Rejeita quando P(relevante) do modelo fica abaixo disso;
+            0 desliga o classificador (só as regras valem)
+        use_rules: Liga/desliga as regras determinísticas
+
+    Exemplo:
+        prefilter = LexicalPrefilter.from_file("output/prefilter.json")
+        runtime_context = {..., "prefilter": prefilter}
+    """
+
+    def __init__(
+        self,
+        model: Optional[NaiveBayesModel] = None,
+        reject_threshold: float = 0.0,
+        use_rules: bool = True,
+    ):
+        self.model = model
+        self.reject_threshold = reject_threshold
+        self.use_rules = use_rules
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_MODEL_PATH, **kwargs) -> "LexicalPrefilter":
+        """Carrega o modelo com o ``reject_threshold`` escolhido no treino (ou o passado)."""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        kwargs.setdefault("reject_threshold", data.pop("reject_threshold", 0.0))
+        return cls(model=NaiveBayesModel.from_dict(data), **kwargs)
+
+    def _check_rules(self, text: str) -> Optional[str]:
+        # Só saudações exatas: nos rótulos do LLM, posts só com hashtags, slogans
+        # ("Estou com X 50") e nomes soltos são marcados como relevantes
+        if normalize_post(text) in GREETINGS:
+            return "Pré-filtro: apenas saudação/interjeição, sem afirmações verificáveis"
+        return None
+
+    def check(self, text: str) -> Optional[str]:
+        """
+        Retorna o motivo da rejeição, ou None se o post deve seguir para o LLM.
+        """
+        if self.use_rules:
+            reason = self._check_rules(text)
+            if reason is not None:
+                return reason
+
+        if self.model is not None and self.reject_threshold > 0:
+            proba = self.model.predict_proba(text)
+            if proba < self.reject_threshold:
+                return f"Pré-filtro: classificador léxico (P(relevante)={proba:.3f})"
+
+        return None
+
+
+def load_labeled_results(paths: Iterable[str]) -> Tuple[List[str], List[bool], List[str]]:
+    """
+    Lê resultados anteriores (JSONL) e retorna textos, rótulos ``relevant`` e
+    ``relevance_reasoning``. Linhas com falha ou sem rótulo são ignoradas.
+    """
+    texts, labels, reasonings = [], [], []
+    seen = set()
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if not row.get("success") or row.get("relevant") is None:
+                    continue
+                if row.get("id_mention") in seen:
+                    continue
+                seen.add(row.get("id_mention"))
+                texts.append(row.get("full_text") or "")
+                labels.append(bool(row["relevant"]))
+                reasonings.append(row.get("relevance_reasoning") or "")
+    return texts, labels, reasonings
+
+
+def evaluate_prefilter(
+    prefilter: LexicalPrefilter, texts: List[str], labels: List[bool]
+) -> Dict[str, float]:
+    """
+    Mede a decisão de rejeição contra os rótulos do LLM.
+
+    - precision: fração dos rejeitados que o LLM também marcou como não relevantes
+    - recall: fração dos não relevantes (segundo o LLM) que foram rejeitados
+    - rejection_rate: fração dos posts que deixaria de chamar o LLM
+    """
+    rejected = [prefilter.check(t) is not None for t in texts]
+    true_rejects = sum(r and not l for r, l in zip(rejected, labels))
+    n_rejected = sum(rejected)
+    n_irrelevant = sum(not l for l in labels)
+    return {
+        "n": len(texts),
+        "rejected": n_rejected,
+        "precision": true_rejects / n_rejected if n_rejected else 1.0,
+        "recall": true_rejects / n_irrelevant if n_irrelevant else 0.0,
+        "rejection_rate": n_rejected / len(texts) if texts else 0.0,
+        "false_rejects": n_rejected - true_rejects,
+    }
+
+
+def evaluate_rules(
+    prefilter: LexicalPrefilter, texts: List[str], labels: List[bool]
+) -> Dict[str, Dict[str, float]]:
+    """Rejeições e precisão de cada regra determinística (pelo motivo da rejeição)."""
+    counts: Dict[str, Counter] = {}
+    for text, label in zip(texts, labels):
+        reason = prefilter._check_rules(text)
+        if reason is not None:
+            counts.setdefault(reason, Counter()).update(rejected=1, true_rejects=int(not label))
+    return {
+        reason: {
+            "rejected": c["rejected"],
+            "precision": c["true_rejects"] / c["rejected"],
+            "false_rejects": c["rejected"] - c["true_rejects"],
+        }
+        for reason, c in counts.items()
+    }
+
+
+def choose_threshold(
+    model: NaiveBayesModel,
+    texts: List[str],
+    labels: List[bool],
+    min_precision: float,
+    min_rejected: int,
+) -> Tuple[float, Dict[str, float]]:
+    """
+    Maior ``reject_threshold`` cuja precisão nos posts dados fica em ``min_precision``
+    ou acima, rejeitando ao menos ``min_rejected`` posts. Retorna ``(0.0, {})``
+    (classificador desligado) se nenhum limiar atinge a precisão.
+    """
+    best: Tuple[float, Dict[str, float]] = (0.0, {})
+    for proba in sorted({model.predict_proba(t) for t in texts}):
+        # Limiar logo acima do score: rejeita este post e todos os de score menor
+        threshold = math.nextafter(proba, 1.0)
+        report = evaluate_prefilter(
+            LexicalPrefilter(model, threshold, use_rules=False), texts, labels
+        )
+        if report["rejected"] >= min_rejected and report["precision"] >= min_precision:
+            best = (threshold, report)
+    return best
+
+
+def _split(texts: List[str], holdout: float) -> List[bool]:
+    """Divisão determinística treino/teste pelo hash do texto."""
+    return [
+        zlib.crc32(t.encode("utf-8")) % 1000 < holdout * 1000 for t in texts
+    ]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Treina o pré-filtro léxico a partir de resultados anteriores"
+    )
+    parser.add_argument("--input", default="output/*.jsonl", help="Glob dos JSONL rotulados")
+    parser.add_argument("--out", default=DEFAULT_MODEL_PATH, help="Arquivo do modelo treinado")
+    parser.add_argument(
+        "--reject-threshold",
+        type=float,
+        default=None,
+        help="Limiar fixo do classificador (padrão: escolhido no teste por --min-precision)",
+    )
+    parser.add_argument(
+        "--min-precision",
+        type=float,
+        default=0.95,
+        help="Precisão mínima, no conjunto de teste, para ligar o classificador",
+    )
+    parser.add_argument(
+        "--min-rejected",
+        type=int,
+        default=5,
+        help="Rejeições mínimas no teste para a precisão medida valer",
+    )
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fração reservada para teste")
+    args = parser.parse_args(argv)
+
+    texts, labels, reasonings = load_labeled_results(sorted(glob.glob(args.input)))
+    if not texts:
+        raise SystemExit(f"No labeled results found in {args.input}")
+
+    is_test = _split(texts, args.holdout)
+    train = [(t, l) for t, l, h in zip(texts, labels, is_test) if not h]
+    test = [(t, l, r) for t, l, r, h in zip(texts, labels, reasonings, is_test) if h]
+
+    model = NaiveBayesModel().fit([t for t, _ in train], [l for _, l in train])
+    print(f"Train: {len(train)} posts | Test: {len(test)} posts")
+
+    test_texts = [t for t, _, _ in test]
+    test_labels = [l for _, l, _ in test]
+    threshold = args.reject_threshold
+    if threshold is None:
+        threshold, chosen = choose_threshold(
+            model, test_texts, test_labels, args.min_precision, args.min_rejected
+        )
+        if chosen:
+            print(
+                f"Reject threshold {threshold:.3f}: precision {chosen['precision']:.3f} "
+                f"on {chosen['rejected']} test rejections"
+            )
+        else:
+            print(
+                f"No threshold reaches precision {args.min_precision:.2f} with "
+                f">= {args.min_rejected} test rejections: classifier disabled (threshold 0)"
+            )
+    for name, prefilter, eval_texts, eval_labels in [
+        # As regras não são treinadas: avaliadas sobre todos os posts rotulados
+        ("rules only (all)", LexicalPrefilter(model=None), texts, labels),
+        (
+            "classifier only (test)",
+            LexicalPrefilter(model, threshold, use_rules=False),
+            test_texts,
+            test_labels,
+        ),
+        (
+            "rules + classifier (test)",
+            LexicalPrefilter(model, threshold),
+            test_texts,
+            test_labels,
+        ),
+    ]:
+        report = evaluate_prefilter(prefilter, eval_texts, eval_labels)
+        print(
+            f"[{name}] rejected {report['rejected']}/{report['n']} "
+            f"({100 * report['rejection_rate']:.1f}%) | "
+            f"precision {report['precision']:.3f} | recall {report['recall']:.3f}"
+        )
+
+    # Cada regra separada: uma regra ruim não se esconde na média das outras
+    for reason, report in evaluate_rules(LexicalPrefilter(model=None), texts, labels).items():
+        print(
+            f"  [rule] {reason}: rejected {report['rejected']} | "
+            f"precision {report['precision']:.3f} | false rejects {report['false_rejects']}"
+        )
+
+    # Erros de rejeição no conjunto de teste, com o raciocínio do LLM
+    prefilter = LexicalPrefilter(model, threshold)
+    for text, label, reasoning in test:
+        reason = prefilter.check(text)
+        if reason is not None and label:
+            print(f"  false reject: {text[:80]!r} | {reason} | LLM: {reasoning[:80]!r}")
+
+    # Modelo final treinado com todos os dados rotulados
+    NaiveBayesModel().fit(texts, labels).save(args.out, reject_threshold=threshold)
+    print(f"Model saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
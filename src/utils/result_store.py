@@ -0,0 +1,273 @@
+"""
+Armazenamento colunar (Parquet) dos resultados, append-only.
+
+Cada resultado do runner vira uma linha com schema fixo: campos do post,
+``RelevanceAnalysis`` e ``Response`` achatados, e um grupo de colunas
+``<node>__<campo>`` por nó com os campos de ``Metrics``. Os resultados são
+acumulados em memória e gravados a cada ``rows_per_file`` linhas como um novo
+arquivo do dataset (nenhum arquivo é reescrito). ``compact`` junta os arquivos
+pequenos; ``read_results`` lê só as colunas e linhas pedidas, com os filtros
+aplicados na leitura (estatísticas dos row groups do Parquet).
+
+Requer ``pyarrow``.
+
+Exemplo:
+    with ResultStore("output/results") as store:
+        run_batch(posts, models_registry, tavily, on_result=store.append)
+
+    import pyarrow.dataset as ds
+    table = read_results(
+        "output/results",
+        columns=["id_mention", "score", "analyst__total_tokens"],
+        filter=(ds.field("relevant") == True) & (ds.field("score") > 0.7),
+    )
+    df = table.to_pandas()
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+import typing
+import uuid
+from typing import Any, Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from src.models.schemas import Metrics
+
+DEFAULT_STORE_PATH = "output/results"
+METRICS_NODES = [
+    "prefilter", "entry", "planner", "researcher", "triage", "search", "evidence", "analyst",
+    "analyst_escalation",
+]
+
+_ARROW_TYPES = {str: pa.string(), float: pa.float64(), int: pa.int64(), bool: pa.bool_()}
+
+
+def _arrow_type(annotation: Any) -> pa.DataType:
+    # Optional[X] -> X
+    args = [a for a in typing.get_args(annotation) if a is not type(None)]
+    return _ARROW_TYPES.get(args[0] if args else annotation, pa.string())
+
+
+METRICS_FIELDS = {
+    name: _arrow_type(field.annotation) for name, field in Metrics.model_fields.items()
+}
+
+SCHEMA = pa.schema(
+    [
+        ("id_mention", pa.string()),
+        ("full_text", pa.string()),
+        ("success", pa.bool_()),
+        ("error", pa.string()),
+        ("timestamp", pa.string()),
+        ("processing_time_s", pa.float64()),
+        ("duplicate_of", pa.string()),
+        # RelevanceAnalysis
+        ("relevant", pa.bool_()),
+        ("relevance_reasoning", pa.string()),
+        ("plan", pa.string()),
+        # Response
+        ("score", pa.float64()),
+        ("justification", pa.string()),
+        # Listas/dicts pouco consultados ficam como JSON
+        ("references", pa.string()),
+        ("models_config", pa.string()),
+    ]
+    + [
+        (f"{node}__{name}", arrow_type)
+        for node in METRICS_NODES
+        for name, arrow_type in METRICS_FIELDS.items()
+    ]
+)
+
+
+def flatten_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Converte um resultado do runner em uma linha do ``SCHEMA``."""
+    row = {name: result.get(name) for name in SCHEMA.names if "__" not in name}
+    row["references"] = json.dumps(result.get("references") or [], ensure_ascii=False)
+    row["models_config"] = json.dumps(result.get("models_config") or {}, ensure_ascii=False)
+
+    for node, node_metrics in (result.get("metrics") or {}).items():
+        if node not in METRICS_NODES:
+            continue
+        # Campos omitidos na serialização (no padrão) voltam ao valor padrão
+        if isinstance(node_metrics, dict):
+            node_metrics = Metrics(**node_metrics)
+        for name in METRICS_FIELDS:
+            value = getattr(node_metrics, name)
+            if isinstance(value, (list, dict)):
+                value = json.dumps(value, ensure_ascii=False)
+            row[f"{node}__{name}"] = value
+    return row
+
+
+class ResultStore:
+    """
+    Escritor append-only do dataset Parquet. Thread-safe.
+
+    Args:
+        path: Diretório do dataset
+        rows_per_file: Linhas acumuladas antes de gravar um novo arquivo
+            (cada arquivo tem um único row group)
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH, rows_per_file: int = 1000):
+        self.path = path
+        self.rows_per_file = rows_per_file
+        self.rows_written = 0
+        self._rows: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def append(self, result: Dict[str, Any]):
+        """Adiciona um resultado (pode ser usado direto como ``on_result``)."""
+        with self._lock:
+            self._rows.append(flatten_result(result))
+            if len(self._rows) >= self.rows_per_file:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._rows:
+            return
+        table = pa.Table.from_pylist(self._rows, schema=SCHEMA)
+        _write_file(self.path, table, row_group_size=len(self._rows))
+        self.rows_written += len(self._rows)
+        self._rows = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _new_file_name() -> str:
+    return f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+
+
+def _write_file(path: str, table: pa.Table, row_group_size: int) -> str:
+    """Grava ``table`` em um novo arquivo do dataset (tmp + rename, atômico)."""
+    name = _new_file_name()
+    tmp_path = os.path.join(path, f".{name}.tmp")
+    pq.write_table(table, tmp_path, row_group_size=row_group_size, compression="zstd")
+    final_path = os.path.join(path, name)
+    os.replace(tmp_path, final_path)
+    return final_path
+
+
+def _dataset_files(path: str) -> List[str]:
+    return sorted(
+        os.path.join(path, f)
+        for f in os.listdir(path)
+        if f.startswith("part-") and f.endswith(".parquet")
+    )
+
+
+def open_dataset(path: str = DEFAULT_STORE_PATH) -> ds.Dataset:
+    """
+    Dataset do diretório, sempre com o ``SCHEMA`` atual (colunas adicionadas
+    depois que um arquivo foi gravado são lidas como nulas).
+    """
+    return ds.dataset(_dataset_files(path), schema=SCHEMA, format="parquet")
+
+
+def read_results(
+    path: str = DEFAULT_STORE_PATH,
+    columns: Optional[List[str]] = None,
+    filter: Optional[ds.Expression] = None,
+) -> pa.Table:
+    """
+    Lê o dataset, aplicando ``filter`` e a seleção de ``columns`` na leitura:
+    row groups que não podem conter linhas do filtro não são lidos.
+    """
+    return open_dataset(path).to_table(columns=columns, filter=filter)
+
+
+def compact(
+    path: str = DEFAULT_STORE_PATH,
+    rows_per_file: int = 1_000_000,
+    row_group_size: int = 64_000,
+) -> int:
+    """
+    Junta os arquivos do dataset em arquivos maiores, em streaming.
+
+    Os arquivos novos são gravados antes de os antigos serem removidos; se o
+    processo cair no meio, as linhas aparecem duplicadas, nunca perdidas.
+
+    Returns:
+        Número de arquivos removidos
+    """
+    old_files = _dataset_files(path)
+    if len(old_files) <= 1:
+        return 0
+
+    dataset = ds.dataset(old_files, schema=SCHEMA, format="parquet")
+    writer, name, written = None, None, 0
+
+    def finish():
+        writer.close()
+        os.replace(os.path.join(path, f".{name}.tmp"), os.path.join(path, name))
+
+    for batch in dataset.to_batches(batch_size=row_group_size):
+        if writer is None:
+            name = _new_file_name()
+            writer = pq.ParquetWriter(os.path.join(path, f".{name}.tmp"), SCHEMA, compression="zstd")
+        writer.write_batch(batch, row_group_size=row_group_size)
+        written += batch.num_rows
+        if written >= rows_per_file:
+            finish()
+            writer, written = None, 0
+    if writer is not None:
+        finish()
+
+    for file_path in old_files:
+        os.remove(file_path)
+    return len(old_files)
+
+
+def import_jsonl(jsonl_path: str, path: str = DEFAULT_STORE_PATH, rows_per_file: int = 50_000) -> int:
+    """Converte um JSONL de resultados (runner/notebook) para o dataset."""
+    with ResultStore(path, rows_per_file=rows_per_file) as store:
+        with open(jsonl_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    store.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return store.rows_written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dataset Parquet de resultados")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_import = sub.add_parser("import", help="Converte um JSONL de resultados")
+    p_import.add_argument("jsonl")
+    p_import.add_argument("--store", default=DEFAULT_STORE_PATH)
+
+    p_compact = sub.add_parser("compact", help="Junta os arquivos do dataset")
+    p_compact.add_argument("--store", default=DEFAULT_STORE_PATH)
+    p_compact.add_argument("--rows-per-file", type=int, default=1_000_000)
+
+    args = parser.parse_args()
+    if args.command == "import":
+        print(f"{import_jsonl(args.jsonl, args.store)} row(s) imported into {args.store}")
+    else:
+        removed = compact(args.store, rows_per_file=args.rows_per_file)
+        print(f"Compacted {removed} file(s) in {args.store}")
+
+
+if __name__ == "__main__":
+    main()
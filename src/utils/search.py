@@ -0,0 +1,188 @@
+import asyncio
+import contextvars
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, List, Optional, Tuple
+
+from src.models.resilience import EndpointGuard, ResilienceConfig
+from src.models.schemas import Reference
+from src.utils.snippet_store import SnippetStore, get_snippet_store
+
+if TYPE_CHECKING:
+    from tavily import TavilyClient
+
+logger = logging.getLogger(__name__)
+
+# Tamanho do pool de conexões HTTP (e de threads de I/O) compartilhado entre posts
+DEFAULT_POOL_SIZE = 32
+
+# Executor dedicado às buscas disparadas pelos nós assíncronos. Evita disputar o
+# executor default do asyncio (min(32, cpus + 4) threads) com o resto do processo.
+_search_executor: Optional[ThreadPoolExecutor] = None
+_search_executor_lock = threading.Lock()
+
+
+def create_tavily_client(
+    api_key: str,
+    pool_size: int = DEFAULT_POOL_SIZE,
+    resilience: Optional[ResilienceConfig] = None,
+    **kwargs,
+) -> "TavilyClient":
+    """
+    Cria um TavilyClient cuja ``requests.Session`` mantém até ``pool_size``
+    conexões keep-alive, reaproveitadas por todas as buscas de todos os posts.
+
+    Com ``resilience``, o cliente vem envolvido por ``ResilientTavilyClient``.
+    """
+    # Import tardio: requests/tavily só carregam quando o cliente real é criado
+    import requests
+    from requests.adapters import HTTPAdapter
+    from tavily import TavilyClient
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    client = TavilyClient(api_key=api_key, session=session, **kwargs)
+    if resilience is not None:
+        return ResilientTavilyClient(client, EndpointGuard("tavily", resilience))
+    return client
+
+
+class ResilientTavilyClient:
+    """
+    Wrapper de TavilyClient cujas buscas passam por um ``EndpointGuard``
+    (limite de taxa adaptativo, retries com jitter e circuit breaker).
+    """
+
+    def __init__(self, client: Any, guard: Optional[EndpointGuard] = None):
+        self.client = client
+        self.guard = guard if guard is not None else EndpointGuard("tavily")
+
+    def search(self, query: str, max_results: int = 5, **kwargs) -> dict:
+        return self.guard.call(
+            lambda: self.client.search(query=query, max_results=max_results, **kwargs)
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+
+def _get_search_executor() -> ThreadPoolExecutor:
+    global _search_executor
+    with _search_executor_lock:
+        if _search_executor is None:
+            _search_executor = ThreadPoolExecutor(
+                max_workers=DEFAULT_POOL_SIZE, thread_name_prefix="tavily"
+            )
+        return _search_executor
+
+
+def _merge_responses(
+    queries: List[str],
+    outcomes: List[Tuple[Optional[dict], Optional[BaseException]]],
+    snippet_store: Optional[SnippetStore] = None,
+) -> Tuple[List[str], List[Reference]]:
+    """
+    Junta as respostas na ordem das queries (independente da ordem de conclusão).
+
+    O texto de cada resultado vai para o ``SnippetStore``; voltam os hashes dos
+    trechos (sem repetição) e uma ``Reference`` compacta por resultado.
+
+    Queries que falharam são descartadas individualmente; se todas falharem o
+    primeiro erro é propagado.
+    """
+    results: List[dict] = []
+    errors: List[BaseException] = []
+
+    for query, (response, error) in zip(queries, outcomes):
+        if error is not None:
+            logger.warning("Tavily search failed for query %r: %s", query, error)
+            errors.append(error)
+            continue
+        results.extend(response["results"])
+
+    if errors and len(errors) == len(queries):
+        raise errors[0]
+
+    store = snippet_store if snippet_store is not None else get_snippet_store()
+    hashes = store.put_many(r.get("content") or "" for r in results)
+    references = [
+        Reference(url=r.get("url", ""), title=r.get("title") or "", score=r.get("score"), content_hash=h)
+        for r, h in zip(results, hashes)
+    ]
+    return list(dict.fromkeys(hashes)), references
+
+
+def search_queries(
+    tavily: Any,
+    queries: List[str],
+    max_results: int = 2,
+    max_concurrency: int = 3,
+    snippet_store: Optional[SnippetStore] = None,
+) -> Tuple[List[str], List[Reference]]:
+    """
+    Executa as buscas de um post em paralelo (no máximo ``max_concurrency`` ao mesmo tempo).
+
+    Returns:
+        Tupla ``(hashes dos trechos, referências)`` na ordem das queries; o
+        texto dos trechos fica em ``snippet_store`` (default: o do processo)
+    """
+    if not queries:
+        return [], []
+
+    def run(query: str) -> Tuple[Optional[dict], Optional[BaseException]]:
+        try:
+            return tavily.search(query=query, max_results=max_results), None
+        except Exception as e:
+            return None, e
+
+    workers = max(1, min(max_concurrency, len(queries)))
+    if workers == 1:
+        outcomes = [run(q) for q in queries]
+    else:
+        # Cada busca roda numa cópia do contexto atual, para que contadores do
+        # nó (ex: cache hits) sejam atribuídos ao post/nó corretos
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, run, q)
+                for q in queries
+            ]
+            outcomes = [f.result() for f in futures]
+
+    return _merge_responses(queries, outcomes, snippet_store)
+
+
+async def asearch_queries(
+    tavily: Any,
+    queries: List[str],
+    max_results: int = 2,
+    max_concurrency: int = 3,
+    snippet_store: Optional[SnippetStore] = None,
+) -> Tuple[List[str], List[Reference]]:
+    """Versão assíncrona de ``search_queries``."""
+    if not queries:
+        return [], []
+
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    search = tavily.search
+
+    async def run(query: str) -> Tuple[Optional[dict], Optional[BaseException]]:
+        async with semaphore:
+            try:
+                if asyncio.iscoroutinefunction(search):
+                    response = await search(query=query, max_results=max_results)
+                else:
+                    loop = asyncio.get_running_loop()
+                    ctx = contextvars.copy_context()
+                    response = await loop.run_in_executor(
+                        _get_search_executor(),
+                        lambda: ctx.run(search, query=query, max_results=max_results),
+                    )
+                return response, None
+            except Exception as e:
+                return None, e
+
+    outcomes = await asyncio.gather(*(run(q) for q in queries))
+    return _merge_responses(queries, list(outcomes), snippet_store)
@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Optional
+
+from src.utils.observability import increment_node_counter
+
+DEFAULT_CACHE_PATH = "cache/search_cache.sqlite"
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 50_000
+# Acessos (LRU) acumulados em memória antes de irem para o SQLite
+TOUCH_BATCH_SIZE = 256
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_EDGE_PUNCTUATION = " \t\n\"'`.,;:!?()[]{}"
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normaliza uma query para uso como chave de cache.
+
+    Aplica NFKC, casefold, colapsa espaços e remove pontuação/aspas nas bordas,
+    de forma que "Boulos  PSOL?" e "boulos psol" compartilhem a mesma entrada.
+    """
+    query = unicodedata.normalize("NFKC", query).casefold()
+    query = _WHITESPACE_RE.sub(" ", query)
+    return query.strip(_EDGE_PUNCTUATION)
+
+
+def make_cache_key(query: str, max_results: int, **kwargs) -> str:
+    """Gera a chave do cache a partir da query normalizada, max_results e demais parâmetros."""
+    payload = {"q": normalize_query(query), "n": max_results, **kwargs}
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SearchCache:
+    """
+    Cache persistente (SQLite) de respostas de busca com TTL e evicção LRU.
+
+    Thread-safe: uma única conexão protegida por lock, compartilhada entre
+    todos os posts do processo. Sobrevive a reinícios do processo.
+
+    Um hit não escreve no SQLite: o último acesso fica em memória e é gravado
+    em lote (a cada ``TOUCH_BATCH_SIZE`` hits, antes da evicção em ``set`` e
+    em ``close``).
+    """
+
+    # Tabela do SQLite; subclasses guardam outros payloads no mesmo formato
+    # (ex: ``src.utils.claim_cache.ClaimVerdictCache``)
+    table = "search_cache"
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+        max_entries: Optional[int] = DEFAULT_MAX_ENTRIES,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._touched: dict = {}
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                key TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{self.table}_last_access "
+            f"ON {self.table} (last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[dict]:
+        """Retorna a resposta armazenada, ou None se ausente/expirada. Conta hits/misses."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT response, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            response, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._touched[key] = now
+            if len(self._touched) >= TOUCH_BATCH_SIZE:
+                self._flush_touches()
+            self.hits += 1
+        return json.loads(response)
+
+    def _flush_touches(self):
+        if not self._touched:
+            return
+        self._conn.executemany(
+            f"UPDATE {self.table} SET last_access = ? WHERE key = ?",
+            [(at, key) for key, at in self._touched.items()],
+        )
+        self._conn.commit()
+        self._touched.clear()
+
+    def set(self, key: str, query: str, response: dict):
+        """Armazena uma resposta, removendo as entradas menos usadas acima de ``max_entries``."""
+        now = time.time()
+        payload = json.dumps(response, ensure_ascii=False)
+        with self._lock:
+            self._flush_touches()
+            self._touched.pop(key, None)
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} "
+                "(key, query, response, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, query, payload, now, now),
+            )
+            if self.max_entries is not None:
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN ("
+                    f"  SELECT key FROM {self.table} ORDER BY last_access DESC"
+                    "  LIMIT -1 OFFSET ?"
+                    ")",
+                    (self.max_entries,),
+                )
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Remove todas as entradas expiradas. Retorna quantas foram removidas."""
+        if self.ttl_seconds is None:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,),
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def close(self):
+        with self._lock:
+            self._flush_touches()
+            self._conn.close()
+
+
+class CachedTavilyClient:
+    """
+    Wrapper de TavilyClient que consulta o ``SearchCache`` antes de ir à API.
+
+    Pode ser usado no lugar do cliente em ``RuntimeContext.tavily``. Hits e
+    misses são contados no cache (totais do processo) e no ``Metrics`` do nó
+    que fez a busca (``cache_hits``/``cache_misses``).
+
+    Exemplo:
+        tavily = CachedTavilyClient(create_tavily_client(api_key), SearchCache())
+    """
+
+    def __init__(self, client: Any, cache: Optional[SearchCache] = None):
+        self.client = client
+        self.cache = cache if cache is not None else SearchCache()
+
+    def search(self, query: str, max_results: int = 5, **kwargs) -> dict:
+        key = make_cache_key(query, max_results, **kwargs)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            increment_node_counter("cache_hits")
+            return cached
+
+        increment_node_counter("cache_misses")
+        response = self.client.search(query=query, max_results=max_results, **kwargs)
+        self.cache.set(key, query, response)
+        return response
+
+    def __getattr__(self, name: str) -> Any:
+        # Demais métodos (extract, crawl, ...) vão direto ao cliente original
+        return getattr(self.client, name)
@@ -0,0 +1,193 @@
+"""
+Armazenamento endereçado por conteúdo dos trechos retornados pelas buscas.
+
+As buscas guardam o texto de cada resultado uma única vez no ``SnippetStore``,
+com o hash do conteúdo como chave. Estado do grafo, checkpoints e JSONL levam
+só o hash: ``AgentState.content_ids`` é uma lista de hashes e cada referência é um
+``Reference`` compacto (url, título, score, hash). O mesmo artigo citado por
+mil posts ocupa espaço uma vez.
+
+Quem precisa do texto reidrata sob demanda (``get_many``/``rehydrate``):
+
+    store = SnippetStore("output/analysis_results.snippets.sqlite")
+    for ref in rehydrate(row["references"], store):
+        print(ref["url"], ref["content"][:80])
+
+O store padrão do processo é em memória e limitado aos trechos mais recentes
+(``DEFAULT_MEMORY_MAX_ENTRIES``); o CLI grava um SQLite ao lado do
+JSONL (``--snippet-store``) para que os resultados possam ser reidratados depois.
+Estado que sobrevive ao processo (checkpoints) exige um store persistente, e
+hashes sem texto no store levantam ``MissingSnippetsError``: o analyst nunca
+roda sem as evidências que a pesquisa encontrou.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+HASH_LENGTH = 16
+_HASH_RE = re.compile(rf"[0-9a-f]{{{HASH_LENGTH}}}")
+
+
+class MissingSnippetsError(KeyError):
+    """Hashes de trechos que não estão no ``SnippetStore`` (ex: estado de outro processo)."""
+
+
+def content_hash(content: str) -> str:
+    """Chave de um trecho: prefixo do SHA-256 do texto."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:HASH_LENGTH]
+
+
+class SnippetStore:
+    """
+    Trechos por hash de conteúdo, em SQLite (``":memory:"`` por padrão).
+    Inserir um trecho já existente não grava nada. Thread-safe.
+
+    Com ``max_entries``, os trechos inseridos (ou reinseridos) há mais tempo
+    são descartados quando o store passa do limite: os posts em andamento têm
+    os trechos mais recentes. Sem limite, o store só cresce.
+    """
+
+    def __init__(self, path: str = ":memory:", max_entries: Optional[int] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # Trechos novos, trechos que já estavam no store e trechos descartados pelo limite
+        self.stored = 0
+        self.deduplicated = 0
+        self.evicted = 0
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS snippets (hash TEXT PRIMARY KEY, content TEXT NOT NULL)"
+        )
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM snippets").fetchone()[0]
+
+    @property
+    def persistent(self) -> bool:
+        return self.path != ":memory:"
+
+    def put_many(self, contents: Iterable[str]) -> List[str]:
+        """Guarda os trechos e devolve os hashes, na mesma ordem."""
+        rows = [(content_hash(content), content) for content in contents]
+        if not rows:
+            return []
+        with self._lock:
+            new = set(key for key, _ in rows) - set(self._get_many([key for key, _ in rows]))
+            # Com limite, REPLACE dá um rowid novo ao trecho reinserido (fica entre os recentes)
+            verb = "INSERT OR REPLACE" if self.max_entries is not None else "INSERT OR IGNORE"
+            self._conn.executemany(f"{verb} INTO snippets (hash, content) VALUES (?, ?)", rows)
+            self._count += len(new)
+            if self.max_entries is not None and self._count > self.max_entries:
+                excess = self._count - self.max_entries
+                self._conn.execute(
+                    "DELETE FROM snippets WHERE rowid IN "
+                    "(SELECT rowid FROM snippets ORDER BY rowid LIMIT ?)",
+                    (excess,),
+                )
+                self._count -= excess
+                self.evicted += excess
+            self._conn.commit()
+            self.stored += len(new)
+            self.deduplicated += len(rows) - len(new)
+        return [key for key, _ in rows]
+
+    def put(self, content: str) -> str:
+        return self.put_many([content])[0]
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Texto de cada hash encontrado (hashes desconhecidos ficam de fora)."""
+        with self._lock:
+            return self._get_many(keys)
+
+    def _get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, str] = {}
+        # Em lotes, abaixo do limite de parâmetros do SQLite
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(
+                self._conn.execute(
+                    f"SELECT hash, content FROM snippets WHERE hash IN ({placeholders})", chunk
+                ).fetchall()
+            )
+        return found
+
+    def get(self, key: str) -> Optional[str]:
+        return self.get_many([key]).get(key)
+
+    def texts(self, keys: Iterable[str]) -> List[str]:
+        """
+        Textos dos hashes, na ordem. Itens que não são hashes (estado gravado
+        antes do store) voltam como estão; hashes desconhecidos levantam
+        ``MissingSnippetsError``.
+        """
+        keys = list(keys)
+        found = self.get_many(keys)
+        missing = [key for key in keys if key not in found and _HASH_RE.fullmatch(key)]
+        if missing:
+            raise MissingSnippetsError(
+                f"{len(missing)} of {len(keys)} snippets not found in snippet store {self.path!r} "
+                f"(e.g. {missing[0]}); resumed state needs the store it was written with"
+            )
+        return [found.get(key, key) for key in keys]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def rehydrate(references: Iterable[Any], store: "SnippetStore") -> List[Dict[str, Any]]:
+    """Referências compactas (``Reference`` ou dicts) com o texto do trecho em ``content``."""
+    references = [
+        ref.model_dump() if hasattr(ref, "model_dump") else dict(ref) for ref in references
+    ]
+    found = store.get_many(ref["content_hash"] for ref in references if ref.get("content_hash"))
+    for ref in references:
+        ref["content"] = found.get(ref.get("content_hash"))
+    return references
+
+
+# Trechos mantidos pelo store padrão (em memória): os posts em andamento
+# precisam só dos seus; quem quer reidratar depois usa um store em disco
+DEFAULT_MEMORY_MAX_ENTRIES = 20_000
+
+_default_store = SnippetStore(max_entries=DEFAULT_MEMORY_MAX_ENTRIES)
+
+
+def require_persistent_store(store: Optional[SnippetStore] = None) -> SnippetStore:
+    """
+    ``store`` (ou o padrão do processo), se gravado em disco. Estado que é
+    retomado em outro processo (checkpoints) só tem os hashes dos trechos.
+    """
+    store = store if store is not None else get_snippet_store()
+    if not store.persistent:
+        raise ValueError(
+            "Checkpointed state needs a persistent snippet store: "
+            "set_snippet_store(SnippetStore('<path>.sqlite')) before opening the checkpointer"
+        )
+    return store
+
+
+def get_snippet_store() -> SnippetStore:
+    """Store usado quando ``RuntimeContext.snippet_store`` não é informado."""
+    return _default_store
+
+
+def set_snippet_store(store: SnippetStore):
+    """Substitui o store padrão do processo (ex: SQLite ao lado do JSONL de resultados)."""
+    global _default_store
+    _default_store = store
@@ -0,0 +1,149 @@
+"""
+Memoização por estágio (nó) do grafo, para a matriz de troca de modelos.
+
+Com ``RuntimeContext(stage_cache=StageCache())``, cada nó rastreado por
+``track_node_metrics`` tem a saída guardada pela chave (nó, config do modelo
+do nó, hash do estado de entrada). Trocar o modelo de um nó só recalcula ele
+e os nós depois dele: os anteriores recebem o mesmo estado de entrada e são
+servidos do cache, e o research não refaz as buscas no Tavily.
+
+O hash ignora ``metrics``; o resto do ``RuntimeContext`` (tavily, orçamento de
+evidências, faixa da cascata, ...) deve ser o mesmo para todas as execuções
+que compartilham o cache.
+
+Execuções concorrentes do mesmo estágio (ex: a baseline e a troca do analyst
+do mesmo post, em paralelo) são calculadas uma única vez: as demais esperam
+o resultado.
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from src.models.schemas import Metrics
+
+
+def state_fingerprint(state: Any) -> str:
+    """Hash estável do estado de entrada de um nó (sem ``metrics``)."""
+    data = state.model_dump(mode="json", exclude={"metrics"})
+    raw = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# Saída guardada: (atualização do estado sem ``metrics``, métricas do nó), ou None
+_Entry = Optional[Tuple[Dict[str, Any], Optional[Metrics]]]
+
+
+class StageCache:
+    """Cache em memória das saídas dos nós, compartilhado entre threads e tasks. Thread-safe."""
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, Optional[str], str], Future] = {}
+        self._lock = threading.Lock()
+        # Por nó: execuções servidas do cache e execuções de fato
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    def key(self, node_name: str, base_model: Optional[str], state: Any, runtime: Any) -> tuple:
+        model = base_model
+        if model is None:
+            try:
+                model = runtime.context.models_registry.get_model_config(node_name).model_dump_json()
+            except ValueError:
+                model = None
+        return (node_name, model, state_fingerprint(state))
+
+    def _claim(self, key: tuple) -> Tuple[bool, Future]:
+        """(True, future novo) se esta execução calcula o estágio; senão o future de quem calcula."""
+        node_name = key[0]
+        with self._lock:
+            future = self._entries.get(key)
+            if future is not None:
+                self.hits[node_name] = self.hits.get(node_name, 0) + 1
+                return False, future
+            future = self._entries[key] = Future()
+            self.misses[node_name] = self.misses.get(node_name, 0) + 1
+            return True, future
+
+    def _fail(self, key: tuple, future: Future, error: BaseException):
+        # Erros não ficam no cache: a próxima execução tenta de novo
+        with self._lock:
+            self._entries.pop(key, None)
+        future.set_exception(error)
+
+    @staticmethod
+    def _store(node_name: str, result: Optional[Dict[str, Any]]) -> _Entry:
+        if result is None:
+            return None
+        update = {k: copy.deepcopy(v) for k, v in result.items() if k != "metrics"}
+        metrics = (result.get("metrics") or {}).get(node_name)
+        return update, metrics.model_copy() if metrics is not None else None
+
+    @staticmethod
+    def _restore(node_name: str, entry: _Entry, state: Any, memoized: bool) -> Optional[Dict[str, Any]]:
+        if entry is None:
+            return None
+        update, metrics = entry
+        result = copy.deepcopy(update)
+        if metrics is not None:
+            # Custo original do estágio (tempo e tokens), marcado como reaproveitado
+            state.metrics[node_name] = metrics.model_copy(update={"memoized": memoized})
+            result["metrics"] = state.metrics
+        return result
+
+    def run(
+        self,
+        node_name: str,
+        base_model: Optional[str],
+        state: Any,
+        runtime: Any,
+        compute: Callable[[], Optional[Dict[str, Any]]],
+    ) -> Optional[Dict[str, Any]]:
+        key = self.key(node_name, base_model, state, runtime)
+        owner, future = self._claim(key)
+        if not owner:
+            return self._restore(node_name, future.result(), state, memoized=True)
+        try:
+            result = compute()
+        except BaseException as e:
+            self._fail(key, future, e)
+            raise
+        future.set_result(self._store(node_name, result))
+        return result
+
+    async def arun(
+        self,
+        node_name: str,
+        base_model: Optional[str],
+        state: Any,
+        runtime: Any,
+        compute: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+    ) -> Optional[Dict[str, Any]]:
+        key = self.key(node_name, base_model, state, runtime)
+        owner, future = self._claim(key)
+        if not owner:
+            entry = await asyncio.wrap_future(future)
+            return self._restore(node_name, entry, state, memoized=True)
+        try:
+            result = await compute()
+        except BaseException as e:
+            self._fail(key, future, e)
+            raise
+        future.set_result(self._store(node_name, result))
+        return result
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Execuções por nó: ``computed`` (de fato) e ``reused`` (servidas do cache)."""
+        with self._lock:
+            nodes = dict.fromkeys(list(self.misses) + list(self.hits))
+            return {
+                node: {"computed": self.misses.get(node, 0), "reused": self.hits.get(node, 0)}
+                for node in nodes
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from src.graphs import get_graph
+from src.models.fakes import FakeChatModel, FakeModelsRegistry, FakeTavilyClient
+from src.runners.batch import arun_batch, get_models_config, run_batch
+from src.utils.dedup import PostDeduplicator
+
+POST = "Cloroquina cura COVID, diz médico"
+
+
+def _registry():
+    return FakeModelsRegistry(model=FakeChatModel(relevance_ratio=1.0))
+
+
+class Abort(BaseException):
+    """Interrupção fora de ``Exception`` (como um cancelamento), que o runner não captura."""
+
+
+class AbortingGraph:
+    """Grafo v1 real, mas a primeira chamada espera e é interrompida."""
+
+    def __init__(self):
+        self.graph = get_graph("v1", use_async=True)
+        self.checkpointer = None
+        self.calls = 0
+
+    async def ainvoke(self, graph_input, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            await asyncio.sleep(0.05)
+            raise Abort()
+        return await self.graph.ainvoke(graph_input, **kwargs)
+
+
+def test_duplicates_reuse_canonical_result():
+    results = run_batch(
+        [("1", POST), ("2", POST + "!"), ("3", "Vacina causa autismo")],
+        _registry(),
+        FakeTavilyClient(),
+        max_concurrency=1,
+        deduplicator=PostDeduplicator(),
+    )
+    by_id = {r["id_mention"]: r for r in results}
+    assert by_id["2"]["duplicate_of"] == "1"
+    assert by_id["2"]["score"] == by_id["1"]["score"]
+    assert by_id["2"]["full_text"] == POST + "!"
+    assert by_id["3"].get("duplicate_of") is None
+
+
+def test_interrupted_canonical_does_not_block_duplicates():
+    emitted = []
+
+    async def run():
+        with pytest.raises(Abort):
+            await arun_batch(
+                [("1", POST), ("2", POST)],
+                _registry(),
+                FakeTavilyClient(),
+                max_concurrency=2,
+                graph=AbortingGraph(),
+                deduplicator=PostDeduplicator(),
+                on_result=emitted.append,
+            )
+        # A duplicata não fica presa no futuro do canônico: passa pelo grafo
+        for _ in range(100):
+            if emitted:
+                break
+            await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    assert [r["id_mention"] for r in emitted] == ["2"]
+    assert emitted[0]["success"] and emitted[0].get("duplicate_of") is None
+
+
+def test_models_config_includes_triage():
+    config = get_models_config(_registry())
+    assert {"entry", "planner", "triage", "researcher", "analyst"} <= set(config)
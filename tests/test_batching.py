@@ -0,0 +1,47 @@
+import json
+
+from src.models.batching import EntryBatcher, split_tokens
+from src.models.fakes import FakeChatModel, FakeModelsRegistry, FakeTavilyClient
+from src.runners.batch import run_batch
+
+POSTS = [(str(i), f"Post número {i} sobre a cloroquina e a COVID") for i in range(4)]
+
+
+class DroppingModel(FakeChatModel):
+    """Resposta em lote sem o último post."""
+
+    def _payload(self, messages, schema):
+        payload = super()._payload(messages, schema)
+        if schema is not None and schema.__name__ == "BatchRelevanceAnalysis":
+            data = json.loads(payload)
+            data["results"] = data["results"][:-1]
+            return json.dumps(data)
+        return payload
+
+
+def _run(model):
+    registry = FakeModelsRegistry(model=model)
+    batcher = EntryBatcher(registry, batch_size=len(POSTS), max_wait=1.0)
+    results = run_batch(
+        POSTS, registry, FakeTavilyClient(), extra_context={"entry_batcher": batcher}
+    )
+    return {r["id_mention"]: r["metrics"]["entry"] for r in results}, batcher
+
+
+def test_split_tokens_is_exact_and_proportional():
+    assert split_tokens(10, [1, 1, 2]) == [3, 2, 5]
+    assert sum(split_tokens(7, [0.3, 0.3, 0.4])) == 7
+    assert split_tokens(5, [0, 0]) == [3, 2]
+
+
+def test_concurrent_posts_share_one_entry_call():
+    entries, batcher = _run(FakeChatModel(relevance_ratio=0.5))
+    assert (batcher.batches, batcher.batched_posts, batcher.fallbacks) == (1, 4, 0)
+    assert all(m["batch_size"] == 4 for m in entries.values())
+    assert all(m["prompt_tokens"] > 0 for m in entries.values())
+
+
+def test_missing_post_falls_back_to_single_call():
+    entries, batcher = _run(DroppingModel(relevance_ratio=0.5))
+    assert (batcher.batched_posts, batcher.fallbacks) == (3, 1)
+    assert sorted(m.get("batch_size", 0) for m in entries.values()) == [0, 4, 4, 4]
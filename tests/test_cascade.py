@@ -0,0 +1,79 @@
+import json
+from typing import Optional
+
+import pytest
+from langchain_core.exceptions import OutputParserException
+
+from src.graphs import get_graph
+from src.models.context import ModelConfig
+from src.models.fakes import FakeChatModel, FakeModelsRegistry, FakeTavilyClient
+from src.models.state import AgentState
+
+POST = "Cloroquina cura COVID, diz médico"
+
+
+class ScoringModel(FakeChatModel):
+    """Responde ao analyst com ``score`` fixo, ou com texto inválido se ``score`` é None."""
+
+    score: Optional[float] = 0.5
+    analyst_calls: int = 0
+
+    def _payload(self, messages, schema):
+        if schema is None or schema.__name__ != "Response":
+            return super()._payload(messages, schema)
+        self.analyst_calls += 1
+        if self.score is None:
+            return "isto não é JSON"
+        return json.dumps({"score": self.score, "justification": f"score {self.score}"})
+
+
+class CascadeRegistry(FakeModelsRegistry):
+    """``analyst_escalation`` (modelo "strong") usa ``strong``; o resto, ``model``."""
+
+    analyst_escalation: ModelConfig = ModelConfig(model="strong")
+    strong: ScoringModel = ScoringModel(score=0.9)
+
+    def _create_model(self, config):
+        return self.strong if config.model == "strong" else self.model
+
+
+def _run(cheap: Optional[float], strong: Optional[float] = 0.9):
+    registry = CascadeRegistry(
+        model=ScoringModel(relevance_ratio=1.0, score=cheap),
+        strong=ScoringModel(score=strong),
+    )
+    result = get_graph("v1").invoke(
+        {"post": POST}, context={"models_registry": registry, "tavily": FakeTavilyClient()}
+    )
+    return result, registry
+
+
+def test_confident_answer_does_not_escalate():
+    result, registry = _run(cheap=0.95)
+    assert result["response"].score == 0.95
+    assert "analyst_escalation" not in result["metrics"]
+    assert registry.strong.analyst_calls == 0
+
+
+def test_uncertain_answer_escalates():
+    result, registry = _run(cheap=0.5)
+    assert result["response"].score == 0.9
+    assert result["metrics"]["analyst"].score == 0.5
+    assert result["metrics"]["analyst_escalation"].score == 0.9
+    assert registry.strong.analyst_calls == 1
+
+
+def test_unparsable_answer_escalates():
+    result, _ = _run(cheap=None)
+    assert result["response"].score == 0.9
+
+
+def test_strong_model_failures_keep_cheap_answer_or_raise():
+    # Sem resposta válida em nenhum modelo: o erro de parsing aparece
+    with pytest.raises(OutputParserException):
+        _run(cheap=None, strong=None)
+
+    # Modelo forte sem resposta válida: fica o score incerto do barato
+    result, registry = _run(cheap=0.5, strong=None)
+    assert result["response"].score == 0.5
+    assert registry.strong.analyst_calls == AgentState.model_fields["max_revisions"].default
@@ -0,0 +1,50 @@
+from src.models.fakes import FakeChatModel, FakeModelsRegistry, FakeTavilyClient
+from src.runners.batch import run_batch
+from src.utils.cassette import Cassette
+
+POSTS = [("1", "Cloroquina cura COVID"), ("2", "Vacina causa autismo"), ("3", "Bom dia")]
+
+
+def _run(posts, registry, tavily):
+    results = run_batch(posts, registry, tavily, max_concurrency=2)
+    return {r["id_mention"]: r for r in results}
+
+
+def _verdicts(results):
+    return {
+        post_id: (r["success"], r["relevant"], r["score"], r["justification"])
+        for post_id, r in results.items()
+    }
+
+
+def test_replay_reproduces_recorded_run(tmp_path):
+    path = str(tmp_path / "run.cassette.gz")
+    recording = Cassette(path, mode="record")
+    registry = FakeModelsRegistry(model=FakeChatModel(relevance_ratio=0.7))
+    registry.cassette = recording
+    recorded = _run(POSTS, registry, recording.wrap_tavily(FakeTavilyClient()))
+    recording.close()
+    assert all(r["success"] for r in recorded.values())
+
+    replay = Cassette(path, mode="replay")
+    # Outro modelo e nenhum Tavily: as respostas só podem vir do cassete
+    registry = FakeModelsRegistry(model=FakeChatModel(relevance_ratio=0.0, seed=1))
+    registry.cassette = replay
+    replayed = _run(POSTS, registry, replay.wrap_tavily(None))
+    replay.close()
+
+    assert _verdicts(replayed) == _verdicts(recorded)
+
+
+def test_replay_miss_fails_the_post(tmp_path):
+    path = str(tmp_path / "run.cassette.gz")
+    Cassette(path, mode="record").close()
+
+    replay = Cassette(path, mode="replay")
+    registry = FakeModelsRegistry()
+    registry.cassette = replay
+    result = _run([("9", "Post nunca gravado")], registry, replay.wrap_tavily(None))["9"]
+    replay.close()
+
+    assert not result["success"]
+    assert "No recorded llm call" in result["error"]
@@ -0,0 +1,48 @@
+import asyncio
+
+from src.graphs import build
+from src.graphs.checkpoint import aopen_checkpointer
+from src.models.fakes import FakeChatModel, FakeModelsRegistry, FakeTavilyClient
+from src.runners.batch import arun_batch
+from src.utils.snippet_store import SnippetStore
+
+POST = ("1", "Cloroquina cura COVID, diz médico")
+CALLS = []
+
+
+class FlakyAnalyst(FakeChatModel):
+    """O analyst (schema ``Response``) falha na primeira chamada; registra as demais."""
+
+    def _payload(self, messages, schema):
+        name = schema.__name__ if schema else "text"
+        CALLS.append(name)
+        if name == "Response" and CALLS.count("Response") == 1:
+            raise RuntimeError("ollama stopped")
+        return super()._payload(messages, schema)
+
+
+def test_failed_post_resumes_at_the_analyst(tmp_path):
+    CALLS.clear()
+    tavily = FakeTavilyClient()
+    registry = FakeModelsRegistry(model=FlakyAnalyst(relevance_ratio=1.0))
+    snippets = SnippetStore(str(tmp_path / "snippets.sqlite"))
+
+    async def run():
+        async with aopen_checkpointer(
+            str(tmp_path / "checkpoints.sqlite"), snippet_store=snippets
+        ) as saver:
+            graph = build("v1", use_async=True, checkpointer=saver)
+            extra = {"snippet_store": snippets}
+            first = await arun_batch([POST], registry, tavily, graph=graph, extra_context=extra)
+            searches, calls = tavily.calls, len(CALLS)
+            second = await arun_batch([POST], registry, tavily, graph=graph, extra_context=extra)
+            return first[0], second[0], searches, calls
+
+    first, second, searches, calls = asyncio.run(run())
+    snippets.close()
+
+    assert not first["success"] and "ollama stopped" in first["error"]
+    assert second["success"] and second["score"] is not None
+    # Entry, planner e buscas não são repetidos: só o analyst roda de novo
+    assert tavily.calls == searches
+    assert CALLS[calls:] == ["Response"]
@@ -0,0 +1,81 @@
+from src.models.fakes import FakeChatModel, FakeModelsRegistry, FakeTavilyClient
+from src.runners.batch import run_batch
+from src.utils.claim_cache import ClaimVerdictCache, claim_key, split_claims
+
+CLAIMS = {
+    "cloroquina": "Verificar se a cloroquina cura a COVID-19",
+    "cultura": "O governo gastou R$16 bilhões com cultura",
+}
+
+
+class Planner(FakeChatModel):
+    """Plano (texto livre) com as afirmações de ``CLAIMS`` citadas no post."""
+
+    def _payload(self, messages, schema):
+        if schema is None:
+            post = str(messages[-1].content).lower()
+            items = [claim for word, claim in CLAIMS.items() if word in post]
+            return "Bases factuais:\n" + "\n".join(f"{i}. {c}" for i, c in enumerate(items, 1))
+        return super()._payload(messages, schema)
+
+
+STRUCTURED_CALLS = []
+
+
+class RecordingPlanner(Planner):
+    """Guarda em ``STRUCTURED_CALLS`` as mensagens das chamadas estruturadas."""
+
+    def _payload(self, messages, schema):
+        if schema is not None:
+            STRUCTURED_CALLS.append((schema.__name__, messages))
+        return super()._payload(messages, schema)
+
+
+def _run(posts, cache, model=None):
+    results = run_batch(
+        posts,
+        FakeModelsRegistry(model=model or Planner(relevance_ratio=1.0)),
+        FakeTavilyClient(),
+        extra_context={"claim_cache": cache},
+    )
+    return {r["id_mention"]: r for r in results}
+
+
+def test_split_claims_dedups_and_drops_filler():
+    plan = "## Plano:\n1. **Cloroquina**:\n   - Verificar se a cloroquina cura a COVID-19\n   - verificar se a Cloroquina cura a covid 19!"
+    post = "cloroquina cura covid 19"
+    assert len(split_claims(plan, post)) == 1
+
+
+def test_generic_claims_are_not_cached():
+    post = "Lula disse que a inflação caiu em 2023"
+    assert split_claims("1. Verificar a veracidade da informação citada no post", post) == []
+
+
+def test_claim_key_only_keeps_words_from_the_post():
+    claim = "Verificar se a inflação caiu em 2023 segundo o IBGE"
+    assert claim_key(claim, "Lula disse que a inflação caiu em 2023") != claim_key(
+        claim, "A inflação caiu em 2023 segundo o IBGE"
+    )
+
+
+def test_cached_claims_skip_research():
+    cache = ClaimVerdictCache(":memory:")
+    first = _run([("1", "cloroquina cura covid-19, diz médico")], cache)
+    assert "researcher" in first["1"]["metrics"]
+    assert len(cache) == 1
+
+    second = _run([("2", "CLOROQUINA cura a COVID 19 sim")], cache)
+    metrics = second["2"]["metrics"]
+    assert "researcher" not in metrics
+    assert metrics["planner"]["claim_hits"] == 1
+
+
+def test_claim_instructions_follow_the_claims():
+    cache = ClaimVerdictCache(":memory:")
+    STRUCTURED_CALLS.clear()
+    _run([("1", "cloroquina cura covid-19, diz médico")], cache, model=RecordingPlanner(relevance_ratio=1.0))
+
+    ((system, human),) = [m for name, m in STRUCTURED_CALLS if name == "ClaimsResponse"]
+    assert '"results"' not in system.content
+    assert human.content.index("Claims:") < human.content.index('"results"')
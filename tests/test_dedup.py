@@ -0,0 +1,29 @@
+from src.utils.dedup import PostDeduplicator, dedup_posts, normalize_post
+
+BASE = "O governo federal gastou 16 bilhões de reais com shows e eventos culturais em 2023"
+
+
+def test_normalize_post_drops_noise():
+    assert normalize_post("Cloroquina CURA covid!!! 🙏 #fato https://t.co/x") == "cloroquina cura covid"
+
+
+def test_exact_and_near_duplicates_point_to_canonical():
+    dedup = PostDeduplicator()
+    assert dedup.add("1", BASE) is None
+    assert dedup.add("2", BASE.upper() + " #compartilhe https://t.co/abc") == "1"
+    assert dedup.add("3", BASE.replace("culturais", "culturas")) == "1"
+    assert dedup.add("4", "A vacina contra a gripe causa autismo em crianças pequenas") is None
+    assert len(dedup) == 2
+
+
+def test_short_posts_only_match_exactly():
+    dedup = PostDeduplicator()
+    assert dedup.add("1", "Vote 13") is None
+    assert dedup.add("2", "Vote 17") is None
+    assert dedup.add("3", "vote 13!") == "1"
+
+
+def test_dedup_posts_splits_unique_and_duplicates():
+    unique, duplicates = dedup_posts([("1", BASE), ("2", "outro post sem relação alguma"), ("3", BASE + "!!")])
+    assert [post_id for post_id, _ in unique] == ["1", "2"]
+    assert duplicates == {"3": "1"}
@@ -0,0 +1,30 @@
+import pytest
+
+from src.graphs import get_graph
+from src.models.fakes import FakeChatModel, FakeModelsRegistry, FakeTavilyClient
+from src.runners.batch import run_batch
+from src.utils.prefilter import LexicalPrefilter
+
+
+def _nodes(graph) -> set:
+    return set(graph.get_graph().nodes) - {"__start__", "__end__"}
+
+
+@pytest.mark.parametrize("version", ["v1", "v2"])
+def test_optional_nodes_only_when_enabled(version):
+    assert not {"prefilter", "evidence"} & _nodes(get_graph(version))
+    full = _nodes(get_graph(version, prefilter=True, evidence=True))
+    assert {"prefilter", "evidence"} <= full
+
+
+def test_batch_adds_nodes_from_context():
+    results = run_batch(
+        [("1", "Bom dia"), ("2", "Cloroquina cura COVID")],
+        FakeModelsRegistry(model=FakeChatModel(relevance_ratio=1.0)),
+        FakeTavilyClient(),
+        extra_context={"prefilter": LexicalPrefilter(), "evidence_token_budget": 200},
+    )
+    by_id = {r["id_mention"]: r for r in results}
+    assert set(by_id["1"]["metrics"]) == {"prefilter"}
+    assert by_id["1"]["relevant"] is False
+    assert {"prefilter", "entry", "evidence", "analyst"} <= set(by_id["2"]["metrics"])
@@ -0,0 +1,26 @@
+from src.models.schemas import FEATURE_METRICS, Metrics
+from src.utils.result_store import flatten_result
+
+
+def test_feature_fields_omitted_at_default():
+    metrics = Metrics(base_model="m", execution_time=1.0, total_tokens=10)
+    data = metrics.model_dump()
+    assert not set(FEATURE_METRICS) & set(data)
+    assert data["total_tokens"] == 10
+    assert Metrics(**data) == metrics
+
+
+def test_feature_fields_kept_when_set():
+    metrics = Metrics(base_model="m", execution_time=1.0, cache_hits=2, passage_ids=["0:1"])
+    data = metrics.model_dump()
+    assert data["cache_hits"] == 2 and data["passage_ids"] == ["0:1"]
+    assert "claim_hits" not in data
+    assert Metrics(**data) == metrics
+
+
+def test_parquet_row_restores_defaults():
+    data = Metrics(base_model="m", execution_time=1.0).model_dump()
+    row = flatten_result({"id_mention": "1", "metrics": {"analyst": data}})
+    assert row["analyst__cache_hits"] == 0
+    assert row["analyst__memoized"] is False
+    assert row["analyst__passage_ids"] == "[]"
@@ -0,0 +1,49 @@
+from src.models.fakes import FakeChatModel, FakeModelsRegistry, FakeTavilyClient
+from src.runners.batch import run_batch
+from src.utils.metrics_export import MetricsAggregator
+
+POSTS = [("1", "Cloroquina cura COVID"), ("2", "Vacina causa autismo")]
+
+
+def test_aggregates_batch_metrics():
+    aggregator = MetricsAggregator()
+    run_batch(
+        POSTS,
+        FakeModelsRegistry(model=FakeChatModel(relevance_ratio=1.0)),
+        FakeTavilyClient(),
+        metrics=aggregator,
+    )
+
+    snap = aggregator.snapshot()
+    assert snap["posts_started"] == snap["posts_finished"] == 2
+    assert snap["in_flight"] == 0 and snap["errors"] == 0
+    assert snap["relevance_rate"] == 1.0
+    assert snap["nodes"]["analyst"]["count"] == 2
+    assert snap["cascade"]["analyzed"] == 2
+    assert all(m["completion_tokens"] > 0 for m in snap["models"].values())
+
+
+def test_omitted_feature_fields_count_as_zero():
+    aggregator = MetricsAggregator()
+    aggregator.post_started()
+    aggregator.post_finished({
+        "success": False,
+        "metrics": {"planner": {"base_model": "m", "execution_time": 0.2, "claim_hits": 2}},
+    })
+
+    snap = aggregator.snapshot()
+    assert snap["errors"] == 1
+    assert snap["claims"]["hits"] == 2 and snap["claims"]["resolved_posts"] == 1
+    assert snap["cache"] == {"hits": 0, "misses": 0, "hit_rate": 0.0}
+
+
+def test_prometheus_text_exposes_histograms():
+    aggregator = MetricsAggregator()
+    aggregator.post_started()
+    aggregator.post_finished({"metrics": {"analyst": {"base_model": "m", "execution_time": 0.3}}})
+
+    text = aggregator.prometheus_text()
+    assert "fnd_posts_finished_total 1" in text
+    assert 'fnd_node_latency_seconds_bucket{node="analyst",le="0.25"} 0' in text
+    assert 'fnd_node_latency_seconds_bucket{node="analyst",le="0.5"} 1' in text
+    assert 'fnd_node_latency_seconds_count{node="analyst"} 1' in text
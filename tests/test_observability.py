@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from src.models.state import AgentState
+from src.utils import observability
+from src.utils.observability import increment_node_counter, track_node_metrics
+
+
+class _Runtime:
+    context = None
+
+
+@track_node_metrics("entry", base_model="test")
+def counting_node(state, runtime):
+    increment_node_counter("cache_hits")
+    return {}
+
+
+@track_node_metrics("entry", base_model="test")
+def failing_node(state, runtime):
+    raise RuntimeError("boom")
+
+
+@track_node_metrics("entry", base_model="test")
+async def acounting_node(state, runtime):
+    increment_node_counter("cache_hits")
+    return {}
+
+
+def test_node_run_is_reset_after_node():
+    result = counting_node(AgentState(post="p"), _Runtime())
+    assert result["metrics"]["entry"].cache_hits == 1
+    assert observability._current_node_run.get() is None
+
+    with pytest.raises(RuntimeError):
+        failing_node(AgentState(post="p"), _Runtime())
+    assert observability._current_node_run.get() is None
+
+
+def test_node_run_is_reset_after_async_node():
+    async def run():
+        await acounting_node(AgentState(post="p"), _Runtime())
+        return observability._current_node_run.get()
+
+    assert asyncio.run(run()) is None
@@ -0,0 +1,52 @@
+import time
+
+from src.models.context import ModelConfig
+from src.models.fakes import FakeChatModel
+from src.models.pool import ConcurrencyLimitedModel, ModelClientPool
+from src.models.schemas import RelevanceAnalysis
+
+
+def _factory(config: ModelConfig) -> FakeChatModel:
+    return FakeChatModel()
+
+
+def test_same_config_reuses_client():
+    pool = ModelClientPool()
+    config = ModelConfig(model="fake", base_url="http://a")
+
+    first = pool.get(config, _factory)
+    assert pool.get(ModelConfig(model="fake", base_url="http://a"), _factory) is first
+    assert pool.get(ModelConfig(model="fake", base_url="http://b"), _factory) is not first
+    assert pool.created == 2
+
+
+def test_structured_runnable_is_cached():
+    pool = ModelClientPool()
+    config = ModelConfig(model="fake")
+
+    structured = pool.get_structured(config, _factory, RelevanceAnalysis)
+    assert pool.get_structured(config, _factory, RelevanceAnalysis) is structured
+    assert pool.get_structured(config, _factory, RelevanceAnalysis, include_raw=True) is not structured
+    assert isinstance(structured.invoke("Cloroquina cura COVID"), RelevanceAnalysis)
+
+
+def test_endpoint_limit_wraps_client():
+    pool = ModelClientPool(endpoint_limits={"http://a/": 2})
+
+    assert isinstance(pool.get(ModelConfig(model="fake", base_url="http://a"), _factory), ConcurrencyLimitedModel)
+    assert isinstance(pool.get(ModelConfig(model="fake", base_url="http://b"), _factory), FakeChatModel)
+
+
+def test_evict_idle_drops_unused_clients():
+    pool = ModelClientPool(idle_ttl=0.05)
+    config = ModelConfig(model="fake")
+    first = pool.get(config, _factory)
+    structured = pool.get_structured(config, _factory, RelevanceAnalysis)
+
+    time.sleep(0.06)
+    assert pool.evict_idle() == 1
+    assert len(pool) == 0 and pool.evicted == 1
+
+    assert pool.get(config, _factory) is not first
+    assert pool.get_structured(config, _factory, RelevanceAnalysis) is not structured
+    assert pool.created == 2
@@ -0,0 +1,42 @@
+from src.utils.prefilter import LexicalPrefilter, NaiveBayesModel, choose_threshold
+
+TEXTS = [
+    "cloroquina cura covid segundo estudo",
+    "vacina causa autismo diz deputado",
+    "urna eletronica foi fraudada em 2022",
+    "governo cortou verba da saude",
+    "que dia lindo na praia hoje",
+    "feliz aniversario minha amiga querida",
+    "olha esse por do sol maravilhoso",
+    "bom domingo para toda a familia",
+]
+LABELS = [True] * 4 + [False] * 4
+
+
+def test_rules_keep_slogans_and_hashtags():
+    prefilter = LexicalPrefilter()
+    assert prefilter.check("Bom dia!") is not None
+    assert prefilter.check("Estou com Boulos 50 🙏") is None
+    assert prefilter.check("#pablomarcal #saopaulo") is None
+
+
+def test_choose_threshold_meets_precision():
+    model = NaiveBayesModel().fit(TEXTS, LABELS)
+    threshold, report = choose_threshold(model, TEXTS, LABELS, min_precision=1.0, min_rejected=2)
+    assert threshold > 0
+    assert report["precision"] == 1.0 and report["rejected"] >= 2
+
+
+def test_no_threshold_disables_classifier(tmp_path):
+    model = NaiveBayesModel().fit(TEXTS, LABELS)
+    # Rótulos invertidos: nenhum limiar rejeita só posts irrelevantes
+    flipped = [not l for l in LABELS]
+    threshold, report = choose_threshold(model, TEXTS, flipped, min_precision=0.95, min_rejected=1)
+    assert (threshold, report) == (0.0, {})
+
+    path = tmp_path / "prefilter.json"
+    model.save(str(path), reject_threshold=threshold)
+    prefilter = LexicalPrefilter.from_file(str(path))
+    assert prefilter.reject_threshold == 0.0
+    assert all(prefilter.check(t) is None for t in TEXTS)
+    assert LexicalPrefilter.from_file(str(path), reject_threshold=0.5).reject_threshold == 0.5
@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import pytest
+
+from src.models.resilience import EndpointGuard, ResilienceConfig
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def _raise(status_code: int):
+    def fn():
+        raise StatusError(status_code)
+
+    return fn
+
+
+def _open_guard() -> EndpointGuard:
+    """Guard com o circuito aberto por um 503 e o ``reset_timeout`` já vencido."""
+    guard = EndpointGuard(
+        "test", ResilienceConfig(failure_threshold=1, reset_timeout_s=0.05, max_attempts=1)
+    )
+    with pytest.raises(StatusError):
+        guard.call(_raise(503))
+    assert guard.breaker.state == "open"
+    time.sleep(0.06)
+    return guard
+
+
+def _call_within(guard: EndpointGuard, timeout: float):
+    async def healthy():
+        return "ok"
+
+    return asyncio.run(asyncio.wait_for(guard.acall(healthy), timeout))
+
+
+@pytest.mark.parametrize("status_code", [429, 400])
+def test_unsuccessful_probe_stays_half_open(status_code):
+    guard = _open_guard()
+    with pytest.raises(StatusError):
+        guard.call(_raise(status_code))
+    # Só um sucesso fecha; a próxima chamada vira a nova chamada de teste
+    assert guard.breaker.state == "half_open"
+    assert _call_within(guard, 2.0) == "ok"
+    assert guard.breaker.state == "closed"
+
+
+def test_request_error_resets_failures_when_closed():
+    guard = EndpointGuard("test", ResilienceConfig(failure_threshold=2, max_attempts=1))
+    with pytest.raises(StatusError):
+        guard.call(_raise(503))
+    with pytest.raises(StatusError):
+        guard.call(_raise(400))
+    with pytest.raises(StatusError):
+        guard.call(_raise(503))
+    assert guard.breaker.state == "closed"
+
+
+def test_cancelled_probe_releases_circuit():
+    guard = _open_guard()
+
+    async def cancelled_probe():
+        async def hang():
+            await asyncio.sleep(10)
+
+        task = asyncio.create_task(guard.acall(hang))
+        await asyncio.sleep(0.01)
+        assert guard.breaker.state == "half_open"
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancelled_probe())
+    assert _call_within(guard, 2.0) == "ok"
+    assert guard.breaker.state == "closed"
@@ -0,0 +1,45 @@
+import pyarrow.dataset as ds
+
+from src.models.fakes import FakeChatModel, FakeModelsRegistry, FakeTavilyClient
+from src.runners.batch import run_batch
+from src.utils.result_store import ResultStore, _dataset_files, compact, read_results
+
+POSTS = [("1", "Cloroquina cura COVID"), ("2", "Vacina causa autismo"), ("3", "Bom dia a todos")]
+
+
+def _run(store: ResultStore):
+    run_batch(
+        POSTS,
+        FakeModelsRegistry(model=FakeChatModel(relevance_ratio=1.0)),
+        FakeTavilyClient(),
+        on_result=store.append,
+    )
+
+
+def test_batch_results_round_trip(tmp_path):
+    path = str(tmp_path / "results")
+    with ResultStore(path, rows_per_file=2) as store:
+        _run(store)
+    assert store.rows_written == 3
+    assert len(_dataset_files(path)) == 2
+
+    table = read_results(path, columns=["id_mention", "relevant", "analyst__total_tokens"])
+    rows = {row["id_mention"]: row for row in table.to_pylist()}
+    assert set(rows) == {"1", "2", "3"}
+    assert all(row["relevant"] for row in rows.values())
+    assert all(row["analyst__total_tokens"] > 0 for row in rows.values())
+
+    filtered = read_results(path, columns=["id_mention"], filter=ds.field("id_mention") == "2")
+    assert filtered.column("id_mention").to_pylist() == ["2"]
+
+
+def test_compact_keeps_rows(tmp_path):
+    path = str(tmp_path / "results")
+    with ResultStore(path, rows_per_file=1) as store:
+        _run(store)
+    assert len(_dataset_files(path)) == 3
+
+    assert compact(path) == 3
+    assert len(_dataset_files(path)) == 1
+    ids = read_results(path, columns=["id_mention"]).column("id_mention").to_pylist()
+    assert sorted(ids) == ["1", "2", "3"]
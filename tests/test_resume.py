@@ -0,0 +1,59 @@
+import json
+import os
+
+from src.runners.cli import rotate_outputs
+from src.runners.resume import ResumeIndex, id_digest
+
+
+def test_len_counts_each_id_once(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    index = ResumeIndex(path, compact_every=2)
+    index.extend(["a", "b", "c"])
+    index.extend(["a", "b", "c"])
+    assert len(index) == 3
+    assert "a" in index and "d" not in index
+    index.close()
+
+    reopened = ResumeIndex(path)
+    assert len(reopened) == 3
+    reopened.close()
+
+
+def test_log_replay_skips_compacted_ids(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    index = ResumeIndex(path)
+    index.extend(["a", "b"])
+    index.compact()
+    index._log.close()
+    # Processo morto depois do .idx e antes de esvaziar o log
+    with open(index.log_path, "ab") as f:
+        for post_id in ("a", "b", "c"):
+            f.write(id_digest(post_id).to_bytes(8, "little"))
+
+    reopened = ResumeIndex(path)
+    assert len(reopened) == 3
+    reopened.close()
+
+
+def test_index_built_from_existing_jsonl(tmp_path):
+    path = tmp_path / "results.jsonl"
+    path.write_text(
+        "".join(json.dumps({"id_mention": i}) + "\n" for i in ("1", "2", "2")) + "{broken\n",
+        encoding="utf-8",
+    )
+    index = ResumeIndex.for_output(str(path))
+    assert len(index) == 2 and "1" in index
+    index.close()
+
+
+def test_rotate_outputs(tmp_path):
+    jsonl = tmp_path / "results.jsonl"
+    jsonl.write_text("{}\n", encoding="utf-8")
+    parquet = tmp_path / "results_parquet"
+    parquet.mkdir()
+
+    rotated = rotate_outputs([str(jsonl), None, str(tmp_path / "missing.csv"), str(parquet)])
+    assert len(rotated) == 2
+    assert not jsonl.exists() and not parquet.exists()
+    assert rotated[0].endswith(".jsonl") and os.path.isfile(rotated[0])
+    assert os.path.isdir(rotated[1])
@@ -0,0 +1,78 @@
+import pytest
+
+from src.models.context import ModelConfig
+from src.models.fakes import FakeChatModel
+from src.models.pool import ModelClientPool
+from src.models.routing import EndpointBalancer, RoutedModel
+
+
+class FlakyModel(FakeChatModel):
+    """Endpoint fora do ar: toda chamada falha com um erro transitório."""
+
+    def _payload(self, messages, schema):
+        raise ConnectionError("endpoint down")
+
+
+def test_least_outstanding_picks_idle_endpoint():
+    balancer = EndpointBalancer(["http://a", "http://b"])
+
+    first = balancer.acquire()
+    second = balancer.acquire()
+    assert {first.url, second.url} == {"http://a", "http://b"}
+
+    balancer.release(first, 0.01)
+    assert balancer.acquire().url == first.url
+
+
+def test_transient_failures_eject_endpoint():
+    balancer = EndpointBalancer(["http://a", "http://b"], failure_threshold=2, ejection_s=60)
+    down = balancer.endpoints["http://a"]
+
+    for _ in range(2):
+        balancer.acquire(exclude=["http://b"])
+        balancer.release(down, 0.01, ConnectionError("down"))
+
+    assert down.ejections == 1 and not balancer.stats()["http://a"]["healthy"]
+    assert all(balancer.acquire().url == "http://b" for _ in range(3))
+
+    balancer.check_health(probe=lambda url: True)
+    assert balancer.stats()["http://a"]["healthy"]
+
+
+def test_request_errors_do_not_eject():
+    balancer = EndpointBalancer(["http://a"], failure_threshold=1)
+    endpoint = balancer.acquire()
+
+    balancer.release(endpoint, 0.01, ValueError("bad request"))
+    assert endpoint.ejections == 0 and endpoint.failures == 0
+
+
+def test_routed_model_fails_over_to_healthy_endpoint():
+    balancer = EndpointBalancer(["http://a", "http://b"], failure_threshold=1, ejection_s=60)
+    model = RoutedModel({"http://a": FlakyModel(), "http://b": FakeChatModel()}, balancer)
+
+    for _ in range(3):
+        assert model.invoke("Cloroquina cura COVID").content
+
+    stats = balancer.stats()
+    assert stats["http://a"]["ejections"] == 1 and not stats["http://a"]["healthy"]
+    assert stats["http://b"]["routed_failures"] == 0
+
+
+def test_routed_model_raises_when_every_endpoint_fails():
+    balancer = EndpointBalancer(["http://a", "http://b"], failure_threshold=5)
+    model = RoutedModel({"http://a": FlakyModel(), "http://b": FlakyModel()}, balancer)
+
+    with pytest.raises(ConnectionError):
+        model.invoke("Cloroquina cura COVID")
+    assert sum(s["routed_calls"] for s in balancer.stats().values()) == 2
+
+
+def test_pool_routes_config_with_base_urls():
+    pool = ModelClientPool()
+    config = ModelConfig(model="fake", base_urls=["http://a/", "http://b"])
+
+    model = pool.get(config, lambda c: FakeChatModel())
+    assert isinstance(model, RoutedModel)
+    assert list(model.members) == ["http://a", "http://b"]
+    assert pool.get(config, lambda c: FakeChatModel()) is model
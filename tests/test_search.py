@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.models.fakes import FakeTavilyClient
+from src.utils.search import asearch_queries, search_queries
+from src.utils.snippet_store import SnippetStore
+
+QUERIES = ["q0", "q1", "q2", "q3"]
+
+
+class SlowTavily(FakeTavilyClient):
+    """Buscas mais lentas para as primeiras queries; mede a concorrência e falha em ``fail``."""
+
+    def __init__(self, fail=()):
+        super().__init__()
+        self.fail = set(fail)
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def search(self, query, max_results=5, **kwargs):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(0.02 * (len(QUERIES) - int(query[1:])))
+            if query in self.fail:
+                raise RuntimeError(f"{query} failed")
+            return super().search(query, max_results=max_results)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _titles(references):
+    return [r.title.split(" (")[0] for r in references]
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_results_follow_query_order_within_concurrency(use_async):
+    tavily = SlowTavily()
+    store = SnippetStore()
+    if use_async:
+        hashes, references = asyncio.run(
+            asearch_queries(tavily, QUERIES, max_results=1, max_concurrency=2, snippet_store=store)
+        )
+    else:
+        hashes, references = search_queries(
+            tavily, QUERIES, max_results=1, max_concurrency=2, snippet_store=store
+        )
+    assert _titles(references) == QUERIES
+    assert tavily.peak == 2
+    assert store.texts(hashes)[0].startswith("q0.")
+
+
+def test_failed_query_is_skipped_unless_all_fail():
+    store = SnippetStore()
+    _, references = search_queries(SlowTavily(fail={"q1"}), QUERIES, max_results=1, snippet_store=store)
+    assert _titles(references) == ["q0", "q2", "q3"]
+
+    with pytest.raises(RuntimeError):
+        search_queries(SlowTavily(fail=set(QUERIES)), QUERIES, snippet_store=store)
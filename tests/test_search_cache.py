@@ -0,0 +1,46 @@
+from src.graphs import get_graph
+from src.models.fakes import FakeChatModel, FakeModelsRegistry, FakeTavilyClient
+from src.utils import search_cache as search_cache_module
+from src.utils.search_cache import SearchCache
+
+
+def _last_access(cache: SearchCache, key: str) -> float:
+    (value,) = cache._conn.execute(
+        f"SELECT last_access FROM {cache.table} WHERE key = ?", (key,)
+    ).fetchone()
+    return value
+
+
+def test_graph_reuses_cached_searches():
+    tavily = FakeTavilyClient()
+    cache = SearchCache(":memory:")
+    context = {
+        "models_registry": FakeModelsRegistry(model=FakeChatModel(relevance_ratio=1.0)),
+        "tavily": tavily,
+        "search_cache": cache,
+    }
+    graph = get_graph("v1")
+
+    graph.invoke({"post": "Cloroquina cura COVID"}, context=context)
+    calls = tavily.calls
+    assert calls > 0 and cache.hits == 0
+
+    graph.invoke({"post": "Cloroquina cura COVID"}, context=context)
+    assert tavily.calls == calls
+    assert cache.hits == calls
+
+
+def test_hits_touch_last_access_in_batches(monkeypatch):
+    monkeypatch.setattr(search_cache_module, "TOUCH_BATCH_SIZE", 2)
+    cache = SearchCache(":memory:")
+    cache.set("a", "a", {"results": []})
+    cache.set("b", "b", {"results": []})
+    cache._conn.execute(f"UPDATE {cache.table} SET last_access = 0")
+    stored = _last_access(cache, "a")
+
+    assert cache.get("a") is not None
+    assert _last_access(cache, "a") == stored
+
+    assert cache.get("b") is not None
+    assert _last_access(cache, "a") > stored
+    assert not cache._touched
@@ -0,0 +1,67 @@
+import pytest
+
+from src.utils.snippet_store import MissingSnippetsError, SnippetStore, content_hash, rehydrate
+
+
+def test_put_deduplicates_by_content():
+    store = SnippetStore()
+    keys = store.put_many(["texto a", "texto b", "texto a"])
+    assert keys[0] == keys[2] == content_hash("texto a")
+    assert len(store) == 2
+    assert (store.stored, store.deduplicated) == (2, 1)
+    assert store.texts(keys) == ["texto a", "texto b", "texto a"]
+
+
+def test_bounded_store_evicts_oldest_and_refreshes_reinserted():
+    store = SnippetStore(max_entries=3)
+    a, b, c = store.put_many(["a", "b", "c"])
+    store.put("a")  # reinserido: volta a ser recente
+    d = store.put("d")
+    assert len(store) == 3
+    assert store.evicted == 1
+    assert store.get(b) is None
+    assert store.texts([a, c, d]) == ["a", "c", "d"]
+
+
+def test_missing_hash_raises_and_legacy_text_passes_through():
+    store = SnippetStore()
+    key = store.put("trecho")
+    assert store.texts([key, "texto antigo, sem hash"]) == ["trecho", "texto antigo, sem hash"]
+    with pytest.raises(MissingSnippetsError):
+        store.texts([key, content_hash("nunca gravado")])
+
+
+def test_rehydrate_adds_content(tmp_path):
+    store = SnippetStore(str(tmp_path / "snippets.sqlite"))
+    key = store.put("conteúdo do artigo")
+    store.close()
+
+    reopened = SnippetStore(str(tmp_path / "snippets.sqlite"))
+    refs = rehydrate([{"url": "https://example.com", "content_hash": key}], reopened)
+    assert refs[0]["content"] == "conteúdo do artigo"
+    assert len(reopened) == 1
+
+
+def test_graph_state_carries_hashes_in_content_ids():
+    from src.graphs import get_graph
+    from src.models.fakes import FakeChatModel, FakeModelsRegistry, FakeTavilyClient
+
+    store = SnippetStore()
+    context = {
+        "models_registry": FakeModelsRegistry(model=FakeChatModel(relevance_ratio=1.0)),
+        "tavily": FakeTavilyClient(),
+        "snippet_store": store,
+    }
+    result = get_graph("v1").invoke({"post": "Cloroquina cura COVID"}, context=context)
+    assert "content" not in result
+    assert result["content_ids"] and all(len(key) == 16 for key in result["content_ids"])
+    assert all(ref.content_hash in result["content_ids"] for ref in result["references"])
+    assert len(store.texts(result["content_ids"])) == len(result["content_ids"])
+
+
+def test_legacy_content_field_migrates_to_content_ids():
+    from src.models.state import AgentState
+
+    state = AgentState(post="x", content=["texto gravado antes do store"])
+    assert state.content_ids == ["texto gravado antes do store"]
+    assert SnippetStore().texts(state.content_ids) == ["texto gravado antes do store"]
@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+import pytest
+
+from src.graphs import get_graph
+from src.models.fakes import FakeChatModel, FakeModelsRegistry, FakeTavilyClient
+
+
+class FailingPlanner(FakeChatModel):
+    """Planner (texto livre) falha na hora; as chamadas estruturadas demoram."""
+
+    def _generate(self, messages, stop=None, run_manager=None, output_schema=None, **kwargs):
+        if output_schema is None:
+            raise RuntimeError("planner down")
+        time.sleep(0.05)
+        return super()._generate(messages, stop, run_manager, output_schema=output_schema, **kwargs)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, output_schema=None, **kwargs):
+        if output_schema is None:
+            raise RuntimeError("planner down")
+        await asyncio.sleep(0.05)
+        return await super()._agenerate(messages, stop, run_manager, output_schema=output_schema, **kwargs)
+
+
+def _context(relevance_ratio: float) -> dict:
+    return {
+        "models_registry": FakeModelsRegistry(model=FailingPlanner(relevance_ratio=relevance_ratio)),
+        "tavily": FakeTavilyClient(),
+        "speculative_planner": True,
+    }
+
+
+def test_irrelevant_post_ignores_failed_speculative_plan():
+    graph = get_graph("v1")
+    result = graph.invoke({"post": "Bom dia a todos"}, context=_context(0.0))
+    assert result["relevance_analysis"].relevant is False
+    assert result.get("plan") is None
+
+
+def test_irrelevant_post_ignores_failed_speculative_plan_async():
+    graph = get_graph("v1", use_async=True)
+    result = asyncio.run(graph.ainvoke({"post": "Bom dia a todos"}, context=_context(0.0)))
+    assert result["relevance_analysis"].relevant is False
+
+
+def test_relevant_post_surfaces_planner_failure():
+    graph = get_graph("v1")
+    with pytest.raises(RuntimeError, match="planner down"):
+        graph.invoke({"post": "Cloroquina cura COVID"}, context=_context(1.0))
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from src.graphs import get_graph
+from src.models.context import ModelConfig
+from src.models.fakes import FakeChatModel, FakeModelsRegistry, FakeTavilyClient
+from src.models.schemas import Response
+from src.models.structured import repair_structured, structured_output_method
+
+VALID = {"score": 0.8, "justification": "ok"}
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        "```json\n" + json.dumps(VALID) + "\n```",
+        "Aqui está a análise: " + json.dumps(VALID) + " Espero ter ajudado.",
+        '{"score": 0.8, "justification": "ok",}',
+        "{'score': 0.8, 'justification': 'ok'}",
+        json.dumps({"Response": VALID}),
+        '{"score": 0.8, "justification": "ok',
+    ],
+)
+def test_repair_recovers_common_failures(raw):
+    assert repair_structured(raw, Response) == Response(**VALID)
+
+
+def test_repair_gives_up_on_garbage():
+    assert repair_structured("não sei", Response) is None
+    assert repair_structured('{"score": "alto"}', Response) is None
+
+
+@pytest.mark.parametrize(
+    "config, method",
+    [
+        (ModelConfig(model="llama3.1:8b", base_url="http://localhost:11434"), "json_schema"),
+        (ModelConfig(model="llama3.1:8b", model_provider="ollama"), "json_schema"),
+        # A tag do modelo ("llama3.1:8b") não é um provider
+        (ModelConfig(model="llama3.1:8b", base_url="http://gpu:8000"), None),
+        (ModelConfig(model="openai:gpt-4o-mini"), None),
+        (ModelConfig(model="llama3.1:8b", model_provider="ollama", structured_output_method="function_calling"), "function_calling"),
+    ],
+)
+def test_structured_output_method(config, method):
+    assert structured_output_method(config) == method
+
+
+class FencedAnalyst(FakeChatModel):
+    """O analyst responde com o JSON dentro de uma cerca de código."""
+
+    def _payload(self, messages, schema):
+        payload = super()._payload(messages, schema)
+        if schema is not None and schema.__name__ == "Response":
+            return f"```json\n{payload}\n```"
+        return payload
+
+
+def test_graph_counts_repaired_responses():
+    registry = FakeModelsRegistry(model=FencedAnalyst(relevance_ratio=1.0))
+    result = get_graph("v1").invoke(
+        {"post": "Cloroquina cura COVID"},
+        context={"models_registry": registry, "tavily": FakeTavilyClient()},
+    )
+    metrics = result["metrics"]["analyst"]
+    assert result["response"].score is not None
+    assert (metrics.parse_failures, metrics.repaired) == (1, 1)